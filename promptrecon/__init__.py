@@ -0,0 +1,5 @@
+# file: promptrecon/__init__.py
+
+from .scanner import Scanner
+
+__all__ = ["Scanner"]
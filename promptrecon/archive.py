@@ -0,0 +1,124 @@
+# file: promptrecon/archive.py
+
+"""
+压缩包 / 归档内扫描：zip 系（.zip .whl .jar .war .egg）、tar 系（.tar .tar.gz .tgz
+.tar.bz2 .tar.xz …）和单文件压缩流（.gz .bz2 .xz）。
+
+- 成员直接在内存里流式解压，不落盘；每个成员同样走大小 / 二进制过滤
+- 解压时按上限读取（上限 + 1 字节），压缩包里声明的 size 造假也读不爆内存
+- 成员本身是归档时递归，深度受 max_depth 限制；显示路径为 a.whl!pkg/inner.jar!conf.txt
+- 损坏 / 加密的归档或成员只跳过，不中断整次扫描
+"""
+
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import tarfile
+import zipfile
+import zlib
+
+from .core import MAX_SCAN_BYTES, is_content_scannable
+
+logger = logging.getLogger(__name__)
+
+ZIP_SUFFIXES = ('.zip', '.whl', '.jar', '.war', '.ear', '.egg')
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+STREAM_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+DEFAULT_MAX_DEPTH = 3
+# 嵌套归档要整体读进内存才能再打开，单独给一个更大的上限
+MAX_NESTED_ARCHIVE_BYTES = 64 * 1024 * 1024
+
+# 损坏 / 截断 / 加密的归档或成员：zlib.error（deflate/gzip）、LZMAError、EOFError（截断）、
+# OSError（BadGzipFile 等）、RuntimeError（加密 zip）
+_ARCHIVE_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, tarfile.TarError, zlib.error,
+                   lzma.LZMAError, EOFError, OSError, RuntimeError, ValueError)
+
+
+def archive_kind(name):
+    """按扩展名判断归档类型：'zip' / 'tar' / 'stream'，不是归档返回 None。"""
+    lower = str(name).lower()
+    if lower.endswith(TAR_SUFFIXES):  # 先于 .gz 判断
+        return 'tar'
+    if lower.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if os.path.splitext(lower)[1] in STREAM_OPENERS:
+        return 'stream'
+    return None
+
+
+def _read_limited(fobj, limit):
+    data = fobj.read(limit + 1)
+    return None if len(data) > limit else data
+
+
+def _iter_zip(fobj):
+    with zipfile.ZipFile(fobj) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            yield info.filename, info.file_size, lambda info=info: zf.open(info)
+
+
+def _iter_tar(fobj):
+    # 'r|*' 是纯顺序流模式：.tar.gz 只解压一遍，不需要 seek
+    with tarfile.open(fileobj=fobj, mode='r|*') as tf:
+        for info in tf:
+            if info.isfile():
+                yield info.name, info.size, lambda info=info: tf.extractfile(info)
+
+
+def _iter_stream(fobj, name):
+    opener = STREAM_OPENERS[os.path.splitext(name.lower())[1]]
+    member = os.path.splitext(os.path.basename(name))[0]
+    yield member, None, lambda: opener(fobj)
+
+
+def iter_archive_members(source, name=None, max_depth=DEFAULT_MAX_DEPTH, _depth=1):
+    """
+    逐个产出归档中可扫描的成员：(成员路径, bytes)。
+    source: 文件路径或可 seek 的二进制文件对象；name 用于判断类型（默认取 source 路径）。
+    嵌套归档的成员路径形如 inner.jar!conf/app.properties。
+    """
+    name = str(name if name is not None else source)
+    kind = archive_kind(name)
+    if kind is None:
+        return
+    fobj = source
+    try:
+        if isinstance(source, (str, os.PathLike)):
+            fobj = open(source, 'rb')
+        if kind == 'zip':
+            members = _iter_zip(fobj)
+        elif kind == 'tar':
+            members = _iter_tar(fobj)
+        else:
+            members = _iter_stream(fobj, name)
+        for member, size, open_member in members:
+            nested = _depth < max_depth and archive_kind(member) is not None
+            limit = MAX_NESTED_ARCHIVE_BYTES if nested else MAX_SCAN_BYTES
+            if size is not None and size > limit:
+                continue
+            # 单个成员读失败（CRC 错误、截断）只跳过该成员，不影响其余成员
+            try:
+                with open_member() as mf:
+                    data = _read_limited(mf, limit)
+            except _ARCHIVE_ERRORS as e:
+                logger.debug(f"Skipping unreadable member {name}!{member}: {e}")
+                continue
+            if data is None:
+                continue
+            if nested:
+                for inner, inner_data in iter_archive_members(io.BytesIO(data), member,
+                                                              max_depth, _depth + 1):
+                    yield f"{member}!{inner}", inner_data
+            elif is_content_scannable(data):
+                yield member, data
+    except _ARCHIVE_ERRORS as e:
+        logger.debug(f"Skipping unreadable archive {name}: {e}")
+    finally:
+        if fobj is not source:
+            fobj.close()
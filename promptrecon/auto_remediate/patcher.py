@@ -1,7 +1,14 @@
 # file: promptrecon/auto_remediate/patcher.py
 import re
 import os
+import ast
+import io
+import json
+import shutil
+import tempfile
+import tokenize
 import logging
+from collections import defaultdict
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,3 +61,319 @@ def auto_patch_file(filepath: str, snippet: str, var_name: str = "SECURE_PROMPT_
     except Exception as e:
         logger.error(f"[Auto-Remediation] Patch failed for {filepath}: {e}")
         return False
+
+
+# --- Batch remediation (`promptrecon patch --from results.jsonl`) ---
+
+REPLACEMENT_TEMPLATE = 'os.environ.get("{var_name}", "MISSING_PROMPT")'
+
+# generic_secret-style snippets carry the assignment; the secret is the quoted value
+_QUOTED_VALUE_RE = re.compile(r"""['"]([^'"]+)['"]\s*$""")
+_ENV_LINE_RE = re.compile(r"^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)\s*=")
+
+
+def load_findings_jsonl(path: str) -> list:
+    """Read findings written by `scan --jsonl`."""
+    findings = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                findings.append(json.loads(line))
+    return findings
+
+
+def _secret_text(snippet: str) -> str:
+    m = _QUOTED_VALUE_RE.search(snippet)
+    return m.group(1) if m else snippet.strip().strip('"\'')
+
+
+def _env_quote(value: str) -> str:
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{escaped}"'
+
+
+def _atomic_write(path: str, content: str):
+    """Write via a temp file in the same directory + rename, keeping the file mode."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.promptrecon-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _EnvNames:
+    """Unique env var names for the whole run; one name per distinct secret value."""
+
+    def __init__(self, existing=()):
+        self.used = set(existing)
+        self.by_value = {}
+        self.new = []  # [(name, value)] to append to the env file
+
+    def name_for(self, base: str, value: str) -> str:
+        if value in self.by_value:
+            return self.by_value[value]
+        base = re.sub(r'[^A-Z0-9_]+', '_', base.upper()).strip('_') or "SECURE_PROMPT_KEY"
+        if base[0].isdigit():
+            base = f"PROMPT_{base}"
+        name, n = base, 1
+        while name in self.used:
+            n += 1
+            name = f"{base}_{n}"
+        self.used.add(name)
+        self.by_value[value] = name
+        self.new.append((name, value))
+        return name
+
+    def copy(self):
+        """Scratch copy for planning one file; adopt it only if the plan succeeds."""
+        other = _EnvNames()
+        other.used = set(self.used)
+        other.by_value = dict(self.by_value)
+        other.new = list(self.new)
+        return other
+
+
+def _import_os_line(tree):
+    """
+    Where to add `import os`: (1-based line to insert before, text), after any
+    module docstring and __future__ imports; (0, "") if it is already imported.
+    """
+    body = tree.body
+    for node in body:
+        if isinstance(node, ast.Import) and any(a.name == 'os' and not a.asname for a in node.names):
+            return 0, ""
+    index = 0
+    if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], 'value', None), ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        index = 1  # module docstring
+    while index < len(body) and isinstance(body[index], ast.ImportFrom) \
+            and body[index].module == '__future__':
+        index += 1
+    if index < len(body):
+        node = body[index]
+        line = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+        is_import = isinstance(node, (ast.Import, ast.ImportFrom))
+        return line, "import os\n" if is_import else "import os\n\n"
+    return ((body[-1].end_lineno + 1) if body else 1), "import os\n"
+
+
+def _target_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _bindings(tree):
+    """
+    [(value node, name)] for every value bound to a name: assignment and
+    annotated-assignment targets (`API_KEY: str = ...`), keyword arguments
+    and parameter defaults. Chained assignments bind to the last target.
+    """
+    bindings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign):
+            bindings.append((node.value, _target_name(node.targets[-1])))
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            bindings.append((node.value, _target_name(node.target)))
+        elif isinstance(node, ast.keyword) and node.arg:
+            bindings.append((node.value, node.arg))
+        elif isinstance(node, ast.arguments):
+            positional = node.posonlyargs + node.args
+            for arg, default in zip(positional[len(positional) - len(node.defaults):], node.defaults):
+                bindings.append((default, arg.arg))
+            for arg, default in zip(node.kwonlyargs, node.kw_defaults):
+                if default is not None:
+                    bindings.append((default, arg.arg))
+    return [(value, name) for value, name in bindings if name]
+
+
+def _bound_name(bindings, start, end):
+    """Name of the innermost binding whose value covers the (line, byte col) span."""
+    best = None
+    for value, name in bindings:
+        if (value.lineno, value.col_offset) <= start and end <= (value.end_lineno, value.end_col_offset):
+            if best is None or (value.lineno, value.col_offset) > (best[0].lineno, best[0].col_offset):
+                best = (value, name)
+    return best[1] if best else None
+
+
+def _plan_file(content: str, file_findings: list, names: _EnvNames):
+    """
+    Work out every replacement for one file in a single tokenize pass.
+    Returns (new_content or None, replaced count, [(line, reason)] skipped).
+    """
+    try:
+        tree = ast.parse(content)
+        tokens = list(tokenize.generate_tokens(io.StringIO(content).readline))
+    except (SyntaxError, tokenize.TokenError) as e:
+        return None, 0, [(f.get('line', 0), f"unparseable: {e}") for f in file_findings]
+
+    # Split on '\n' only, like tokenize's readline; splitlines() also breaks
+    # on form feed, \u2028 etc. and would shift every later offset
+    line_starts = [0]
+    for line in io.StringIO(content):
+        line_starts.append(line_starts[-1] + len(line))
+
+    # Module docstring lines: replacing it would turn the docstring into an
+    # expression statement and move the __future__ / import anchor
+    body = tree.body
+    docstring_lines = range(0)
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        docstring_lines = range(body[0].lineno, body[0].end_lineno + 1)
+
+    # Plain string literals with their value
+    literals = []
+    in_docstring = bool(docstring_lines)  # until the docstring statement's NEWLINE
+    for tok in tokens:
+        if in_docstring:
+            in_docstring = tok.type != tokenize.NEWLINE
+        elif tok.type == tokenize.STRING:
+            prefix = tok.string[:len(tok.string) - len(tok.string.lstrip('rRuUbBfF'))].lower()
+            if 'b' not in prefix and 'f' not in prefix:
+                try:
+                    value = ast.literal_eval(tok.string)
+                except (ValueError, SyntaxError):
+                    value = None
+                if isinstance(value, str):
+                    literals.append((tok, value))
+
+    def byte_pos(pos):
+        # tokenize columns count characters, ast columns count UTF-8 bytes
+        row, col = pos
+        text = content[line_starts[row - 1]:line_starts[row - 1] + col]
+        return row, len(text.encode('utf-8'))
+
+    bindings = None
+
+    replacements = {}  # literal index -> env var name
+    skipped = []
+    for finding in file_findings:
+        line = int(finding.get('line') or 0)
+        secret = _secret_text(finding.get('snippet', ''))
+        match = None
+        for idx, (tok, value) in enumerate(literals):
+            if tok.start[0] <= line <= tok.end[0] and secret and secret in value:
+                match = idx
+                break
+        if match is None:
+            reason = ("module docstring; remediate by hand" if line in docstring_lines
+                      else "no plain string literal containing the snippet on this line")
+            skipped.append((line, reason))
+            continue
+        if match in replacements:
+            continue  # several findings in one literal
+        tok, value = literals[match]
+        if bindings is None:
+            bindings = _bindings(tree)
+        # The assigned name comes from the AST: for `API_KEY: str = "..."` the
+        # token before `=` is the annotation, not the target
+        bound = _bound_name(bindings, byte_pos(tok.start), byte_pos(tok.end))
+        replacements[match] = names.name_for(bound or finding.get('rule_name', ''), value)
+
+    if not replacements:
+        return None, 0, skipped
+
+    # Edits as (start, order, end, text) in original offsets, applied in one pass;
+    # the `import os` insertion is a zero-width edit sorted before a
+    # replacement starting at the same offset
+    edits = []
+    for idx in replacements:
+        tok = literals[idx][0]
+        start = line_starts[tok.start[0] - 1] + tok.start[1]
+        end = line_starts[tok.end[0] - 1] + tok.end[1]
+        edits.append((start, 1, end, REPLACEMENT_TEMPLATE.format(var_name=replacements[idx])))
+    insert_line, import_text = _import_os_line(tree)
+    if insert_line:
+        offset = line_starts[min(insert_line, len(line_starts)) - 1]
+        edits.append((offset, 0, offset, import_text))
+
+    pieces = []
+    cursor = 0
+    for start, _, end, text in sorted(edits):
+        pieces.append(content[cursor:start])
+        pieces.append(text)
+        cursor = end
+    pieces.append(content[cursor:])
+    new_content = "".join(pieces)
+
+    try:
+        ast.parse(new_content)
+    except SyntaxError as e:
+        return None, 0, [(f.get('line', 0), f"patched file would not parse: {e}") for f in file_findings]
+    return new_content, len(replacements), skipped
+
+
+def batch_patch(findings: list, base_dir: str = ".", env_file: str = ".env.remediated") -> dict:
+    """
+    Remediate many findings at once (e.g. `scan --jsonl` output).
+
+    Findings are grouped by file; each .py file is tokenized once and every
+    hardcoded literal holding a finding is replaced with an os.environ lookup
+    under a unique variable name (derived from the assigned name or the rule,
+    shared by identical secrets). All files are planned before anything is
+    written: the env file is written once first, then each patched file is
+    replaced atomically, so an interrupted run never leaves a half-written
+    file or a secret that exists nowhere.
+
+    Returns {"files": n, "replaced": n, "env_vars": n, "skipped": [(file, line, reason)]}.
+    """
+    by_file = defaultdict(list)
+    for finding in findings:
+        by_file[finding.get('file', '')].append(finding)
+
+    existing = []
+    env_content = ""
+    if os.path.exists(env_file):
+        with open(env_file, 'r', encoding='utf-8') as f:
+            env_content = f.read()
+        existing = [m.group(1) for m in map(_ENV_LINE_RE.match, env_content.splitlines()) if m]
+    names = _EnvNames(existing)
+
+    report = {"files": 0, "replaced": 0, "env_vars": 0, "skipped": []}
+    planned = []
+    for rel_path, file_findings in sorted(by_file.items()):
+        path = os.path.join(base_dir, rel_path)
+        if not rel_path.endswith('.py'):
+            report["skipped"].extend((rel_path, f.get('line', 0), "not a Python file")
+                                     for f in file_findings)
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            report["skipped"].extend((rel_path, f.get('line', 0), str(e)) for f in file_findings)
+            continue
+        # Names are only kept for files whose plan succeeds, so a rejected file
+        # leaves no orphan secrets in the env file
+        scratch = names.copy()
+        new_content, replaced, skipped = _plan_file(content, file_findings, scratch)
+        report["skipped"].extend((rel_path, line, reason) for line, reason in skipped)
+        if new_content is not None:
+            names = scratch
+            planned.append((path, new_content))
+            report["replaced"] += replaced
+
+    if names.new:
+        if env_content and not env_content.endswith('\n'):
+            env_content += '\n'
+        env_content += "".join(f"{name}={_env_quote(value)}\n" for name, value in names.new)
+        _atomic_write(env_file, env_content)
+    report["env_vars"] = len(names.new)
+
+    for path, new_content in planned:
+        _atomic_write(path, new_content)
+    report["files"] = len(planned)
+    logger.info(f"[Auto-Remediation] Patched {report['replaced']} literal(s) in {report['files']} file(s); "
+                f"{report['env_vars']} variable(s) written to {env_file}")
+    return report
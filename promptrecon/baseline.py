@@ -0,0 +1,95 @@
+# file: promptrecon/baseline.py
+
+"""
+Baseline 指纹：屏蔽历史遗留的已知 finding，只报告新增项。
+
+指纹 = sha256(rule_name \\0 归一化路径 \\0 归一化 snippet)，截断为 16 字节 hex。
+不含行号 —— 文件上方插入代码后已知 finding 仍能被识别。
+
+baseline 按指纹记录出现次数（多重集，与 watch.diff_findings 相同）：同一文件里
+已知 secret 又多复制了一份时，超出记录次数的那份照常报告。
+
+查找用普通 dict（O(1) 且精确）。没有用 bloom filter：
+误判会把真正的新泄漏当成已知项静默吞掉，对扫描器来说不可接受。
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter
+
+BASELINE_VERSION = 2
+
+_WS_RE = re.compile(r'\s+')
+
+
+def _normalize_path(path):
+    # Windows / POSIX 统一用 /，去掉 ./ 前缀
+    path = str(path).replace('\\', '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return path
+
+
+def _normalize_snippet(snippet):
+    # 折叠空白，缩进/换行风格变化不影响指纹
+    return _WS_RE.sub(' ', str(snippet)).strip()
+
+
+def finding_fingerprint(finding):
+    """
+    计算单条 finding 的稳定指纹（rule, path, snippet），与行号无关。
+    """
+    key = '\x00'.join((
+        finding.get('rule_name', ''),
+        _normalize_path(finding.get('file', '')),
+        _normalize_snippet(finding.get('snippet', '')),
+    ))
+    return hashlib.sha256(key.encode('utf-8', errors='replace')).hexdigest()[:32]
+
+
+def write_baseline(findings, filename):
+    """把当前全部 findings 的指纹及出现次数写入 baseline 文件（按指纹排序，便于 diff）。"""
+    counts = Counter(finding_fingerprint(f) for f in findings)
+    data = {
+        "version": BASELINE_VERSION,
+        "count": sum(counts.values()),
+        "fingerprints": dict(sorted(counts.items())),
+    }
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=0)
+        f.write('\n')
+    return len(counts)
+
+
+def load_baseline(filename):
+    """
+    读取 baseline 文件，返回 {指纹: 次数}。
+    兼容 version 1（只有指纹列表）：每个指纹按 1 次计。
+    """
+    with open(filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    version = data.get("version")
+    fingerprints = data.get("fingerprints", [])
+    if version == 1 and isinstance(fingerprints, list):
+        return Counter(fingerprints)
+    if version == BASELINE_VERSION and isinstance(fingerprints, dict):
+        return Counter({fp: int(n) for fp, n in fingerprints.items()})
+    raise ValueError(f"Unsupported baseline version: {version}")
+
+
+def filter_new_findings(findings, baseline):
+    """
+    过滤掉 baseline 中已存在的 findings，每条 O(1)。
+    同一指纹最多屏蔽 baseline 记录的次数，多出来的按新增报告。
+    baseline 为 {指纹: 次数}；也接受指纹集合（每个按 1 次计）。
+    """
+    remaining = Counter(baseline)
+    new = []
+    for f in findings:
+        fp = finding_fingerprint(f)
+        if remaining[fp] > 0:
+            remaining[fp] -= 1
+        else:
+            new.append(f)
+    return new
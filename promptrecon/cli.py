@@ -2,7 +2,7 @@
 
 """
 Prompt-Recon CLI
-只暴露 scan 和 patch 两个子命令。
+子命令：scan、merge、watch、patch、watermark-scan、flow-index。
 重型模块（sentinel、AST、向量等）不再默认导入，按需懒加载。
 """
 
@@ -10,18 +10,37 @@ import os
 import sys
 import argparse
 
-from .core import scan_file, load_rules_from_dir, load_ignore_patterns, should_ignore
+from .core import load_rules_from_dir, load_ignore_patterns, should_ignore
 
 
 # --- patch 命令（轻量，直接调 patcher） ---
 def cmd_patch(args):
     try:
-        from .auto_remediate.patcher import auto_patch_file
+        from .auto_remediate import patcher
     except ImportError:
         print("Error: auto_remediate.patcher not available", file=sys.stderr)
         sys.exit(1)
 
-    success = auto_patch_file(args.file, args.snippet)
+    # 批量模式：按 scan --jsonl 的结果一次性修复，每个文件只读写一次
+    if args.from_file:
+        try:
+            findings = patcher.load_findings_jsonl(args.from_file)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read {args.from_file}: {e}", file=sys.stderr)
+            sys.exit(2)
+        report = patcher.batch_patch(findings, base_dir=args.base_dir, env_file=args.env_file)
+        for rel_path, line, reason in report["skipped"]:
+            print(f"[-] {rel_path}:{line} skipped: {reason}")
+        print(f"[+] Remediated {report['replaced']} literal(s) in {report['files']} file(s); "
+              f"{report['env_vars']} variable(s) written to {args.env_file}")
+        if report["skipped"]:
+            sys.exit(1)
+        return
+
+    if not args.file or not args.snippet:
+        print("Error: patch needs FILE and SNIPPET, or --from results.jsonl", file=sys.stderr)
+        sys.exit(2)
+    success = patcher.auto_patch_file(args.file, args.snippet)
     if success:
         print("[+] Remediated. Check .env.remediated")
     else:
@@ -29,19 +48,36 @@ def cmd_patch(args):
         sys.exit(1)
 
 
-# --- scan 命令（轻量，正则扫描） ---
-def cmd_scan(args):
-    from rich.console import Console
-    console = Console()
+def _collect_files(directory, ignore_patterns):
+    """遍历目录，按 ignore patterns 过滤，返回待扫描文件列表。"""
+    files_to_scan = []
+    for root, dirs, files in os.walk(directory, topdown=True):
+        # 目录级忽略：把匹配的子目录从遍历队列中移除（递归剪枝）
+        dirs[:] = [d for d in dirs
+                    if not should_ignore(os.path.join(root, d), ignore_patterns)]
+        for fname in files:
+            fpath = os.path.join(root, fname)
+            if should_ignore(fpath, ignore_patterns):
+                continue
+            files_to_scan.append(fpath)
+    return files_to_scan
 
-    # 规则：优先 builtin，可选追加 rules-dir
+
+def _load_rules(rules_dir=None):
+    """规则：优先 builtin，可选追加 rules-dir。"""
     from .rules.builtin import load_builtin_rules
     rules = load_builtin_rules()
+    if rules_dir:
+        rules.update(load_rules_from_dir(rules_dir))
+    return rules
 
-    if args.rules_dir:
-        extra = load_rules_from_dir(args.rules_dir)
-        rules.update(extra)
 
+# --- scan 命令（轻量，正则扫描） ---
+def cmd_scan(args):
+    from rich.console import Console
+    console = Console()
+
+    rules = _load_rules(args.rules_dir)
     if not rules:
         console.print("[yellow]No rules loaded.[/yellow]")
         sys.exit(0)
@@ -53,28 +89,49 @@ def cmd_scan(args):
     ignorefile_path = os.path.join(args.directory, args.ignorefile)
     ignore_patterns = load_ignore_patterns(ignorefile_path)
 
-    files_to_scan = []
-    for root, dirs, files in os.walk(args.directory, topdown=True):
-        # 目录级忽略：把匹配的子目录从遍历队列中移除（递归剪枝）
-        dirs[:] = [d for d in dirs
-                    if not should_ignore(os.path.join(root, d), ignore_patterns)]
-        for fname in files:
-            fpath = os.path.join(root, fname)
-            if should_ignore(fpath, ignore_patterns):
-                continue
-            files_to_scan.append(fpath)
+    files_to_scan = _collect_files(args.directory, ignore_patterns)
+
+    # 分片：多台 CI 机器各扫一份，结果再用 `promptrecon merge` 合并
+    if args.shard:
+        from .shard import select_shard
+        index, count = args.shard
+        total = len(files_to_scan)
+        files_to_scan = select_shard(files_to_scan, index, count, base_dir=args.directory)
+        console.print(f"[+] Shard {index}/{count}: {len(files_to_scan)} of {total} file(s).")
 
     if not files_to_scan:
         console.print("[green]No files to scan.[/green]")
+        _write_empty_jsonl(args)
         sys.exit(0)
 
-    all_findings = []
-    for fpath in files_to_scan:
-        findings = scan_file(fpath, rules, display_root=args.directory)
-        all_findings.extend(findings)
+    # 文件多时 Scanner.scan_many 会按文件分给多个进程，结果顺序不变
+    from .scanner import Scanner
+    with Scanner(rules=rules, ignore_patterns=ignore_patterns, root=args.directory,
+                 strings_only=args.strings_only, workers=args.jobs,
+                 archives=args.archives, archive_depth=args.archive_depth) as scanner:
+        all_findings = scanner.scan_many(files_to_scan)
+
+    # baseline：--write-baseline 记录当前全部 findings；--baseline 只保留新增项
+    if getattr(args, 'write_baseline', None):
+        from .baseline import write_baseline
+        count = write_baseline(all_findings, args.write_baseline)
+        console.print(f"[+] Baseline written: {args.write_baseline} ({count} fingerprint(s))")
+        sys.exit(0)
+
+    if getattr(args, 'baseline', None):
+        from .baseline import load_baseline, filter_new_findings
+        try:
+            known = load_baseline(args.baseline)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]Failed to load baseline {args.baseline}: {e}[/red]")
+            sys.exit(2)
+        total = len(all_findings)
+        all_findings = filter_new_findings(all_findings, known)
+        console.print(f"[+] Baseline suppressed {total - len(all_findings)} known finding(s).")
 
     if not all_findings:
         console.print("[green]Scan complete. No secrets found.[/green]")
+        _write_empty_jsonl(args)
         sys.exit(0)
 
     console.print(f"[red]![/red] Found {len(all_findings)} secret(s).")
@@ -88,6 +145,164 @@ def cmd_scan(args):
         _save_md(all_findings, args.md)
 
 
+def _write_empty_jsonl(args):
+    # 没有 finding 也写出空 JSONL：分片 / CI 产物要求每次运行都有输出文件
+    if getattr(args, 'jsonl', None):
+        _save_jsonl([], args.jsonl)
+
+
+def _shard_arg(value):
+    from .shard import parse_shard
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+# --- merge 命令（合并分片 JSONL） ---
+def cmd_merge(args):
+    from .shard import merge_jsonl
+    try:
+        findings = merge_jsonl(args.inputs)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if args.output:
+        _save_jsonl(findings, args.output)
+    else:
+        import json
+        for finding in findings:
+            sys.stdout.write(json.dumps(finding, ensure_ascii=False) + '\n')
+    if args.csv:
+        _save_csv(findings, args.csv)
+    if args.md:
+        _save_md(findings, args.md)
+    print(f"[+] Merged {len(args.inputs)} report(s): {len(findings)} unique finding(s).",
+          file=sys.stderr)
+
+
+# --- watch 命令（常驻，只重扫变化的文件） ---
+def cmd_watch(args):
+    from rich.console import Console
+    from .watch import run_watch
+    console = Console()
+
+    rules = _load_rules(args.rules_dir)
+    if not rules:
+        console.print("[yellow]No rules loaded.[/yellow]")
+        sys.exit(0)
+    ignore_patterns = load_ignore_patterns(os.path.join(args.directory, args.ignorefile))
+
+    state = {'initial': True}
+
+    def on_change(added, resolved, session):
+        total = sum(len(v) for v in session.results.values())
+        if state['initial']:
+            state['initial'] = False
+            console.print(f"[+] Initial scan: {total} finding(s) in {len(session.results)} file(s). "
+                          f"Watching {args.directory} (Ctrl+C to stop)...")
+            return
+        for f in added:
+            snippet = f.get('snippet', '')[:60].replace('\n', ' ')
+            console.print(f"[red]+[/red] {f.get('file')}:{f.get('line')} "
+                          f"[cyan]{f.get('rule_name')}[/cyan] {snippet}", highlight=False)
+        for f in resolved:
+            console.print(f"[green]-[/green] {f.get('file')}:{f.get('line')} "
+                          f"[cyan]{f.get('rule_name')}[/cyan] resolved", highlight=False)
+        console.print(f"    {total} finding(s) open")
+
+    try:
+        run_watch(args.directory, rules, ignore_patterns, on_change, poll=args.poll,
+                  interval=args.interval, debounce=args.debounce,
+                  strings_only=args.strings_only)
+    except KeyboardInterrupt:
+        console.print("[+] Stopped.")
+
+
+# --- watermark-scan 命令（零宽水印溯源，按文件并行） ---
+def _watermark_scan_one(fpath):
+    """进程池入口：返回 (fpath, hits, error)。"""
+    from .drm.watermark import scan_file_for_watermarks
+    try:
+        return fpath, scan_file_for_watermarks(fpath), None
+    except OSError as e:
+        return fpath, [], str(e)
+
+
+def cmd_watermark_scan(args):
+    from collections import Counter
+    from .drm.watermark import scan_stream_for_watermarks
+
+    results = []  # [(显示路径, hits)]
+    files = []
+    for target in args.paths or ['-']:
+        if target == '-':
+            results.append(('<stdin>', scan_stream_for_watermarks(sys.stdin.buffer)))
+        elif os.path.isdir(target):
+            ignore_patterns = load_ignore_patterns(os.path.join(target, args.ignorefile))
+            files.extend(_collect_files(target, ignore_patterns))
+        else:
+            files.append(target)
+
+    # 单文件匹配是 C 层正则，瓶颈在 IO 和文件数：按文件分给多个进程
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs > 1 and len(files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, min(64, len(files) // (jobs * 8)))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            scanned = list(pool.map(_watermark_scan_one, files, chunksize=chunksize))
+    else:
+        scanned = [_watermark_scan_one(fpath) for fpath in files]
+
+    for fpath, hits, error in scanned:
+        if error:
+            print(f"[-] {fpath}: {error}", file=sys.stderr)
+        results.append((fpath, hits))
+
+    records = []
+    tenants = Counter()
+    for path, hits in results:
+        for hit in hits:
+            records.append({'file': path, **hit})
+            tenants[hit['tenant_id']] += 1
+            print(f"{path}:{hit['line']}: tenant_id={hit['tenant_id']!r}")
+
+    scanned_count = len(files) + (len(results) - len(scanned))
+    if not records:
+        print(f"[+] Scanned {scanned_count} input(s). No watermarks found.")
+    else:
+        print(f"[!] {len(records)} watermark(s) from {len(tenants)} tenant(s) "
+              f"in {scanned_count} input(s):")
+        for tenant_id, count in tenants.most_common():
+            print(f"    {tenant_id!r}: {count}")
+
+    if args.jsonl:
+        import json
+        with open(args.jsonl, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+# --- flow-index 命令（生成 / 刷新跨文件 prompt 数据流索引） ---
+def cmd_flow_index(args):
+    import json
+    from .cpg.dataflow_index import update_flow_index
+
+    index, stats = update_flow_index(args.directory)
+    edges = index.edges()
+    for edge in edges:
+        print(f"{edge['prompt_file']}:{edge['prompt_line']} {edge['prompt_name']} -> "
+              f"{edge['call_file']}:{edge['call_line']} {edge['call_name']}")
+    print(f"[+] {len(index.files)} file(s) indexed ({stats['parsed']} parsed, "
+          f"{stats['removed']} removed), {len(edges)} prompt flow(s). Index: {index.index_path}")
+
+    if args.jsonl:
+        with open(args.jsonl, 'w', encoding='utf-8') as f:
+            for edge in edges:
+                f.write(json.dumps(edge, ensure_ascii=False) + '\n')
+
+
 def _print_findings(findings, console):
     from rich.table import Table
     table = Table(title="Scan Results", show_lines=True)
@@ -159,18 +374,93 @@ def main():
     scan_parser.add_argument('--jsonl', help="JSONL output file")
     scan_parser.add_argument('--csv', help="CSV output file")
     scan_parser.add_argument('--md', help="Markdown output file")
+    scan_parser.add_argument('--baseline',
+                              help="Baseline file; only findings not in it are reported")
+    scan_parser.add_argument('--write-baseline', metavar='FILE',
+                              help="Write fingerprints of all current findings to FILE and exit")
+    scan_parser.add_argument('--strings-only', action='store_true',
+                              help="For .py files, match rules only inside string literals "
+                                   "(skips code, comments and docstrings)")
+    scan_parser.add_argument('-j', '--jobs', type=int, default=0,
+                              help="Worker processes for large trees (default: CPU count)")
+    scan_parser.add_argument('--archives', action='store_true',
+                              help="Scan inside .zip/.whl/.jar/.tar.gz/.gz etc. "
+                                   "(findings reported as archive!member)")
+    scan_parser.add_argument('--archive-depth', type=int, default=3,
+                              help="Maximum nesting depth of archives inside archives")
+    scan_parser.add_argument('--shard', type=_shard_arg, metavar='I/N',
+                              help="Scan only shard I of N (1-based); deterministic across machines")
+
+    # merge
+    merge_parser = subparsers.add_parser(
+        "merge", help="Merge per-shard `scan --jsonl` reports into one sorted, deduplicated report")
+    merge_parser.add_argument('inputs', nargs='+', help="JSONL reports to merge")
+    merge_parser.add_argument('-o', '--output', help="Merged JSONL file (default: stdout)")
+    merge_parser.add_argument('--csv', help="CSV output file")
+    merge_parser.add_argument('--md', help="Markdown output file")
+
+    # watch
+    watch_parser = subparsers.add_parser(
+        "watch", help="Scan once, then rescan changed files and report new/resolved findings")
+    watch_parser.add_argument('-d', '--directory', required=True,
+                              help="Directory to watch")
+    watch_parser.add_argument('--rules-dir',
+                              help="Extra rules directory (appends to builtin rules)")
+    watch_parser.add_argument('--ignorefile', default=".promptignore",
+                              help="Ignore patterns file")
+    watch_parser.add_argument('--debounce', type=float, default=0.3,
+                              help="Seconds of quiet before a batch of changes is rescanned")
+    watch_parser.add_argument('--poll', action='store_true',
+                              help="Poll mtimes instead of using inotify")
+    watch_parser.add_argument('--interval', type=float, default=1.0,
+                              help="Polling interval in seconds (with --poll or when inotify is unavailable)")
+    watch_parser.add_argument('--strings-only', action='store_true',
+                              help="For .py files, match rules only inside string literals")
+
+    # watermark-scan
+    wm_parser = subparsers.add_parser(
+        "watermark-scan", help="Trace zero-width tenant watermarks in files or stdin")
+    wm_parser.add_argument('paths', nargs='*',
+                           help="Files or directories to scan ('-' or none = stdin)")
+    wm_parser.add_argument('-j', '--jobs', type=int, default=0,
+                           help="Worker processes (default: CPU count)")
+    wm_parser.add_argument('--ignorefile', default=".promptignore",
+                           help="Ignore patterns file (for directories)")
+    wm_parser.add_argument('--jsonl', help="JSONL output file")
+
+    # flow-index
+    flow_parser = subparsers.add_parser(
+        "flow-index", help="Build or refresh the cross-file prompt data-flow index "
+                           "(.promptrecon/flow_index.json; kept up to date by the pre-commit hook)")
+    flow_parser.add_argument('-d', '--directory', default=".",
+                             help="Project root to index")
+    flow_parser.add_argument('--jsonl', help="Write prompt -> LLM call edges to a JSONL file")
 
     # patch
     patch_parser = subparsers.add_parser("patch", help="Auto-remediate a secret in a file")
-    patch_parser.add_argument("file", help="File to patch")
-    patch_parser.add_argument("snippet", help="Exact secret string to remediate")
+    patch_parser.add_argument("file", nargs='?', help="File to patch")
+    patch_parser.add_argument("snippet", nargs='?', help="Exact secret string to remediate")
+    patch_parser.add_argument('--from', dest='from_file', metavar='RESULTS_JSONL',
+                              help="Remediate every finding in a `scan --jsonl` report")
+    patch_parser.add_argument('--base-dir', default=".",
+                              help="Directory the report's paths are relative to (the scanned -d)")
+    patch_parser.add_argument('--env-file', default=".env.remediated",
+                              help="Env file the extracted values are appended to")
 
     args = parser.parse_args()
 
     if args.command == "scan":
         cmd_scan(args)
+    elif args.command == "merge":
+        cmd_merge(args)
+    elif args.command == "watch":
+        cmd_watch(args)
     elif args.command == "patch":
         cmd_patch(args)
+    elif args.command == "watermark-scan":
+        cmd_watermark_scan(args)
+    elif args.command == "flow-index":
+        cmd_flow_index(args)
     else:
         parser.print_help()
         sys.exit(1)
@@ -7,6 +7,8 @@ import base64
 import logging
 from pathlib import Path
 import fnmatch
+import io
+import tokenize
 
 def load_ignore_patterns(ignorefile=".promptignore"):
     patterns = []
@@ -64,20 +66,29 @@ def load_rules_from_dir(rules_dir="promptrecon/rules"):
     return loaded_rules
 
 # --- v0.3 Feature #2: 文件过滤 (二进制/大文件) ---
+MAX_SCAN_BYTES = 2 * 1024 * 1024  # > 2MB 不扫
+BINARY_SNIFF_BYTES = 4096
+
+
+def is_content_scannable(data):
+    """
+    内存中的字节内容版 is_file_scannable：大小 + 前 4KB 的 null byte 探测
+    """
+    return len(data) <= MAX_SCAN_BYTES and b'\x00' not in data[:BINARY_SNIFF_BYTES]
+
+
 def is_file_scannable(filepath):
     """
     检查文件是否太大, 或者是否为二进制
     """
     try:
         # 1. 检查文件大小
-        if os.path.getsize(filepath) > 2 * 1024 * 1024:  # > 2MB
+        if os.path.getsize(filepath) > MAX_SCAN_BYTES:
             return False
             
         # 2. 检查二进制 (通过 'null byte' 探测)
         with open(filepath, 'rb') as f:
-            # latin-1 可以读取所有字节, 'ignore' 确保无错
-            sample = f.read(4096).decode('latin-1', 'ignore')
-            if '\x00' in sample:
+            if b'\x00' in f.read(BINARY_SNIFF_BYTES):
                 return False
                 
     except (IOError, OSError):
@@ -153,8 +164,106 @@ def scan_content(content, rules):
     return hits
 
 
+# --- Python 字符串字面量扫描：只匹配字面量，跳过代码/注释/docstring ---
+_FSTRING_START = getattr(tokenize, 'FSTRING_START', None)  # 3.12+ 把 f-string 拆成多个 token
+_FSTRING_END = getattr(tokenize, 'FSTRING_END', None)
+_STATEMENT_START = {tokenize.NEWLINE, tokenize.NL, tokenize.INDENT, tokenize.DEDENT,
+                    tokenize.ENCODING, None}
+
+
+def python_string_spans(content):
+    """
+    用 tokenize 找出 Python 源码中的字符串字面量（含 f-string），返回
+    [(start, end, line), ...]：content 中的字符区间 + 起始行号。
+    - 直接赋值的字面量（`password = "..."`、`f(token="...")`）区间从变量名开始，
+      这样 generic_secret 这类带赋值上下文的规则仍能命中
+    - 独占一条语句的字符串（docstring）跳过
+    tokenize 失败（语法错误等）返回 None，由调用方回退到全文扫描。
+    """
+    # 与 tokenize 用同一个 readline 切行（只按 \n）；splitlines 还会在 \x0c、\u2028 等处断行，
+    # 导致之后的偏移全部错位
+    line_starts = [0]
+    for line in io.StringIO(content):
+        line_starts.append(line_starts[-1] + len(line))
+
+    def offset(pos):
+        return line_starts[pos[0] - 1] + pos[1]
+
+    spans = []
+    pending = []  # 同一条语句里相邻的字面量（隐式拼接 / docstring）
+    prev = prev2 = None  # 前两个有效 token
+    fstring_depth = 0
+    fstring_start = None
+    try:
+        tokens = tokenize.generate_tokens(io.StringIO(content).readline)
+        for tok in tokens:
+            if tok.type == _FSTRING_START:
+                if fstring_depth == 0:
+                    fstring_start = tok
+                fstring_depth += 1
+                continue
+            if fstring_depth:
+                if tok.type == _FSTRING_END:
+                    fstring_depth -= 1
+                    if fstring_depth == 0:
+                        tok = tokenize.TokenInfo(tokenize.STRING, '', fstring_start.start,
+                                                 tok.end, tok.line)
+                    else:
+                        continue
+                else:
+                    continue
+
+            if tok.type == tokenize.STRING:
+                start = tok.start
+                if (not pending and prev is not None and prev.type == tokenize.OP
+                        and prev.string == '=' and prev2 is not None
+                        and prev2.type == tokenize.NAME):
+                    start = prev2.start
+                pending.append((start, tok.end, prev))
+                continue
+            if tok.type in (tokenize.COMMENT, tokenize.NL) and pending:
+                continue
+            if pending:
+                head_prev = pending[0][2]
+                is_docstring = ((head_prev is None or head_prev.type in _STATEMENT_START)
+                                and tok.type in (tokenize.NEWLINE, tokenize.ENDMARKER))
+                if not is_docstring:
+                    spans.extend((offset(a), offset(b), a[0]) for a, b, _ in pending)
+                pending = []
+            if tok.type not in (tokenize.COMMENT, tokenize.NL):
+                prev2, prev = prev, tok
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    return spans
+
+
+def scan_python_strings(content, rules):
+    """
+    scan_content 的 .py 专用版本：规则只跑在 python_string_spans() 的区间上，
+    行号映射回源文件真实行号。无法 tokenize 时回退到全文 scan_content。
+    tokenize 比正则慢得多，所以先用正则探测全文：一个规则都不命中的文件
+    （绝大多数）直接返回，只有疑似命中的文件才做字面量切分。
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    if not any(rule_data["regex"].search(content) for rule_data in rules.values()):
+        return []
+    spans = python_string_spans(content)
+    if spans is None:
+        return scan_content(content, rules)
+
+    hits = []
+    for start, end, line in spans:
+        text = content[start:end]
+        for name, rule_data in rules.items():
+            for m in rule_data["regex"].finditer(text):
+                line_num = line + text.count('\n', 0, m.start())
+                hits.append({'rule_name': name, 'snippet': m.group(0)[:80], 'line': line_num})
+    return hits
+
+
 # --- v0.3 核心扫描函数（委托给 scan_content） ---
-def scan_file(filepath, rules, display_root=None):
+def scan_file(filepath, rules, display_root=None, strings_only=False):
     """
     扫描单个文件，返回 findings 列表（含 risk_score）。
     委托给 scan_content() 做实际匹配。
@@ -164,6 +273,7 @@ def scan_file(filepath, rules, display_root=None):
                     1. relative_to(display_root)
                     2. relative_to(cwd)
                     3. 绝对路径（fallback）
+    strings_only: .py 文件只扫描字符串字面量（scan_python_strings）。
     """
     local_findings = []
     if not is_file_scannable(filepath):
@@ -177,37 +287,54 @@ def scan_file(filepath, rules, display_root=None):
         except Exception:
             return []
 
-        # ---- 路径归一化：三级降级 ----
-        abs_path = Path(filepath).resolve()
-        display_path = None
-        if display_root is not None:
-            try:
-                display_path = str(abs_path.relative_to(Path(display_root).resolve()))
-            except ValueError:
-                pass
-        if display_path is None:
-            try:
-                display_path = str(abs_path.relative_to(Path.cwd().resolve()))
-            except ValueError:
-                display_path = str(abs_path)
-
-        basic_hits = scan_content(content, rules)
-        for hit in basic_hits:
-            rule_name = hit['rule_name']
-            rule_data = rules.get(rule_name, {})
-            finding = {
-                "file": display_path,
-                "rule_name": rule_name,
-                "snippet": hit['snippet'].strip(),
-                "line": hit.get('line', 0),
-                "rule": rule_data,
-            }
-            finding["risk_score"] = calculate_risk_score(finding)
-            local_findings.append(finding)
+        root = Path(display_root).resolve() if display_root is not None else None
+        display_path = display_path_for(filepath, root)
+
+        if strings_only and str(filepath).endswith('.py'):
+            basic_hits = scan_python_strings(content, rules)
+        else:
+            basic_hits = scan_content(content, rules)
+        local_findings = build_findings(basic_hits, display_path, rules)
     except Exception:
         pass
     return local_findings
 
+
+def display_path_for(filepath, resolved_root=None):
+    """
+    路径归一化：三级降级
+      1. relative_to(resolved_root)（调用方已 resolve()，批量扫描时只算一次）
+      2. relative_to(cwd)
+      3. 绝对路径（fallback）
+    """
+    abs_path = Path(filepath).resolve()
+    if resolved_root is not None:
+        try:
+            return str(abs_path.relative_to(resolved_root))
+        except ValueError:
+            pass
+    try:
+        return str(abs_path.relative_to(Path.cwd().resolve()))
+    except ValueError:
+        return str(abs_path)
+
+
+def build_findings(basic_hits, display_path, rules):
+    """scan_content() 的命中 -> 完整 finding（补 file / rule / risk_score）。"""
+    findings = []
+    for hit in basic_hits:
+        rule_name = hit['rule_name']
+        finding = {
+            "file": display_path,
+            "rule_name": rule_name,
+            "snippet": hit['snippet'].strip(),
+            "line": hit.get('line', 0),
+            "rule": rules.get(rule_name, {}),
+        }
+        finding["risk_score"] = calculate_risk_score(finding)
+        findings.append(finding)
+    return findings
+
 # --- v2.0: Rich Table Output ---
 def output_rich_table(findings, console=None):
     """Output findings as a rich table to console."""
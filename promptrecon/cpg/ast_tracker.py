@@ -2,6 +2,7 @@
 import ast
 import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 # Common prompt variable names to look for
 PROMPT_VARIABLE_NAMES = [
@@ -21,6 +22,39 @@ API_CALL_PATTERNS = [
     "ChatOpenAI",
 ]
 
+_PROMPT_VARIABLES = frozenset(PROMPT_VARIABLE_NAMES)
+_API_CALL_NAMES = frozenset(p.split(".")[-1] for p in API_CALL_PATTERNS)
+
+# Below this many files the process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+
+def _assigned_source(value):
+    """The traced source of an assigned value: a constant, or an f-string template."""
+    if isinstance(value, ast.Constant):
+        return value.value
+    if isinstance(value, ast.JoinedStr):
+        parts = []
+        for val in value.values:
+            if isinstance(val, ast.Constant):
+                parts.append(val.value)
+            elif isinstance(val, ast.FormattedValue):
+                parts.append(f"{{{ast.unparse(val.value)}}}")
+        return "".join(parts)
+    return None
+
+
+def _api_call(node, get_attr_name):
+    """Return the api_call record for a Call node, or None if it is not an LLM API call."""
+    if isinstance(node.func, ast.Attribute):
+        full_name = get_attr_name(node.func)
+        if any(pattern in full_name for pattern in API_CALL_PATTERNS):
+            return {"type": "api_call", "name": full_name, "line": node.lineno}
+    elif isinstance(node.func, ast.Name):
+        if node.func.id in _API_CALL_NAMES:
+            return {"type": "api_call", "name": node.func.id, "line": node.lineno}
+    return None
+
 
 class VariableTracker(ast.NodeVisitor):
     def __init__(self, target_variable="prompt"):
@@ -33,16 +67,8 @@ class VariableTracker(ast.NodeVisitor):
         for target in node.targets:
             if isinstance(target, ast.Name) and target.id == self.target_variable:
                 self.found = True
-                if isinstance(node.value, ast.Constant):
-                    self.sources.append(node.value.value)
-                elif isinstance(node.value, ast.JoinedStr):
-                    parts = []
-                    for val in node.value.values:
-                        if isinstance(val, ast.Constant):
-                            parts.append(val.value)
-                        elif isinstance(val, ast.FormattedValue):
-                            parts.append(f"{{{ast.unparse(val.value)}}}")
-                    self.sources.append("".join(parts))
+                if isinstance(node.value, (ast.Constant, ast.JoinedStr)):
+                    self.sources.append(_assigned_source(node.value))
         self.generic_visit(node)
 
 
@@ -53,23 +79,10 @@ class APICallTracker(ast.NodeVisitor):
         self.calls = []
 
     def visit_Call(self, node):
-        # Check for attribute calls like openai.ChatCompletion.create
-        if isinstance(node.func, ast.Attribute):
-            full_name = self._get_attr_name(node.func)
-            if any(pattern in full_name for pattern in API_CALL_PATTERNS):
-                self.calls.append({
-                    "type": "api_call",
-                    "name": full_name,
-                    "line": node.lineno
-                })
-        # Check for direct names like ChatOpenAI(...)
-        elif isinstance(node.func, ast.Name):
-            if node.func.id in [p.split(".")[-1] for p in API_CALL_PATTERNS]:
-                self.calls.append({
-                    "type": "api_call",
-                    "name": node.func.id,
-                    "line": node.lineno
-                })
+        # Attribute calls like openai.ChatCompletion.create, or direct names like ChatOpenAI(...)
+        call = _api_call(node, self._get_attr_name)
+        if call:
+            self.calls.append(call)
         self.generic_visit(node)
 
     def _get_attr_name(self, node):
@@ -82,6 +95,29 @@ class APICallTracker(ast.NodeVisitor):
         return ".".join(reversed(parts))
 
 
+class FileSummaryVisitor(APICallTracker):
+    """
+    Single-pass visitor: collects assignments to every name in
+    PROMPT_VARIABLE_NAMES and every LLM API call site in one walk of the tree.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.assignments = defaultdict(list)
+
+    def visit_Assign(self, node):
+        if isinstance(node.value, (ast.Constant, ast.JoinedStr)):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id in _PROMPT_VARIABLES:
+                    self.assignments[target.id].append(_assigned_source(node.value))
+        self.generic_visit(node)
+
+    @property
+    def prompts(self):
+        """Traced prompt sources, grouped in PROMPT_VARIABLE_NAMES order."""
+        return [src for name in PROMPT_VARIABLE_NAMES for src in self.assignments.get(name, ())]
+
+
 def trace_variable_in_file(filepath, variable_name="system_prompt"):
     """
     Attempt to trace the value of a specific variable across the AST of a file.
@@ -112,29 +148,51 @@ def trace_api_calls_in_file(filepath):
         return []
 
 
-def build_project_cpg(directory):
+def summarize_file(filepath):
     """
-    Build a Code Property Graph by extracting prompt variables and API call sites.
+    Read and parse a file once; return (prompts, api_calls) as
+    trace_variable_in_file over all PROMPT_VARIABLE_NAMES and
+    trace_api_calls_in_file would. Unparseable files yield ([], []).
     """
-    graph_data = {}
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=filepath)
+    except Exception:
+        return [], []
+    visitor = FileSummaryVisitor()
+    visitor.visit(tree)
+    return visitor.prompts, visitor.calls
+
+
+def _iter_python_files(directory):
     for root, _, files in os.walk(directory):
         for file in files:
             if file.endswith(".py"):
-                filepath = os.path.join(root, file)
-                prompts = []
-                calls = []
-
-                # Track all common prompt variable names
-                for var_name in PROMPT_VARIABLE_NAMES:
-                    found = trace_variable_in_file(filepath, var_name)
-                    prompts.extend(found)
-
-                # Track API call sites
-                calls = trace_api_calls_in_file(filepath)
-
-                if prompts or calls:
-                    graph_data[filepath] = {
-                        "prompts": prompts,
-                        "api_calls": calls
-                    }
+                yield os.path.join(root, file)
+
+
+def build_project_cpg(directory, workers=None):
+    """
+    Build a Code Property Graph by extracting prompt variables and API call sites.
+
+    Each file is parsed once; with `workers` != 1 and at least
+    PARALLEL_MIN_FILES files, files are summarized across a process pool
+    (`workers` processes, default os.cpu_count()).
+    """
+    filepaths = list(_iter_python_files(directory))
+    if workers == 1 or len(filepaths) < PARALLEL_MIN_FILES:
+        summaries = map(summarize_file, filepaths)
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, min(256, len(filepaths) // (workers * 8)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(summarize_file, filepaths, chunksize=chunksize))
+
+    graph_data = {}
+    for filepath, (prompts, calls) in zip(filepaths, summaries):
+        if prompts or calls:
+            graph_data[filepath] = {
+                "prompts": prompts,
+                "api_calls": calls
+            }
     return graph_data
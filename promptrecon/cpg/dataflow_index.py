@@ -0,0 +1,422 @@
+# file: promptrecon/cpg/dataflow_index.py
+import ast
+import hashlib
+import json
+import os
+
+from .ast_tracker import PROMPT_VARIABLE_NAMES, _api_call, _assigned_source
+
+INDEX_VERSION = 1
+
+# Default location of the persistent index, relative to the project root
+DEFAULT_INDEX_PATH = os.path.join(".promptrecon", "flow_index.json")
+
+SKIP_DIRS = frozenset((".git", ".hg", ".svn", ".promptrecon", "__pycache__", "node_modules",
+                       "venv", ".venv", ".tox", ".nox", "build", "dist"))
+
+# Longest import / assignment chain followed when resolving a reference
+MAX_RESOLVE_DEPTH = 8
+
+# Stored prompt values are truncated to this many characters
+VALUE_PREVIEW_CHARS = 200
+
+_PROMPT_NAMES = frozenset(PROMPT_VARIABLE_NAMES)
+
+
+def is_prompt_name(name):
+    """PROMPT_VARIABLE_NAMES in any case (SYSTEM_PROMPT), or any name containing "prompt"."""
+    lowered = name.lower()
+    return lowered in _PROMPT_NAMES or "prompt" in lowered
+
+
+def module_name(relpath):
+    """pkg/sub/mod.py -> pkg.sub.mod; pkg/__init__.py -> pkg."""
+    parts = relpath.replace(os.sep, "/")[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def _dotted(node):
+    """a.b.c for a Name / Attribute chain rooted at a Name, else None."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _references(nodes):
+    """Dotted names read anywhere inside `nodes` (outermost chain only)."""
+    refs = []
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            dotted = _dotted(node)
+            if dotted:
+                refs.append(dotted)
+                continue
+        stack.extend(ast.iter_child_nodes(node))
+    return sorted(set(refs))
+
+
+class _SummaryVisitor(ast.NodeVisitor):
+    def __init__(self, module, is_package):
+        self.module = module
+        self.is_package = is_package
+        self.prompts = []
+        self.imports = {}
+        self.exports = set()
+        self.derived = {}
+        self.calls = []
+        self._depth = 0  # > 0 inside a function or class body
+
+    def _package(self, level):
+        parts = self.module.split(".") if self.module else []
+        if not self.is_package:
+            parts = parts[:-1]
+        if level > 1:
+            parts = parts[:len(parts) - (level - 1)]
+        return ".".join(parts)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.imports[alias.asname] = {"module": alias.name, "name": None}
+            else:
+                head = alias.name.split(".")[0]
+                self.imports[head] = {"module": head, "name": None}
+            if self._depth == 0:
+                self.exports.add(alias.asname or alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node):
+        base = node.module or ""
+        if node.level:
+            package = self._package(node.level)
+            base = f"{package}.{base}" if package and base else (package or base)
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            bound = alias.asname or alias.name
+            self.imports[bound] = {"module": base, "name": alias.name}
+            if self._depth == 0:
+                self.exports.add(bound)
+
+    def _scoped(self, node):
+        if self._depth == 0:
+            self.exports.add(node.name)
+        self._depth += 1
+        self.generic_visit(node)
+        self._depth -= 1
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _scoped
+
+    def _assign(self, targets, value, lineno):
+        for target in targets:
+            if not isinstance(target, ast.Name):
+                continue
+            name = target.id
+            if self._depth == 0:
+                self.exports.add(name)
+            if is_prompt_name(name):
+                source = _assigned_source(value)
+                self.prompts.append({
+                    "name": name,
+                    "line": lineno,
+                    "module_level": self._depth == 0,
+                    "value": source[:VALUE_PREVIEW_CHARS] if isinstance(source, str) else None,
+                })
+            refs = _references([value])
+            if refs:
+                merged = set(self.derived.get(name, ())) | set(refs)
+                self.derived[name] = sorted(merged)
+
+    def visit_Assign(self, node):
+        self._assign(node.targets, node.value, node.lineno)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        if node.value is not None:
+            self._assign([node.target], node.value, node.lineno)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        call = _api_call(node, _dotted_or_empty)
+        if call:
+            call["refs"] = _references(node.args + [kw.value for kw in node.keywords])
+            self.calls.append(call)
+        self.generic_visit(node)
+
+
+def _dotted_or_empty(node):
+    return _dotted(node) or ""
+
+
+def summarize_source(source, relpath):
+    """
+    Per-file summary used by the index: prompt definitions, imports (bound
+    name -> module / imported name), exported module-level names, names
+    derived from other names by assignment, and LLM API calls with the names
+    their arguments read. Returns None if the file does not parse.
+    """
+    try:
+        tree = ast.parse(source, filename=relpath)
+    except (SyntaxError, ValueError):
+        return None
+    module = module_name(relpath)
+    visitor = _SummaryVisitor(module, relpath.replace(os.sep, "/").endswith("__init__.py"))
+    visitor.visit(tree)
+    return {
+        "module": module,
+        "prompts": visitor.prompts,
+        "imports": visitor.imports,
+        "exports": sorted(visitor.exports),
+        "derived": visitor.derived,
+        "calls": visitor.calls,
+    }
+
+
+class FlowIndex:
+    """
+    Persistent cross-file "prompt variable flows into LLM call" index.
+
+    Holds one summary per .py file under `root`, keyed by the file's content
+    hash; refresh() re-parses only files whose content changed (an unchanged
+    size + mtime skips even the read), and edges() resolves prompt
+    definitions through imports, re-exports and local assignments to the
+    API calls that consume them.
+    """
+
+    def __init__(self, root, index_path=None):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, DEFAULT_INDEX_PATH)
+        self.files = {}
+        self.dirty = False  # in-memory entries differ from the file on disk
+        self._modules = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self):
+        """Atomically write the index (temp file + rename)."""
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+
+    def _walk(self):
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
+            for fname in files:
+                if fname.endswith(".py"):
+                    yield os.path.relpath(os.path.join(root, fname), self.root)
+
+    def refresh(self, paths=None):
+        """
+        Bring the index up to date. With `paths` (relative to root, e.g. the
+        files staged for commit) only those entries are checked; otherwise the
+        whole tree is walked and entries for deleted files are dropped.
+        Returns {"parsed", "unchanged", "removed"} counts.
+        """
+        stats = {"parsed": 0, "unchanged": 0, "removed": 0}
+        if paths is None:
+            relpaths = set(self._walk())
+            for gone in set(self.files) - relpaths:
+                del self.files[gone]
+                stats["removed"] += 1
+        else:
+            relpaths = {os.path.normpath(p) for p in paths if p.endswith(".py")}
+
+        for relpath in sorted(relpaths):
+            full = os.path.join(self.root, relpath)
+            try:
+                st = os.stat(full)
+            except OSError:
+                if self.files.pop(relpath, None) is not None:
+                    stats["removed"] += 1
+                continue
+            entry = self.files.get(relpath)
+            if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+            try:
+                with open(full, "rb") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha1(content).hexdigest()
+            if entry and entry["sha1"] == digest:
+                entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+                self.dirty = True
+                stats["unchanged"] += 1
+                continue
+            self.files[relpath] = {
+                "sha1": digest,
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "summary": summarize_source(content, relpath),
+            }
+            stats["parsed"] += 1
+
+        if stats["parsed"] or stats["removed"]:
+            self.dirty = True
+            self._modules = None
+        return stats
+
+    def refresh_contents(self, contents, removed=()):
+        """
+        Update entries from in-memory file contents ({relpath: bytes}), e.g.
+        the staged blobs a pre-commit hook scans rather than the working tree,
+        and drop the entries of `removed` paths (deleted files, rename sources).
+        Such entries carry no mtime, so the next refresh() compares their hash.
+        Returns {"parsed", "unchanged", "removed"} counts.
+        """
+        stats = {"parsed": 0, "unchanged": 0, "removed": 0}
+        for relpath in removed:
+            if self.files.pop(os.path.normpath(relpath), None) is not None:
+                stats["removed"] += 1
+        for relpath, content in sorted(contents.items()):
+            if not relpath.endswith(".py"):
+                continue
+            relpath = os.path.normpath(relpath)
+            digest = hashlib.sha1(content).hexdigest()
+            entry = self.files.get(relpath)
+            if entry and entry["sha1"] == digest:
+                stats["unchanged"] += 1
+                continue
+            self.files[relpath] = {
+                "sha1": digest,
+                "mtime_ns": None,
+                "size": len(content),
+                "summary": summarize_source(content, relpath),
+            }
+            stats["parsed"] += 1
+        if stats["parsed"] or stats["removed"]:
+            self.dirty = True
+            self._modules = None
+        return stats
+
+    # --- resolution ---
+
+    def _module_map(self):
+        if self._modules is None:
+            self._modules = {}
+            for relpath, entry in self.files.items():
+                summary = entry.get("summary")
+                if summary:
+                    self._modules.setdefault(summary["module"], (relpath, summary))
+            # src/ layouts: also register "pkg.mod" for "src.pkg.mod" when unambiguous
+            for name in list(self._modules):
+                head, _, rest = name.partition(".")
+                if head == "src" and rest:
+                    self._modules.setdefault(rest, self._modules[name])
+        return self._modules
+
+    def _lookup(self, module, name, depth):
+        """Prompt definitions that `name` refers to inside `module`."""
+        target = self._module_map().get(module)
+        if target is None or depth > MAX_RESOLVE_DEPTH:
+            return []
+        relpath, summary = target
+        found = [(relpath, p) for p in summary["prompts"] if p["name"] == name and p["module_level"]]
+        if found:
+            return found
+        imported = summary["imports"].get(name)
+        if imported:
+            return self._resolve_import(imported, [], depth + 1)
+        return self._resolve_refs(relpath, summary, summary["derived"].get(name, ()), depth + 1)
+
+    def _resolve_import(self, imported, rest, depth):
+        modules = self._module_map()
+        module, name = imported["module"], imported["name"]
+        if name is not None:
+            submodule = f"{module}.{name}" if module else name
+            if rest and submodule in modules:
+                return self._resolve_import({"module": submodule, "name": None}, rest, depth)
+            return self._lookup(module, name, depth) if not rest else []
+        # "import pkg.sub as m" then m.X, or "import pkg" then pkg.sub.X
+        for split in range(len(rest) - 1, -1, -1):
+            candidate = ".".join([module] + rest[:split])
+            if candidate in modules:
+                return self._lookup(candidate, rest[split], depth)
+        return []
+
+    def _resolve_refs(self, relpath, summary, refs, depth, seen=None):
+        if depth > MAX_RESOLVE_DEPTH:
+            return []
+        seen = set() if seen is None else seen
+        found = []
+        for ref in refs:
+            if ref in seen:
+                continue
+            seen.add(ref)
+            head, *rest = ref.split(".")
+            if head in summary["imports"]:
+                found.extend(self._resolve_import(summary["imports"][head], rest, depth))
+                continue
+            local = [(relpath, p) for p in summary["prompts"] if p["name"] == head]
+            if local:
+                found.extend(local)
+            elif head in summary["derived"]:
+                found.extend(self._resolve_refs(relpath, summary, summary["derived"][head],
+                                                depth + 1, seen))
+        return found
+
+    def edges(self):
+        """
+        One edge per (prompt definition, API call) pair where the prompt can
+        reach the call's arguments, directly or through imports / assignments.
+        """
+        edges = []
+        for relpath, entry in sorted(self.files.items()):
+            summary = entry.get("summary")
+            if not summary:
+                continue
+            for call in summary["calls"]:
+                seen = set()
+                for prompt_file, prompt in self._resolve_refs(relpath, summary, call["refs"], 0):
+                    key = (prompt_file, prompt["name"], prompt["line"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    edges.append({
+                        "prompt_file": prompt_file,
+                        "prompt_name": prompt["name"],
+                        "prompt_line": prompt["line"],
+                        "prompt_value": prompt["value"],
+                        "call_file": relpath,
+                        "call_name": call["name"],
+                        "call_line": call["line"],
+                        "cross_file": prompt_file != relpath,
+                    })
+        return edges
+
+
+def update_flow_index(root, paths=None, index_path=None, contents=None, removed=()):
+    """
+    Load, refresh and save the index under `root`; returns (index, refresh stats).
+    With `contents` ({relpath: bytes}) those contents are indexed instead of
+    reading `paths` from the working tree, and `removed` paths are dropped.
+    """
+    index = FlowIndex(root, index_path=index_path)
+    if contents is not None:
+        stats = index.refresh_contents(contents, removed)
+    else:
+        stats = index.refresh(paths)
+    if index.dirty or not os.path.exists(index.index_path):
+        index.save()
+    return index, stats
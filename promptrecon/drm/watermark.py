@@ -1,5 +1,134 @@
 # file: promptrecon/drm/watermark.py
 import binascii
+import mmap
+import os
+import re
+
+# Zero-width runs shorter than one encoded character are ignored: single
+# U+200B/U+200C code points occur naturally (e.g. ZWNJ in Persian text)
+MIN_WATERMARK_BITS = 8
+
+# Files at least this large are memory-mapped instead of read
+MMAP_MIN_BYTES = 1024 * 1024
+
+_ZW_RUN_RE = re.compile("[\u200B\u200C]{%d,}" % MIN_WATERMARK_BITS)
+_ZW_BITS = str.maketrans({"\u200B": "0", "\u200C": "1"})
+
+# Same runs matched directly in UTF-8 bytes (E2 80 8B / E2 80 8C), no decoding needed
+_ZW_UTF8 = (b"\xe2\x80\x8b", b"\xe2\x80\x8c")
+_ZW_RUN_BYTES_RE = re.compile(b"(?:\xe2\x80[\x8b\x8c]){%d,}" % MIN_WATERMARK_BITS)
+_ZW_BYTE_BITS = bytes.maketrans(b"\x8b\x8c", b"01")
+
+
+def _bits_to_text(bits):
+    """'0100...' -> text, 8 bits per character as embed_watermark writes them."""
+    usable = len(bits) - len(bits) % 8
+    if not usable:
+        return ""
+    return int(bits[:usable], 2).to_bytes(usable // 8, "big").decode("latin-1")
+
+
+def has_zero_width(text: str) -> bool:
+    """Fast path: True if the text contains any watermark code point at all."""
+    return "\u200B" in text or "\u200C" in text
+
+
+def find_watermarks(text: str) -> list:
+    """
+    Every embedded watermark in a string, as [(offset, tenant_id), ...].
+    Unlike extract_watermark(), separate zero-width runs decode separately,
+    so text pasted together from several tenants' prompts yields each ID.
+    """
+    if not has_zero_width(text):
+        return []
+    return [(m.start(), _bits_to_text(m.group().translate(_ZW_BITS)))
+            for m in _ZW_RUN_RE.finditer(text)]
+
+
+class WatermarkStream:
+    """
+    find_watermarks() over text arriving in pieces (e.g. SSE deltas): a
+    zero-width run at the end of a piece is held back until the next piece
+    shows whether it continues. Pieces without zero-width code points cost a
+    single substring check.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text: str, final: bool = False) -> list:
+        """Tenant IDs of the watermarks completed by this piece (call with final=True at the end)."""
+        if not self._pending and not has_zero_width(text):
+            return []
+        text = self._pending + text
+        self._pending = ""
+        if not final:
+            head = text.rstrip("\u200B\u200C")
+            self._pending = text[len(head):]
+            text = head
+        return [tenant_id for _, tenant_id in find_watermarks(text)]
+
+
+def scan_bytes_for_watermarks(data) -> list:
+    """
+    find_watermarks() over raw UTF-8 bytes (or an mmap) without decoding:
+    returns [{"line", "offset", "tenant_id", "bits"}, ...] (offset in bytes).
+    """
+    if data.find(_ZW_UTF8[0]) < 0 and data.find(_ZW_UTF8[1]) < 0:
+        return []
+    found = []
+    line, last = 1, 0
+    for m in _ZW_RUN_BYTES_RE.finditer(data):
+        line += data[last:m.start()].count(b"\n")  # slice: mmap has no count()
+        last = m.start()
+        bits = m.group()[2::3].translate(_ZW_BYTE_BITS).decode("ascii")
+        found.append({"line": line, "offset": m.start(),
+                      "tenant_id": _bits_to_text(bits), "bits": len(bits)})
+    return found
+
+
+def scan_stream_for_watermarks(stream, chunk_size=1024 * 1024) -> list:
+    """
+    scan_bytes_for_watermarks() over a binary stream (e.g. stdin) read in
+    chunks; a zero-width run cut by a chunk boundary is held back and
+    completed by the next chunk, so results match a whole-buffer scan.
+    """
+    found = []
+    carry = b""
+    base, line_base = 0, 1  # absolute offset / line number of carry[0]
+    while True:
+        chunk = stream.read(chunk_size)
+        data = carry + chunk
+        cut = len(data)
+        if chunk:
+            if data.endswith(b"\xe2\x80"):
+                cut -= 2
+            elif data.endswith(b"\xe2"):
+                cut -= 1
+            while cut >= 3 and data[cut - 3:cut] in _ZW_UTF8:
+                cut -= 3
+        for hit in scan_bytes_for_watermarks(data[:cut]):
+            hit["line"] += line_base - 1
+            hit["offset"] += base
+            found.append(hit)
+        if not chunk:
+            return found
+        line_base += data.count(b"\n", 0, cut)
+        base += cut
+        carry = data[cut:]
+
+
+def scan_file_for_watermarks(filepath) -> list:
+    """scan_bytes_for_watermarks() for a file; large files are memory-mapped."""
+    with open(filepath, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        if size < MMAP_MIN_BYTES:
+            return scan_bytes_for_watermarks(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan_bytes_for_watermarks(data)
+
 
 class PromptWatermarker:
     """
@@ -42,21 +171,11 @@ class PromptWatermarker:
         """
         Attempt to extract a tenant ID from zero-width characters in the text.
         """
-        binary_str = ""
-        for char in text:
-            if char in self.REV_MAP:
-                binary_str += self.REV_MAP[char]
-                
-        if not binary_str:
+        if not has_zero_width(text):
             return None
-            
-        # Reconstruct characters
-        chars = []
-        for i in range(0, len(binary_str), 8):
-            byte = binary_str[i:i+8]
-            if len(byte) == 8:
-                chars.append(chr(int(byte, 2)))
-        return "".join(chars)
+        # Keep only the zero-width code points, then map them to bits in C
+        binary_str = re.sub("[^\u200B\u200C]+", "", text).translate(_ZW_BITS)
+        return _bits_to_text(binary_str)
 
 # Example:
 # wm = PromptWatermarker("my_corp_x1")
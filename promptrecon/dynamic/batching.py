@@ -0,0 +1,79 @@
+# file: promptrecon/dynamic/batching.py
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces scoring requests from concurrent handlers into micro-batches.
+
+    Texts submitted while a batch is open are collected until either
+    `max_batch_size` texts are pending or `max_wait_ms` has elapsed since the
+    first one arrived; the whole batch is then scored by a single call of
+    `score_fn(texts) -> list[float]` on `executor`, so the event loop never
+    runs model inference itself.
+    """
+
+    def __init__(self, score_fn, executor, max_batch_size=32, max_wait_ms=5.0):
+        self.score_fn = score_fn
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._pending = []  # [(text, future), ...]
+        self._timer = None
+
+    async def score_many(self, texts):
+        """Score `texts`, sharing encode calls with other concurrent callers."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await asyncio.gather(*futures)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        texts = [text for text, _ in batch]
+        try:
+            task = loop.run_in_executor(self.executor, self.score_fn, texts)
+        except Exception as e:
+            # e.g. the executor was shut down; fail the callers instead of hanging them
+            self._fail(batch, e)
+            return
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future in batch:
+            if not future.done():  # caller may have been cancelled
+                future.set_exception(error)
+
+    @classmethod
+    def _resolve(cls, batch, done):
+        if done.cancelled():
+            cls._fail(batch, asyncio.CancelledError())
+            return
+        error = done.exception()
+        if error is not None:
+            cls._fail(batch, error)
+            return
+        scores = list(done.result())
+        if len(scores) != len(batch):
+            cls._fail(batch, ValueError(
+                f"score_fn returned {len(scores)} scores for {len(batch)} texts"))
+            return
+        for (_, future), score in zip(batch, scores):
+            if not future.done():  # caller was cancelled
+                future.set_result(score)
@@ -0,0 +1,105 @@
+# file: promptrecon/dynamic/cache.py
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WS_RE = re.compile(r"\s+")
+
+
+def content_key(text: str) -> bytes:
+    """Hash of whitespace-normalized message content, used as a cache key."""
+    normalized = _WS_RE.sub(" ", text).strip()
+    return hashlib.blake2b(normalized.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def prefix_keys(segments) -> list:
+    """
+    Cumulative hashes over a sequence of segments (lists of strings): key i
+    identifies segments[0..i] exactly, so a conversation that only appends
+    messages shares every earlier key with its previous turn.
+    """
+    keys = []
+    digest = b""
+    for segment in segments:
+        h = hashlib.blake2b(digest, digest_size=16)
+        h.update(len(segment).to_bytes(4, "little"))
+        for text in segment:
+            data = text.encode("utf-8", "surrogatepass")
+            h.update(len(data).to_bytes(8, "little"))
+            h.update(data)
+        digest = h.digest()
+        keys.append(digest)
+    return keys
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache with per-entry expiry and hit/miss counters.
+    maxsize <= 0 disables caching; ttl <= 0 means entries never expire.
+    """
+
+    def __init__(self, maxsize=10000, ttl=3600.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, record=True):
+        """Look up `key`; record=False leaves the hit/miss counters untouched."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    if record:
+                        self.hits += 1
+                    return value
+                del self._data[key]
+            if record:
+                self.misses += 1
+            return default
+
+    def record(self, hit: bool):
+        """Count a hit or miss for lookups made with record=False."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
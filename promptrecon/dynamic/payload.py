@@ -0,0 +1,134 @@
+# file: promptrecon/dynamic/payload.py
+import json
+from collections import namedtuple
+
+try:
+    import ijson  # optional: incremental parsing for very large request bodies
+except ImportError:
+    ijson = None
+
+# Top-level request fields that carry prompt text across the common LLM APIs:
+# chat `messages`, Responses/embeddings `input`, completions `prompt`,
+# Responses `instructions`, Anthropic `system`.
+TEXT_FIELDS = ("messages", "input", "prompt", "instructions", "system")
+
+# Keys below a text field whose values are metadata or binary, not prompt text
+SKIP_KEYS = frozenset((
+    "role", "type", "name", "id", "tool_call_id", "call_id", "status",
+    "url", "image_url", "data", "media_type", "mime_type", "detail",
+    "file_id", "cache_control",
+))
+
+_MAX_DEPTH = 32
+
+
+def _iter_leaves(value, depth=0):
+    if isinstance(value, str):
+        if value:
+            yield value
+    elif depth >= _MAX_DEPTH:
+        return
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_leaves(item, depth + 1)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if key not in SKIP_KEYS:
+                yield from _iter_leaves(item, depth + 1)
+
+
+# Prompt text grouped by origin; `role` is the message role, or "system" /
+# "input" for the top-level instruction and input fields
+Segment = namedtuple("Segment", "role texts")
+
+# Roles whose text is the operator's confidential prompt
+SYSTEM_ROLES = frozenset(("system", "developer"))
+
+_SYSTEM_FIELDS = ("instructions", "system")
+_INPUT_FIELDS = ("input", "prompt")
+
+
+def iter_payload_segments(payload):
+    """
+    Yield the prompt-bearing strings of a parsed request grouped into segments:
+    first the top-level instruction fields (`instructions`, `system`), then the
+    top-level input fields (`input`, `prompt`), then one segment per entry of
+    `messages`. Covers message content and content parts, tool-call arguments,
+    etc. Other fields (model, temperature, ...) and metadata keys are never
+    visited, and nothing is repr()'d.
+    """
+    if not isinstance(payload, dict):
+        return
+    for role, fields in (("system", _SYSTEM_FIELDS), ("input", _INPUT_FIELDS)):
+        texts = []
+        for field in fields:
+            if field in payload:
+                texts.extend(_iter_leaves(payload[field]))
+        yield Segment(role, texts)
+
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        for msg in messages:
+            role = msg.get("role") if isinstance(msg, dict) else None
+            yield Segment(role, list(_iter_leaves(msg, 1)))
+    elif messages is not None:
+        yield Segment(None, list(_iter_leaves(messages)))
+
+
+def iter_payload_strings(payload):
+    """Yield all prompt-bearing string leaves of a parsed request."""
+    for segment in iter_payload_segments(payload):
+        yield from segment.texts
+
+
+def _body_segments_streaming(body: bytes) -> list:
+    # ijson emits one event per JSON token; prefixes look like
+    # "messages.item.content" or "messages.item.tool_calls.item.function.arguments"
+    header = {"system": [], "input": []}
+    messages = []  # [role, texts] per message
+    for prefix, event, value in ijson.parse(body):
+        if prefix == "messages.item" and event in ("start_map", "start_array", "string"):
+            messages.append([None, []])
+        if event != "string" or not value:
+            continue
+        if prefix == "messages.item.role" and messages:
+            messages[-1][0] = value
+            continue
+        parts = prefix.split(".")
+        if parts[0] not in TEXT_FIELDS or not SKIP_KEYS.isdisjoint(parts[1:]):
+            continue
+        if parts[0] == "messages" and messages:
+            messages[-1][1].append(value)
+        elif parts[0] in _SYSTEM_FIELDS:
+            header["system"].append(value)
+        else:
+            header["input"].append(value)
+    return ([Segment(role, header[role]) for role in ("system", "input")]
+            + [Segment(role, texts) for role, texts in messages])
+
+
+def extract_body_segments(body: bytes, stream_threshold: int = 1024 * 1024) -> list:
+    """
+    Extract prompt-bearing strings from a raw JSON request body as a list of
+    Segment, as in iter_payload_segments(). Bodies larger than
+    `stream_threshold` are parsed incrementally when the optional `ijson`
+    package is installed, so no full object tree is built.
+    Raises ValueError if the body is not JSON.
+    """
+    if ijson is not None and len(body) > stream_threshold:
+        try:
+            return _body_segments_streaming(body)
+        except Exception as e:
+            raise ValueError(f"Invalid JSON body: {e}") from e
+    return list(iter_payload_segments(json.loads(body)))
+
+
+def extract_body_strings(body: bytes, stream_threshold: int = 1024 * 1024) -> list:
+    """Flat list of the strings returned by extract_body_segments()."""
+    return [text for segment in extract_body_segments(body, stream_threshold)
+            for text in segment.texts]
+
+
+def iter_response_strings(obj):
+    """Yield the text-bearing string leaves of a parsed (non-streamed) LLM response."""
+    yield from _iter_leaves(obj)
@@ -2,13 +2,28 @@
 import subprocess
 import os
 import json
+import codecs
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import unquote_plus
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 import httpx
 import uvicorn
 
-app = FastAPI(title="Prompt-Recon Sentinel Proxy")
+from ..core import scan_content, load_rules_from_dir
+from ..drm.watermark import WatermarkStream, find_watermarks, has_zero_width
+from ..rules.builtin import load_builtin_rules
+from .batching import MicroBatcher
+from .cache import TTLCache, content_key, prefix_keys
+from .metrics import Registry, SIZE_BUCKETS, BATCH_BUCKETS
+from .payload import extract_body_segments, iter_payload_strings, iter_response_strings, SYSTEM_ROLES
+from .stream_scan import StreamingMatcher, SSETextExtractor
 
 # Sentinel is designed to sit between the app and the LLM API.
 # In a real deployed environment, it would intercept traffic on the network layer
@@ -16,91 +31,549 @@ app = FastAPI(title="Prompt-Recon Sentinel Proxy")
 
 OAI_BASE_URL = "https://api.openai.com"
 
-# Lazy-load vector detector when first needed
+# Upstream connection settings. Defaults can be overridden by environment
+# variables or by keyword arguments to run_sentinel().
+UPSTREAM_CONFIG = {
+    "base_url": os.environ.get("PROMPTRECON_UPSTREAM_URL", OAI_BASE_URL),
+    "max_connections": int(os.environ.get("PROMPTRECON_UPSTREAM_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.environ.get("PROMPTRECON_UPSTREAM_MAX_KEEPALIVE", "20")),
+    "keepalive_expiry": float(os.environ.get("PROMPTRECON_UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+    "connect_timeout": float(os.environ.get("PROMPTRECON_UPSTREAM_CONNECT_TIMEOUT", "10")),
+    "timeout": float(os.environ.get("PROMPTRECON_UPSTREAM_TIMEOUT", "60")),
+    "http2": os.environ.get("PROMPTRECON_UPSTREAM_HTTP2", "") == "1",
+}
+
+# Inspection settings: size of the worker pool that runs payload inspection off
+# the event loop, and how detector calls from concurrent requests are batched.
+INSPECTION_CONFIG = {
+    "workers": int(os.environ.get("PROMPTRECON_INSPECT_WORKERS", "4")),
+    "max_batch_size": int(os.environ.get("PROMPTRECON_INSPECT_MAX_BATCH", "32")),
+    "max_wait_ms": float(os.environ.get("PROMPTRECON_INSPECT_MAX_WAIT_MS", "5")),
+    "similarity_threshold": float(os.environ.get("PROMPTRECON_SIMILARITY_THRESHOLD", "0.75")),
+    # "sentence-transformers" or "hashing" (offline, no model download)
+    "embedding_backend": os.environ.get("PROMPTRECON_EMBEDDING_BACKEND", "sentence-transformers"),
+    # LRU of similarity scores keyed by normalized message hash; production
+    # traffic resends the same system prompt in nearly every request
+    "cache_size": int(os.environ.get("PROMPTRECON_SCORE_CACHE_SIZE", "10000")),
+    "cache_ttl": float(os.environ.get("PROMPTRECON_SCORE_CACHE_TTL", "3600")),
+    # Cumulative hashes of conversation prefixes that already passed inspection;
+    # only the new suffix of a resent conversation is inspected
+    "prefix_cache_size": int(os.environ.get("PROMPTRECON_PREFIX_CACHE_SIZE", "50000")),
+    "prefix_cache_ttl": float(os.environ.get("PROMPTRECON_PREFIX_CACHE_TTL", "3600")),
+    # Extra rule plugins on top of the builtin ruleset (same format as `scan --rules-dir`)
+    "rules_dir": os.environ.get("PROMPTRECON_RULES_DIR") or None,
+    # Bodies above max_body_bytes are not inspected; oversize_action decides
+    # whether they are blocked ("block") or forwarded uninspected ("allow")
+    "max_body_bytes": int(os.environ.get("PROMPTRECON_MAX_BODY_BYTES", str(8 * 1024 * 1024))),
+    "oversize_action": os.environ.get("PROMPTRECON_OVERSIZE_ACTION", "block"),
+    # Bodies above this size are parsed incrementally when `ijson` is installed
+    "stream_parse_bytes": int(os.environ.get("PROMPTRECON_STREAM_PARSE_BYTES", str(1024 * 1024))),
+    # Response scanning: rules plus system-prompt echo detection (runs of
+    # echo_min_chars copied from the request's system prompt; 0 disables).
+    # response_action "terminate" cuts the stream / withholds the body on a hit.
+    "response_scan": os.environ.get("PROMPTRECON_RESPONSE_SCAN", "1") == "1",
+    "response_action": os.environ.get("PROMPTRECON_RESPONSE_ACTION", "log"),
+    "response_overlap": int(os.environ.get("PROMPTRECON_RESPONSE_OVERLAP", "256")),
+    "echo_min_chars": int(os.environ.get("PROMPTRECON_ECHO_MIN_CHARS", "64")),
+    # Zero-width tenant watermarks (drm.watermark) in requests and responses.
+    # The request's tenant is tenant_id; a watermark of any other tenant is a
+    # mismatch, which watermark_action "block" rejects (requests) or cuts off
+    # (responses) instead of logging. The tenant_header value overrides
+    # tenant_id only for clients listed in tenant_header_trusted (client
+    # addresses, or "*" for any client, e.g. behind an authenticating
+    # gateway); otherwise any caller could claim another tenant's watermark.
+    "watermark_check": os.environ.get("PROMPTRECON_WATERMARK_CHECK", "1") == "1",
+    "tenant_id": os.environ.get("PROMPTRECON_TENANT_ID") or None,
+    "tenant_header": os.environ.get("PROMPTRECON_TENANT_HEADER", "x-promptrecon-tenant"),
+    "tenant_header_trusted": [
+        h.strip() for h in os.environ.get("PROMPTRECON_TENANT_HEADER_TRUSTED", "").split(",") if h.strip()
+    ],
+    "watermark_action": os.environ.get("PROMPTRECON_WATERMARK_ACTION", "log"),
+}
+
+# Overrides passed to run_sentinel() by a parent process (multi-worker mode)
+_OPTIONS_ENV = "PROMPTRECON_SENTINEL_OPTIONS"
+
+
+def _apply_options(options: dict):
+    configs = (UPSTREAM_CONFIG, INSPECTION_CONFIG)
+    unknown = [k for k in options if not any(k in cfg for cfg in configs)]
+    if unknown:
+        raise TypeError(f"Unknown sentinel option(s): {', '.join(sorted(unknown))}")
+    for key, value in options.items():
+        for cfg in configs:
+            if key in cfg:
+                cfg[key] = value
+
+
+_apply_options(json.loads(os.environ.get(_OPTIONS_ENV) or "{}"))
+
+# Shared upstream client, created on app startup and closed on shutdown
+_upstream_client = None
+
+# Bounded inspection pool and detector micro-batcher, also tied to the app lifespan
+_inspection_pool = None
+_batcher = None
+_score_cache = None
+_prefix_cache = None
+
+
+def _create_upstream_client() -> httpx.AsyncClient:
+    cfg = UPSTREAM_CONFIG
+    limits = httpx.Limits(
+        max_connections=cfg["max_connections"],
+        max_keepalive_connections=cfg["max_keepalive_connections"],
+        keepalive_expiry=cfg["keepalive_expiry"],
+    )
+    timeout = httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"])
+    # http2=True needs the optional `h2` package (pip install httpx[http2])
+    return httpx.AsyncClient(
+        base_url=cfg["base_url"],
+        limits=limits,
+        timeout=timeout,
+        http2=cfg["http2"],
+    )
+
+
+def get_upstream_client() -> httpx.AsyncClient:
+    """Return the pooled upstream client, creating it if startup was skipped."""
+    global _upstream_client
+    if _upstream_client is None or _upstream_client.is_closed:
+        _upstream_client = _create_upstream_client()
+    return _upstream_client
+
+
+def get_inspection_pool() -> ThreadPoolExecutor:
+    global _inspection_pool
+    if _inspection_pool is None:
+        _inspection_pool = ThreadPoolExecutor(
+            max_workers=INSPECTION_CONFIG["workers"],
+            thread_name_prefix="sentinel-inspect",
+        )
+    return _inspection_pool
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _score_texts,
+            get_inspection_pool(),
+            max_batch_size=INSPECTION_CONFIG["max_batch_size"],
+            max_wait_ms=INSPECTION_CONFIG["max_wait_ms"],
+        )
+    return _batcher
+
+
+def get_score_cache() -> TTLCache:
+    global _score_cache
+    if _score_cache is None:
+        _score_cache = TTLCache(INSPECTION_CONFIG["cache_size"], INSPECTION_CONFIG["cache_ttl"])
+    return _score_cache
+
+
+def get_prefix_cache() -> TTLCache:
+    global _prefix_cache
+    if _prefix_cache is None:
+        _prefix_cache = TTLCache(
+            INSPECTION_CONFIG["prefix_cache_size"], INSPECTION_CONFIG["prefix_cache_ttl"]
+        )
+    return _prefix_cache
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    global _upstream_client, _inspection_pool, _batcher, _score_cache, _prefix_cache
+    _upstream_client = _create_upstream_client()
+    get_batcher()
+    try:
+        yield
+    finally:
+        client, _upstream_client = _upstream_client, None
+        if client is not None:
+            await client.aclose()
+        pool, _inspection_pool, _batcher = _inspection_pool, None, None
+        _score_cache = _prefix_cache = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Prompt-Recon Sentinel Proxy", lifespan=_lifespan)
+
+
+def _cache_stats(stat):
+    def collect():
+        samples = []
+        for name, cache in (("score", _score_cache), ("prefix", _prefix_cache)):
+            stats = cache.stats() if cache is not None else {"hit_rate": 0.0, "size": 0}
+            samples.append(({"cache": name}, stats[stat]))
+        return samples
+    return collect
+
+
+# In-process metrics, served in Prometheus text format at /metrics
+METRICS = Registry()
+REQUESTS = METRICS.counter("sentinel_requests_total", "Proxied requests by outcome", label="outcome")
+BLOCKS = METRICS.counter("sentinel_blocked_total", "Blocked requests by reason", label="reason")
+INSPECTION_SECONDS = METRICS.histogram(
+    "sentinel_inspection_seconds", "Time spent inspecting a request body")
+UPSTREAM_SECONDS = METRICS.histogram(
+    "sentinel_upstream_seconds", "Upstream latency until response headers")
+STREAM_TTFB_SECONDS = METRICS.histogram(
+    "sentinel_stream_ttfb_seconds", "Time from request arrival to the first relayed stream chunk")
+REQUEST_BYTES = METRICS.histogram(
+    "sentinel_request_bytes", "Request body size", buckets=SIZE_BUCKETS)
+RESPONSE_BYTES = METRICS.histogram(
+    "sentinel_response_bytes", "Response body size", buckets=SIZE_BUCKETS)
+RESPONSE_LEAKS = METRICS.counter(
+    "sentinel_response_leaks_total", "Leaks detected in upstream responses by rule", label="rule")
+RESPONSE_SCAN_SECONDS = METRICS.histogram(
+    "sentinel_response_scan_seconds", "Scan time per response chunk")
+WATERMARKS = METRICS.counter(
+    "sentinel_watermarks_total", "Tenant watermarks seen, by direction and outcome", label="outcome")
+DETECTOR_BATCH_SIZE = METRICS.histogram(
+    "sentinel_detector_batch_size", "Texts per vector detector call", buckets=BATCH_BUCKETS)
+METRICS.gauge("sentinel_cache_hit_ratio", "Inspection cache hit ratio", _cache_stats("hit_rate"))
+METRICS.gauge("sentinel_cache_entries", "Inspection cache entries", _cache_stats("size"))
+
+# Hop-by-hop headers (RFC 7230 6.1) must not be forwarded by a proxy
+_HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+}
+# Streamed bodies are re-framed and relayed decoded, so length/encoding no longer apply
+_DECODED_BODY_HEADERS = ("content-length", "content-encoding")
+
+
+def _filter_headers(headers, drop=()) -> dict:
+    """Copy headers minus hop-by-hop entries and any extra names in `drop`."""
+    excluded = _HOP_BY_HOP_HEADERS.union(drop)
+    # Headers named in a Connection header are hop-by-hop too
+    for token in headers.get("connection", "").split(","):
+        excluded.add(token.strip().lower())
+    return {k: v for k, v in headers.items() if k.lower() not in excluded}
+
+# Lazy-load vector detector when first needed. Loading happens on inspection
+# pool threads, so it is guarded by a lock to avoid loading the model twice.
 _vector_detector = None
+_vector_detector_lock = threading.Lock()
 
 def get_vector_detector():
     """Lazily initialize the vector detector."""
     global _vector_detector
     if _vector_detector is None:
-        try:
-            from ..ml.vector_analyzer import VectorAnomalyDetector
-            _vector_detector = VectorAnomalyDetector()
-        except Exception as e:
-            print(f"[WARNING] Failed to load VectorAnomalyDetector: {e}")
-            _vector_detector = False
+        with _vector_detector_lock:
+            if _vector_detector is None:
+                try:
+                    from ..ml.vector_analyzer import VectorAnomalyDetector
+                    _vector_detector = VectorAnomalyDetector(
+                        backend=INSPECTION_CONFIG["embedding_backend"]
+                    )
+                except Exception as e:
+                    print(f"[WARNING] Failed to load VectorAnomalyDetector: {e}")
+                    _vector_detector = False
     return _vector_detector if _vector_detector else None
 
+# Same precompiled ruleset as the offline scanner, loaded once per process
+_rules = None
+_rules_lock = threading.Lock()
+
+def get_rules() -> dict:
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                rules = load_builtin_rules()
+                if INSPECTION_CONFIG["rules_dir"]:
+                    rules.update(load_rules_from_dir(INSPECTION_CONFIG["rules_dir"]))
+                _rules = rules
+    return _rules
+
+
+def _rule_hit(texts: list):
+    """Return the name of the first rule matching any text, or None."""
+    rules = get_rules()
+    for text in texts:
+        hits = scan_content(text, rules)
+        if hits:
+            return hits[0]["rule_name"]
+    return None
+
+
+def _score_texts(texts: list) -> list:
+    """
+    Score a batch of texts with one detector call. Runs on the inspection pool.
+    Without a detector every score is None (unscored), which is never cached.
+    """
+    detector = get_vector_detector()
+    if not detector:
+        return [None] * len(texts)
+    # Concurrent requests often carry the same system prompt; encode it once
+    unique = list(dict.fromkeys(texts))
+    DETECTOR_BATCH_SIZE.observe(len(unique))
+    scores = dict(zip(unique, detector.calculate_similarity_batch(unique)))
+    return [scores[t] for t in texts]
+
+
+def _lookup_scores(keys: list):
+    """Return cached scores (None for misses) and the indices that missed."""
+    cache = get_score_cache()
+    scores = [cache.get(k) for k in keys]
+    return scores, [i for i, score in enumerate(scores) if score is None]
+
+
+def _store_scores(keys: list, scores: list, indices: list, fresh: list) -> bool:
+    """Fill in and cache fresh scores; returns True if any text went unscored."""
+    cache = get_score_cache()
+    unscored = False
+    for i, score in zip(indices, fresh):
+        if score is None:
+            # No detector loaded: count as clean for now, but do not cache it,
+            # so the text is scored once a detector is available
+            scores[i] = 0.0
+            unscored = True
+            continue
+        scores[i] = score
+        cache.set(keys[i], score)
+    return unscored
+
+
 def analyze_payload_for_leaks(payload: dict) -> bool:
     """
     Check if the outgoing payload contains high-risk prompt patterns.
-    Uses both keyword matching and vector anomaly detection.
+    Uses both the core ruleset and vector anomaly detection.
+    Synchronous; the proxy itself goes through inspect_body().
     """
-    # Keyword-based detection
-    dumps = str(payload).lower()
-    if "admin_password" in dumps or "system_prompt: you are a highly confidential" in dumps:
+    texts = list(iter_payload_strings(payload))
+
+    # Rule-based detection
+    if _rule_hit(texts):
         return True
 
-    # Try vector-based detection
-    detector = get_vector_detector()
-    if detector:
-        try:
-            # Extract message content from common payload formats
-            messages = payload.get("messages", [])
-            if isinstance(messages, list):
-                for msg in messages:
-                    content = msg.get("content", "") if isinstance(msg, dict) else str(msg)
-                    if detector.is_anomalous_prompt(content):
-                        return True
-        except Exception:
-            pass
-
-    return False
-
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    # Try vector-based detection, reusing cached scores for repeated messages
+    if not texts:
+        return False
+    keys = [content_key(t) for t in texts]
+    scores, missing = _lookup_scores(keys)
+    if missing:
+        _store_scores(keys, scores, missing, _score_texts([texts[i] for i in missing]))
+    threshold = INSPECTION_CONFIG["similarity_threshold"]
+    return any(score >= threshold for score in scores)
+
+
+def _cleared_prefix_length(chain: list) -> int:
+    """Number of leading segments covered by the longest already-cleared prefix."""
+    cache = get_prefix_cache()
+    for i in range(len(chain) - 1, -1, -1):
+        if cache.get(chain[i], record=False):
+            cache.record(True)
+            return i + 1
+    cache.record(False)
+    return 0
+
+
+def _request_watermarks(segments) -> list:
+    """
+    Tenant IDs watermarked into any request string, cleared prefix included
+    (a cleared conversation replayed by another tenant must still be caught).
+    Strings without zero-width code points are skipped by a substring check.
+    """
+    return [tenant_id for segment in segments for text in segment.texts
+            if has_zero_width(text) for _, tenant_id in find_watermarks(text)]
+
+
+def _raw_body_watermarks(body: bytes) -> list:
+    """Tenant IDs watermarked anywhere in a non-JSON body (form bodies are percent-decoded)."""
+    if not INSPECTION_CONFIG["watermark_check"]:
+        return []
+    text = body.decode("utf-8", errors="replace")
+    if "%" in text:
+        text = unquote_plus(text)
+    return [tenant_id for _, tenant_id in find_watermarks(text)]
+
+
+def _watermark_mismatch(direction, watermarks, tenant, path) -> bool:
+    """Record watermarks seen; returns True if a foreign one must be blocked."""
+    foreign = sorted({t for t in watermarks if t != tenant}) if tenant else []
+    for tenant_id in watermarks:
+        status = "unverified" if not tenant else ("match" if tenant_id == tenant else "mismatch")
+        WATERMARKS.inc(f"{direction}_{status}")
+    if not foreign:
+        return False
+    print(f"[SENTINEL WATERMARK] {direction} for tenant {tenant!r} on /{path} carries "
+          f"watermark(s) of {', '.join(map(repr, foreign))}")
+    return INSPECTION_CONFIG["watermark_action"] == "block"
+
+
+def _prepare_inspection(body: bytes):
+    """
+    Extract prompt strings from a request body and run the ruleset over those
+    not already cleared as part of an earlier conversation prefix.
+    Returns (block_reason, texts_to_score, cache_keys, prefix_key,
+    system_texts, watermarks).
+    """
+    try:
+        segments = extract_body_segments(body, INSPECTION_CONFIG["stream_parse_bytes"])
+    except ValueError:
+        # Not JSON or unable to parse - let it pass through, but a plain-text or
+        # form body can still carry another tenant's watermark
+        return None, [], [], None, [], _raw_body_watermarks(body)
+    watermarks = _request_watermarks(segments) if INSPECTION_CONFIG["watermark_check"] else []
+    chain = prefix_keys([segment.texts for segment in segments])
+    start = _cleared_prefix_length(chain)
+    texts = [text for segment in segments[start:] for text in segment.texts]
+    rule_name = _rule_hit(texts)
+    if rule_name:
+        return f"rule:{rule_name}", [], [], None, [], watermarks
+    system_texts = [text for segment in segments if segment.role in SYSTEM_ROLES
+                    for text in segment.texts]
+    return (None, texts, [content_key(t) for t in texts],
+            chain[-1] if chain else None, system_texts, watermarks)
+
+
+async def inspect_body(body: bytes, tenant: str = None, path: str = ""):
+    """
+    Inspect a request body without blocking the event loop: parsing and rule
+    matching run on the inspection pool, and extracted texts are scored through
+    the shared micro-batcher together with those of concurrent requests.
+    Returns (block_reason, system_texts): block_reason is None if the request
+    may be forwarded; system_texts are the request's system prompt strings,
+    watched for in the response. `tenant` is checked against any watermarks.
+    """
+    if len(body) > INSPECTION_CONFIG["max_body_bytes"]:
+        return ("oversize" if INSPECTION_CONFIG["oversize_action"] == "block" else None), []
+
+    loop = asyncio.get_running_loop()
+    reason, texts, keys, prefix_key, system_texts, watermarks = await loop.run_in_executor(
+        get_inspection_pool(), _prepare_inspection, body
+    )
+    if watermarks and _watermark_mismatch("request", watermarks, tenant, path) and not reason:
+        reason = "watermark"
+    if reason:
+        return reason, []
+    unscored = False
+    if texts:
+        scores, missing = _lookup_scores(keys)
+        if missing:
+            fresh = await get_batcher().score_many([texts[i] for i in missing])
+            unscored = _store_scores(keys, scores, missing, fresh)
+        threshold = INSPECTION_CONFIG["similarity_threshold"]
+        if any(score >= threshold for score in scores):
+            return "similarity", []
+    # The whole conversation is clean; the next turn only needs its new messages.
+    # A prefix that was never scored is not cleared, or a detector loaded later
+    # would skip it.
+    if prefix_key is not None and not unscored:
+        get_prefix_cache().set(prefix_key, True)
+    return None, system_texts
+
+
+def _response_matcher(system_texts):
+    if not INSPECTION_CONFIG["response_scan"]:
+        return None
+    return StreamingMatcher(
+        get_rules(),
+        protected_texts=system_texts,
+        overlap=INSPECTION_CONFIG["response_overlap"],
+        echo_chars=INSPECTION_CONFIG["echo_min_chars"],
+    )
+
+
+def _report_response_leak(path, hits) -> bool:
+    """Record response hits; returns True if the response must be cut off."""
+    for hit in hits:
+        RESPONSE_LEAKS.inc(hit)
+    print(f"[SENTINEL LEAK] Upstream response from /{path} matched: {', '.join(hits)}")
+    return INSPECTION_CONFIG["response_action"] == "terminate"
+
+
+def _request_tenant(request: Request):
+    """The configured tenant_id, or the tenant header if the client is trusted to set it."""
+    trusted = INSPECTION_CONFIG["tenant_header_trusted"]
+    if isinstance(trusted, str):  # run_sentinel(tenant_header_trusted="10.0.0.5,10.0.0.6")
+        trusted = [h.strip() for h in trusted.split(",") if h.strip()]
+    claimed = request.headers.get(INSPECTION_CONFIG["tenant_header"].lower())
+    if claimed and trusted:
+        client = request.client.host if request.client else None
+        if "*" in trusted or client in trusted:
+            return claimed
+    return INSPECTION_CONFIG["tenant_id"]
+
+
+_PROXY_METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH"]
+
+
+# Registered before the catch-all proxy route, for every proxied method, so
+# /metrics is always served here and never forwarded upstream
+@app.api_route("/metrics", methods=_PROXY_METHODS)
+async def metrics(request: Request):
+    if request.method != "GET":
+        return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET"})
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.api_route("/{path:path}", methods=_PROXY_METHODS)
 async def proxy_to_llm(request: Request, path: str):
     """
     Proxy request to actual LLM provider, inspecting payload first.
     """
+    started = time.perf_counter()
     body = await request.body()
+    REQUEST_BYTES.observe(len(body))
+    tenant_header = INSPECTION_CONFIG["tenant_header"].lower()
+    tenant = _request_tenant(request)
 
     # 1. Inspect
     try:
-        payload = json.loads(body)
-        is_leaking = analyze_payload_for_leaks(payload)
-        if is_leaking:
-            print(f"[SENTINEL BLOCKED] High-risk prompt detected in runtime payload to /{path}")
-            raise HTTPException(status_code=403, detail="Prompt-Recon Sentinel: Request blocked due to data leak policy.")
-    except HTTPException:
-        raise
+        block_reason, system_texts = await inspect_body(body, tenant, path)
     except Exception:
-        pass  # Not JSON or unable to parse - let it pass through
-
-    # 2. Forward if safe
-    url = f"{OAI_BASE_URL}/{path}"
-    headers = dict(request.headers)
-    headers.pop("host", None)  # Let httpx handle host
-
-    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
-        response = await client.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            content=body
-        )
+        block_reason, system_texts = None, []
+    inspected = time.perf_counter()
+    INSPECTION_SECONDS.observe(inspected - started)
+    if block_reason:
+        REQUESTS.inc("blocked")
+        BLOCKS.inc(block_reason)
+        print(f"[SENTINEL BLOCKED] High-risk prompt detected in runtime payload to /{path} ({block_reason})")
+        raise HTTPException(status_code=403, detail="Prompt-Recon Sentinel: Request blocked due to data leak policy.")
+
+    # 2. Forward if safe, reusing pooled upstream connections
+    client = get_upstream_client()
+    upstream_request = client.build_request(
+        method=request.method,
+        url=f"/{path}",
+        params=request.url.query or None,
+        headers=_filter_headers(request.headers, drop=("host", tenant_header)),
+        content=body
+    )
+    response = await client.send(upstream_request, stream=True)
+    UPSTREAM_SECONDS.observe(time.perf_counter() - inspected)
+    REQUESTS.inc("forwarded")
 
-    # Handle streaming responses
+    # Handle streaming responses: relay chunks as they arrive. The upstream
+    # response stays open until the downstream body finishes (or the client
+    # disconnects), and each chunk is only pulled after the previous one has
+    # been sent, so a slow reader applies backpressure to the upstream.
+    matcher = _response_matcher(system_texts)
+    watermarks = WatermarkStream() if INSPECTION_CONFIG["watermark_check"] else None
     content_type = response.headers.get("content-type", "")
     if "text/event-stream" in content_type or "stream" in content_type:
         return StreamingResponse(
-            response.iter_bytes(),
+            _relay_stream(response, started, path, matcher, "text/event-stream" in content_type,
+                          watermarks, tenant),
             status_code=response.status_code,
-            headers=dict(response.headers)
+            headers=_filter_headers(response.headers, drop=_DECODED_BODY_HEADERS),
+            background=BackgroundTask(response.aclose),
         )
 
+    try:
+        await response.aread()
+    finally:
+        await response.aclose()
+    RESPONSE_BYTES.observe(len(response.content))
+
     # Handle JSON responses
     try:
-        return JSONResponse(content=response.json(), status_code=response.status_code)
+        data = response.json()
     except Exception:
         # Fallback for non-JSON responses
         return JSONResponse(
@@ -108,7 +581,114 @@ async def proxy_to_llm(request: Request, path: str):
             status_code=response.status_code
         )
 
-def run_sentinel(port=8080):
+    if matcher is not None or watermarks is not None:
+        text = "\n".join(iter_response_strings(data))
+        blocked = False
+        if matcher is not None:
+            hits = matcher.feed(text)
+            blocked = bool(hits) and _report_response_leak(path, hits)
+        if watermarks is not None and has_zero_width(text):
+            found = [tenant_id for _, tenant_id in find_watermarks(text)]
+            if _watermark_mismatch("response", found, tenant, path):
+                blocked = True
+        if blocked:
+            return JSONResponse(
+                content={"detail": "Prompt-Recon Sentinel: Response blocked due to data leak policy."},
+                status_code=403
+            )
+    return JSONResponse(content=data, status_code=response.status_code)
+
+
+# Final SSE event sent when a stream is cut off by response_action="terminate"
+_TERMINATED_EVENT = (
+    b'event: error\n'
+    b'data: {"error": {"message": "Prompt-Recon Sentinel: Response blocked due to data leak policy.",'
+    b' "type": "sentinel_blocked"}}\n\n'
+)
+
+
+async def _relay_stream(response: httpx.Response, started: float, path: str,
+                        matcher=None, sse=False, watermarks=None, tenant=None):
+    """
+    Yield decoded upstream chunks, closing the upstream on early exit.
+    With a matcher and/or a WatermarkStream, each chunk's text (SSE deltas, or
+    the raw decoded body) is scanned before it is relayed, so a terminating
+    hit withholds that chunk. For SSE the bytes after the last newline are
+    held back until their line is complete: the extractor only yields a
+    data line's text once the line ends, and relaying the partial line
+    first would let a secret out before it is scanned.
+    """
+    size = 0
+    scanning = matcher is not None or watermarks is not None
+    if scanning:
+        extractor = SSETextExtractor() if sse else None
+        decoder = None if sse else codecs.getincrementaldecoder("utf-8")(errors="replace")
+    held = b""  # SSE: incomplete trailing line, not yet scanned
+
+    def scan(text) -> bool:
+        scan_started = time.perf_counter()
+        blocked = False
+        if matcher is not None:
+            hits = matcher.feed(text)
+            blocked = bool(hits) and _report_response_leak(path, hits)
+        if watermarks is not None:
+            found = watermarks.feed(text)
+            if found and _watermark_mismatch("response", found, tenant, path):
+                blocked = True
+        RESPONSE_SCAN_SECONDS.observe(time.perf_counter() - scan_started)
+        return blocked
+
+    try:
+        async for chunk in response.aiter_bytes():
+            if not size:
+                STREAM_TTFB_SECONDS.observe(time.perf_counter() - started)
+            size += len(chunk)
+            if scanning:
+                if sse:
+                    text = extractor.feed(chunk)
+                    held += chunk
+                    cut = held.rfind(b"\n") + 1
+                    chunk, held = held[:cut], held[cut:]
+                else:
+                    text = decoder.decode(chunk)
+                if scan(text):
+                    if sse:
+                        yield _TERMINATED_EVENT
+                    return
+                if not chunk:
+                    continue
+            yield chunk
+        if held:
+            # Stream ended mid-line: terminate the line so its text is scanned too
+            if scan(extractor.feed(b"\n")):
+                yield _TERMINATED_EVENT
+                return
+            yield held
+        if watermarks is not None:
+            found = watermarks.feed("", final=True)
+            if found:
+                _watermark_mismatch("response", found, tenant, path)
+    finally:
+        RESPONSE_BYTES.observe(size)
+        await response.aclose()
+
+
+def run_sentinel(port=8080, workers=1, log_level="info", **options):
+    """
+    Start the sentinel. Keyword arguments override UPSTREAM_CONFIG or
+    INSPECTION_CONFIG entries, e.g.
+    run_sentinel(8080, base_url="http://127.0.0.1:9000", max_batch_size=64).
+    With workers > 1, uvicorn starts that many processes; the overrides reach
+    them through the PROMPTRECON_SENTINEL_OPTIONS environment variable.
+    """
+    _apply_options(options)
+
     print(f"[*] Starting Prompt-Recon Sentinel on port {port}...")
+    print(f"[*] Forwarding to upstream {UPSTREAM_CONFIG['base_url']}")
     print(f"[*] Configure your app to use http://127.0.0.1:{port} as the API base URL")
-    uvicorn.run(app, host="127.0.0.1", port=port)
+    if workers > 1:
+        os.environ[_OPTIONS_ENV] = json.dumps(options)
+        uvicorn.run("promptrecon.dynamic.sentinel_proxy:app", host="127.0.0.1", port=port,
+                    workers=workers, log_level=log_level)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level=log_level)
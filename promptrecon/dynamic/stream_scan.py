@@ -0,0 +1,150 @@
+# file: promptrecon/dynamic/stream_scan.py
+import codecs
+import json
+import re
+from functools import lru_cache
+
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=256)
+def _echo_shingles(text: str, k: int) -> frozenset:
+    """Hashes of every k-character window of the normalized text."""
+    normalized = _WS_RE.sub(" ", text).strip().lower()
+    if len(normalized) < k:
+        return frozenset()
+    return frozenset(hash(normalized[i:i + k]) for i in range(len(normalized) - k + 1))
+
+
+class StreamingMatcher:
+    """
+    Incremental leak matcher over a text stream delivered in arbitrary pieces.
+
+    Each feed() runs the ruleset over the new text plus the last `overlap`
+    characters seen, so a match split across two chunks (or two SSE deltas)
+    is still found; matches already reported are not reported again.
+    When `protected_texts` are given (the request's system prompt), any run
+    of `echo_chars` consecutive characters copied from them is reported as
+    a "system_prompt_echo" hit.
+    """
+
+    def __init__(self, rules, protected_texts=(), overlap=256, echo_chars=64):
+        self.rules = rules
+        self.overlap = max(0, int(overlap))
+        self.echo_chars = int(echo_chars)
+        self._tail = ""
+        self._offset = 0  # absolute position of _tail[0] in the stream
+        self._reported = set()  # (rule_name, absolute match start)
+
+        self._shingles = frozenset()
+        if self.echo_chars > 0:
+            for text in protected_texts:
+                self._shingles |= _echo_shingles(text, self.echo_chars)
+        # Normalized tail used for echo detection (lowercased, whitespace-collapsed)
+        self._echo_tail = ""
+        self._echo_hit = False
+
+    def feed(self, text: str) -> list:
+        """Scan the next piece of the stream; returns names of newly hit rules."""
+        if not text:
+            return []
+        window = self._tail + text
+        boundary = len(self._tail)
+        hits = []
+        for name, rule_data in self.rules.items():
+            for m in rule_data["regex"].finditer(window):
+                if m.end() <= boundary:
+                    continue  # fully inside already-scanned text
+                key = (name, self._offset + m.start())
+                if key not in self._reported:
+                    self._reported.add(key)
+                    hits.append(name)
+
+        if self._shingles and not self._echo_hit and self._feed_echo(text):
+            self._echo_hit = True
+            hits.append("system_prompt_echo")
+
+        if self.overlap:
+            keep = window[-self.overlap:]
+            self._offset += len(window) - len(keep)
+            self._tail = keep
+        else:
+            self._offset += len(window)
+        if len(self._reported) > 4096:
+            self._reported = {r for r in self._reported if r[1] >= self._offset}
+        return hits
+
+    def _feed_echo(self, text: str) -> bool:
+        k = self.echo_chars
+        chunk = _WS_RE.sub(" ", text.lower())
+        if self._echo_tail.endswith(" ") and chunk.startswith(" "):
+            chunk = chunk[1:]
+        window = self._echo_tail + chunk
+        start = max(0, len(self._echo_tail) - k + 1)
+        shingles = self._shingles
+        for i in range(start, len(window) - k + 1):
+            if hash(window[i:i + k]) in shingles:
+                return True
+        self._echo_tail = window[-(k - 1):] if k > 1 else ""
+        return False
+
+
+class SSETextExtractor:
+    """
+    Turns raw `text/event-stream` bytes into the generated text they carry.
+
+    Handles events split at arbitrary byte boundaries (including inside a
+    UTF-8 sequence) and pulls the text deltas out of OpenAI
+    (`choices[].delta.content`, `choices[].text`) and Anthropic
+    (`delta.text`) payloads; non-JSON data lines are returned as-is.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+
+    def feed(self, chunk: bytes) -> str:
+        self._buffer += self._decoder.decode(chunk)
+        if "\n" not in self._buffer:
+            return ""
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()
+        parts = []
+        for line in lines:
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if not data or data == "[DONE]":
+                continue
+            parts.append(self._delta_text(data))
+        return "".join(parts)
+
+    @staticmethod
+    def _delta_text(data: str) -> str:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return data
+        if not isinstance(event, dict):
+            return ""
+        parts = []
+        for choice in event.get("choices") or ():
+            if not isinstance(choice, dict):
+                continue
+            delta = choice.get("delta")
+            if isinstance(delta, dict):
+                for key in ("content", "reasoning_content"):
+                    if isinstance(delta.get(key), str):
+                        parts.append(delta[key])
+                for call in delta.get("tool_calls") or ():
+                    function = call.get("function") if isinstance(call, dict) else None
+                    if isinstance(function, dict) and isinstance(function.get("arguments"), str):
+                        parts.append(function["arguments"])
+            if isinstance(choice.get("text"), str):
+                parts.append(choice["text"])
+        delta = event.get("delta")
+        if isinstance(delta, dict):
+            for key in ("text", "partial_json"):
+                if isinstance(delta.get(key), str):
+                    parts.append(delta[key])
+        return "".join(parts)
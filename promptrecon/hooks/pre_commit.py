@@ -55,6 +55,26 @@ def _get_staged_files():
     return [p for p in raw.split(b'\x00') if p]
 
 
+def _get_removed_files():
+    """staged 删除的文件和重命名的旧路径（str）；只用于刷新数据流索引，失败时返回空列表。"""
+    result = subprocess.run(
+        ['git', 'diff', '--cached', '--name-status', '--diff-filter=DR', '-z'],
+        capture_output=True,
+        cwd=_get_repo_root()
+    )
+    if result.returncode != 0:
+        return []
+    # -z 输出：D\0path\0 或 R100\0old\0new\0
+    fields = [f.decode('utf-8', errors='replace') for f in result.stdout.split(b'\x00')]
+    removed = []
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        removed.append(fields[i + 1])
+        i += 3 if status.startswith('R') else 2
+    return removed
+
+
 BLOCKED_FILES = {}
 
 
@@ -62,6 +82,7 @@ def _scan_staged_file(path_bytes, rules):
     """
     对单个 staged 文件执行：路径过滤 → 读取 blob → 扫描。
     每个文件只读一次（合并了过滤 + 扫描）。
+    返回读到的 blob 内容（没有读取时返回 None），供数据流索引复用。
     """
     # 解码路径
     path = path_bytes.decode('utf-8', errors='replace')
@@ -85,27 +106,49 @@ def _scan_staged_file(path_bytes, rules):
 
     # 大小过滤
     if len(content_bytes) > MAX_FILE_SIZE:
-        return
+        return content_bytes
 
     # 二进制过滤
     if b'\x00' in content_bytes[:4096]:
-        return
+        return content_bytes
 
     # 扫描
     hits = scan_content(content_bytes, rules)
-    if not hits:
-        return
-
     for hit in hits:
         print(f"[BLOCKED] {path}: {hit['rule_name']}:{hit['line']} {hit['snippet']}")
         BLOCKED_FILES[path] = True
+    return content_bytes
+
+
+def _refresh_flow_index(staged_blobs):
+    """
+    项目里已有 prompt 数据流索引（promptrecon.cpg.dataflow_index）时顺手增量刷新：
+    用本次 staged 的 .py blob（与扫描内容一致，不读工作区），内容未变的不重新解析；
+    staged 删除的文件和重命名的旧路径从索引中移除。
+    索引用 `promptrecon flow-index -d .` 生成；出错（包括导入失败）不影响提交结果。
+    """
+    try:
+        from promptrecon.cpg.dataflow_index import DEFAULT_INDEX_PATH, update_flow_index
+
+        root = _get_repo_root()
+        if not os.path.exists(os.path.join(root, DEFAULT_INDEX_PATH)):
+            return
+        update_flow_index(root, contents=staged_blobs, removed=_get_removed_files())
+    except Exception as e:
+        print(f"Warning: flow index refresh failed: {e}", file=sys.stderr)
 
 
 def scan_staged(rules):
     """主扫描流程"""
     staged = _get_staged_files()
+    staged_blobs = {}  # .py 路径 -> staged 内容
     for path_bytes in staged:
-        _scan_staged_file(path_bytes, rules)
+        content = _scan_staged_file(path_bytes, rules)
+        path = path_bytes.decode('utf-8', errors='replace')
+        if content is not None and path.endswith('.py'):
+            staged_blobs[path] = content
+
+    _refresh_flow_index(staged_blobs)
 
     if BLOCKED_FILES:
         print(f"\nBlocked {len(BLOCKED_FILES)} file(s). Use --no-verify to bypass.")
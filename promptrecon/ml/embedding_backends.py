@@ -0,0 +1,109 @@
+# file: promptrecon/ml/embedding_backends.py
+import re
+
+import numpy as np
+
+DEFAULT_MODEL = "BAAI/bge-small-zh-v1.5"
+
+_WS_RE = re.compile(r"\s+")
+
+# 64-bit mixing constants (splitmix64 finalizer); uint64 arithmetic wraps mod 2**64
+_PRIME = np.uint64(0x100000001B3)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+class EmbeddingBackend:
+    """
+    Turns texts into L2-normalized float32 vectors. `name` identifies the
+    embedding space and is used to key on-disk caches and reference indexes.
+    """
+
+    name = "base"
+
+    def encode(self, texts, batch_size=64):
+        raise NotImplementedError
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Transformer embeddings via sentence-transformers (downloads the model on first use)."""
+
+    def __init__(self, model_name=DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=64):
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+
+class HashingNgramBackend(EmbeddingBackend):
+    """
+    Dependency-free embeddings: lowercased, whitespace-collapsed character
+    n-grams hashed into `dim` signed buckets (the hashing trick), then
+    L2-normalized. Nothing to download, loads instantly, and is deterministic
+    across processes, so its vectors can be cached and indexed like a model's.
+    Similarity is lexical rather than semantic: it finds near-copies and light
+    rewrites of known prompts, not paraphrases, so thresholds differ from the
+    transformer backend.
+    """
+
+    def __init__(self, dim=1024, ngram_range=(2, 4)):
+        self.dim = int(dim)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.name = f"hashing-ngram-{self.ngram_range[0]}-{self.ngram_range[1]}-d{self.dim}"
+
+    def _vector(self, text):
+        vec = np.zeros(self.dim, dtype=np.float64)
+        text = _WS_RE.sub(" ", text.lower()).strip()
+        if not text:
+            return vec
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                if n == lo:  # shorter than the smallest n-gram: hash the whole text
+                    n, count = len(codes), 1
+                else:
+                    break
+            h = np.full(count, n, dtype=np.uint64)
+            for j in range(n):
+                h = h * _PRIME + codes[j:j + count]
+            h ^= h >> np.uint64(30)
+            h *= _MIX1
+            h ^= h >> np.uint64(27)
+            h *= _MIX2
+            h ^= h >> np.uint64(31)
+            buckets = (h % np.uint64(self.dim)).astype(np.intp)
+            signs = np.where(h >> np.uint64(63), -1.0, 1.0)
+            vec += np.bincount(buckets, weights=signs, minlength=self.dim)
+        return vec
+
+    def encode(self, texts, batch_size=64):
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self._vector(text)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+BACKENDS = {
+    "sentence-transformers": SentenceTransformerBackend,
+    "hashing": HashingNgramBackend,
+}
+
+
+def get_backend(name, **options):
+    """Instantiate a backend by name ("sentence-transformers" or "hashing")."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options)
@@ -1,19 +1,215 @@
 # file: promptrecon/ml/red_teaming.py
+import asyncio
+import hashlib
+import json
+import logging
+import math
 import os
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import re
+import time
+
+logger = logging.getLogger(__name__)
 
 # This implements the LLM Sandboxing Validator.
 # It acts as a Blue Team Agent reviewing findings.
 
+# Verdicts are cached here, keyed by model name + snippet hash
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PROMPTRECON_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "promptrecon")
+)
+
+# Snippets longer than this are truncated before being sent for review
+MAX_SNIPPET_CHARS = 2000
+
+SINGLE_PROMPT = """You are a top-tier DevSecOps Agent assessing an alert from Prompt-Recon.
+
+            We found the following string in the file `{filepath}`:
+
+            ---
+            {snippet}
+            ---
+
+            Is this an actual hardcoded AI System Prompt, persona instruction, or confidential LLM data leak?
+            Or is it a False Positive (e.g., standard code comment, unit test string, logging)?
+
+            Respond strictly in the following JSON format:
+            {{"is_leak": true/false, "confidence": 0-100, "reason": "short explanation"}}
+            """
+
+BATCH_PROMPT = """You are a top-tier DevSecOps Agent assessing alerts from Prompt-Recon.
+
+For each numbered finding below, decide whether the string is an actual hardcoded
+AI System Prompt, persona instruction, or confidential LLM data leak, or a False
+Positive (e.g., standard code comment, unit test string, logging).
+
+{findings}
+
+Respond strictly with a JSON array holding one object per finding, in any order:
+[{{"id": <finding id>, "is_leak": true/false, "confidence": 0-100, "reason": "short explanation"}}]
+"""
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _parse_json(text: str):
+    return json.loads(_FENCE_RE.sub("", text.strip()))
+
+
+def _snippet_key(model_name: str, snippet: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{snippet}".encode("utf-8")).hexdigest()
+
+
+def _normalize_items(items):
+    """Accept (filepath, snippet) pairs or finding dicts with 'file'/'filepath' and 'snippet'."""
+    out = []
+    for item in items:
+        if isinstance(item, dict):
+            filepath = item.get("file") or item.get("filepath") or ""
+            out.append((str(filepath), str(item.get("snippet", ""))))
+        else:
+            filepath, snippet = item
+            out.append((str(filepath), str(snippet)))
+    return out
+
+
+_TRUE_STRINGS = frozenset(("true", "yes", "1"))
+_FALSE_STRINGS = frozenset(("false", "no", "0"))
+
+
+def _parse_is_leak(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_STRINGS:
+            return True
+        if text in _FALSE_STRINGS:
+            return False
+    raise ValueError(f"malformed is_leak: {value!r}")
+
+
+def _parse_confidence(value) -> int:
+    if value is None:
+        return 0
+    try:
+        confidence = float(value)  # 80, "80", "0.8"
+    except (TypeError, ValueError):
+        raise ValueError(f"malformed confidence: {value!r}") from None
+    if isinstance(value, bool) or not math.isfinite(confidence):
+        raise ValueError(f"malformed confidence: {value!r}")
+    return int(round(min(max(confidence, 0.0), 100.0)))
+
+
+def _verdict(raw) -> dict:
+    """One verdict from a parsed reply; raises ValueError if it is malformed."""
+    if not isinstance(raw, dict) or "is_leak" not in raw:
+        raise ValueError(f"malformed verdict: {raw!r}")
+    return {
+        "is_leak": _parse_is_leak(raw["is_leak"]),
+        "confidence": _parse_confidence(raw.get("confidence")),
+        "reason": str(raw.get("reason", "")),
+    }
+
+
+class VerdictCache:
+    """
+    Append-only JSON-lines store of LLM verdicts keyed by snippet hash, so a
+    re-run (or an overlapping scan) never pays for the same snippet twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._verdicts = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._verdicts[entry["key"]] = entry["verdict"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # torn write from an interrupted run
+
+    def __len__(self):
+        return len(self._verdicts)
+
+    def get(self, key):
+        return self._verdicts.get(key)
+
+    def put_many(self, entries):
+        """Store {key: verdict} and append them to disk in one write."""
+        if not entries:
+            return
+        self._verdicts.update(entries)
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            lines = "".join(
+                json.dumps({"key": k, "verdict": v}, ensure_ascii=False) + "\n"
+                for k, v in entries.items()
+            )
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"Could not write verdict cache {self.path}: {e}")
+
+
+class _RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart (None = unlimited)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 class RedTeamValidator:
-    def __init__(self, model_name="gpt-4o-mini", api_key=None):
+    def __init__(self, model_name="gpt-4o-mini", api_key=None, llm=None, base_url=None,
+                 cache_dir=DEFAULT_CACHE_DIR, max_concurrency=8, requests_per_second=None,
+                 max_retries=3, retry_backoff=1.0, snippets_per_request=10):
+        """
+        `llm` may be any LangChain-style chat model (or a local fake exposing
+        `ainvoke(prompt)`); otherwise ChatOpenAI is built from `api_key`, with
+        `base_url` pointing it at any OpenAI-compatible endpoint.
+
+        validate_many() tuning: at most `max_concurrency` requests in flight,
+        request starts capped at `requests_per_second`, `max_retries` retries
+        with exponential backoff from `retry_backoff` seconds, and up to
+        `snippets_per_request` findings packed into each LLM call. Verdicts are
+        cached on disk under `cache_dir` (None disables the cache).
+        """
+        self.model_name = model_name
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        if not self.api_key:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.requests_per_second = requests_per_second
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+        self.snippets_per_request = max(1, int(snippets_per_request))
+        self.llm_calls = 0
+
+        if llm is not None:
+            self.llm = llm
+        elif not self.api_key:
             self.llm = None
         else:
-            self.llm = ChatOpenAI(temperature=0, model=model_name, openai_api_key=self.api_key)
+            from langchain_openai import ChatOpenAI
+            options = {"openai_api_base": base_url} if base_url else {}
+            self.llm = ChatOpenAI(temperature=0, model=model_name, openai_api_key=self.api_key, **options)
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.cache = VerdictCache(os.path.join(cache_dir, "verdicts", f"{slug}.jsonl") if cache_dir else None)
 
     def validate_snippet(self, filepath: str, snippet: str) -> dict:
         """
@@ -22,30 +218,128 @@ class RedTeamValidator:
         """
         if not self.llm:
             return {"is_leak": False, "confidence": 0, "reason": "No API Key provided for LLM"}
-            
-        prompt = PromptTemplate.from_template(
-            """You are a top-tier DevSecOps Agent assessing an alert from Prompt-Recon.
-            
-            We found the following string in the file `{filepath}`:
-            
-            ---
-            {snippet}
-            ---
-            
-            Is this an actual hardcoded AI System Prompt, persona instruction, or confidential LLM data leak? 
-            Or is it a False Positive (e.g., standard code comment, unit test string, logging)?
-            
-            Respond strictly in the following JSON format:
-            {{"is_leak": true/false, "confidence": 0-100, "reason": "short explanation"}}
-            """
-        )
-        
-        chain = prompt | self.llm | StrOutputParser()
+
+        key = _snippet_key(self.model_name, snippet)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        prompt = SINGLE_PROMPT.format(filepath=filepath, snippet=snippet[:MAX_SNIPPET_CHARS])
         try:
-            result_str = chain.invoke({"filepath": filepath, "snippet": snippet})
-            import json
-            # Extremely basic parsing for demo
-            clean_str = result_str.strip().strip("```json").strip("```").strip()
-            return json.loads(clean_str)
+            self.llm_calls += 1
+            result = self.llm.invoke(prompt)
+            verdict = _verdict(_parse_json(getattr(result, "content", result)))
         except Exception as e:
             return {"is_leak": False, "confidence": 0, "reason": f"LLM error: {e}"}
+        self.cache.put_many({key: verdict})
+        return dict(verdict)
+
+    async def validate_many(self, items) -> list:
+        """
+        Validate many findings concurrently; returns one verdict dict per item,
+        in input order. `items` are (filepath, snippet) pairs or scan finding
+        dicts. Cached and duplicate snippets cost no LLM call; the rest are
+        packed `snippets_per_request` to a call. A batch whose reply is not
+        usable is retried, and verdicts missing from a reply are retried on
+        their own; items that still fail get an "LLM error" verdict (not cached).
+        """
+        items = _normalize_items(items)
+        if not self.llm:
+            return [{"is_leak": False, "confidence": 0, "reason": "No API Key provided for LLM"}
+                    for _ in items]
+
+        keys = [_snippet_key(self.model_name, snippet) for _, snippet in items]
+        results = {}
+        pending = {}  # key -> (filepath, snippet) of the first occurrence
+        for key, item in zip(keys, items):
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            elif key not in pending:
+                pending[key] = item
+
+        pending = list(pending.items())
+        batches = [pending[i:i + self.snippets_per_request]
+                   for i in range(0, len(pending), self.snippets_per_request)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = _RateLimiter(self.requests_per_second)
+
+        async def run(batch):
+            async with semaphore:
+                verdicts = await self._validate_batch(batch, limiter)
+            self.cache.put_many({k: v for k, v in verdicts.items() if "error" not in v})
+            results.update(verdicts)
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+        out = []
+        for key in keys:
+            verdict = dict(results[key])
+            verdict.pop("error", None)
+            out.append(verdict)
+        return out
+
+    def validate_many_sync(self, items) -> list:
+        """validate_many() for synchronous callers (not from inside a running event loop)."""
+        return asyncio.run(self.validate_many(items))
+
+    async def _validate_batch(self, batch, limiter) -> dict:
+        verdicts = {}
+        remaining = list(batch)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            await limiter.wait()
+            try:
+                verdicts.update(await self._ask(remaining))
+            except Exception as e:
+                last_error = e
+                logger.warning(f"LLM batch of {len(remaining)} failed (attempt {attempt + 1}): {e}")
+                continue
+            remaining = [(k, item) for k, item in remaining if k not in verdicts]
+            if not remaining:
+                return verdicts
+            last_error = f"{len(remaining)} verdict(s) missing from reply"
+        for key, _ in remaining:
+            verdicts[key] = {"is_leak": False, "confidence": 0,
+                             "reason": f"LLM error: {last_error}", "error": True}
+        return verdicts
+
+    async def _ask(self, batch) -> dict:
+        """One LLM call for a packed batch; returns the verdicts it contained by key."""
+        if len(batch) == 1:
+            (key, (filepath, snippet)), = batch
+            prompt = SINGLE_PROMPT.format(filepath=filepath, snippet=snippet[:MAX_SNIPPET_CHARS])
+        else:
+            findings = "\n\n".join(
+                f"Finding {i} in `{filepath}`:\n---\n{snippet[:MAX_SNIPPET_CHARS]}\n---"
+                for i, (_, (filepath, snippet)) in enumerate(batch)
+            )
+            prompt = BATCH_PROMPT.format(findings=findings)
+
+        self.llm_calls += 1
+        result = await self.llm.ainvoke(prompt)
+        parsed = _parse_json(getattr(result, "content", result))
+
+        if len(batch) == 1:
+            if isinstance(parsed, list):
+                parsed = parsed[0] if parsed else {}
+            return {batch[0][0]: _verdict(parsed)}
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+        verdicts = {}
+        for raw in parsed:
+            if not isinstance(raw, dict):
+                continue
+            try:
+                idx = int(raw.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= idx < len(batch):
+                continue
+            try:
+                verdicts[batch[idx][0]] = _verdict(raw)
+            except ValueError as e:
+                # Left out, so this finding is asked again on its own
+                logger.warning(f"Ignoring malformed verdict for finding {idx}: {e}")
+        return verdicts
@@ -0,0 +1,222 @@
+# file: promptrecon/ml/reference_index.py
+import json
+import math
+import os
+
+import numpy as np
+
+# Reference sets up to this size are searched exactly by default; larger ones get an IVF index
+EXACT_MAX_SIZE = 20000
+
+
+def _as_unit_matrix(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _merge_topk(best_scores, best_ids, scores, ids, k):
+    """Merge a new (q, m) block of candidates into the running (q, k) best."""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_ids = np.concatenate([best_ids, ids], axis=1)
+    if all_scores.shape[1] > k:
+        part = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+        all_scores = np.take_along_axis(all_scores, part, axis=1)
+        all_ids = np.take_along_axis(all_ids, part, axis=1)
+    return all_scores, all_ids
+
+
+def _finalize(scores, ids, k, threshold):
+    """Sort each row descending, pad to k, and drop hits below `threshold`."""
+    q = scores.shape[0]
+    if scores.shape[1] < k:
+        pad = k - scores.shape[1]
+        scores = np.concatenate([scores, np.full((q, pad), -np.inf, np.float32)], axis=1)
+        ids = np.concatenate([ids, np.full((q, pad), -1, np.int64)], axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    scores = np.take_along_axis(scores, order, axis=1)
+    ids = np.take_along_axis(ids, order, axis=1)
+    if threshold is not None:
+        below = scores < threshold
+        scores = np.where(below, -np.inf, scores).astype(np.float32)
+        ids = np.where(below, -1, ids)
+    return scores, ids
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search over unit vectors, processed in blocks of
+    `block_size` rows so memory stays bounded for large reference sets.
+    """
+
+    kind = "exact"
+
+    def __init__(self, vectors, block_size=8192):
+        self.vectors = vectors
+        self.block_size = block_size
+        self.meta = {}
+
+    @classmethod
+    def build(cls, embeddings, block_size=8192):
+        return cls(_as_unit_matrix(embeddings), block_size=block_size)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, queries, k=1, threshold=None):
+        """
+        Return (scores, ids), both shaped (len(queries), k), best first.
+        Missing or below-threshold slots have score -inf and id -1.
+        """
+        queries = _as_unit_matrix(queries)
+        q = queries.shape[0]
+        best_scores = np.empty((q, 0), np.float32)
+        best_ids = np.empty((q, 0), np.int64)
+        for start in range(0, len(self), self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size])
+            sims = queries @ block.T
+            ids = np.broadcast_to(np.arange(start, start + block.shape[0]), sims.shape)
+            best_scores, best_ids = _merge_topk(best_scores, best_ids, sims, ids, k)
+        return _finalize(best_scores, best_ids, k, threshold)
+
+    def save(self, path):
+        np.save(os.path.join(path, "vectors.npy"), np.asarray(self.vectors))
+        return {"block_size": self.block_size}
+
+    @classmethod
+    def load(cls, path, meta, mmap_mode):
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        return cls(vectors, block_size=meta.get("block_size", 8192))
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate index: vectors are clustered by spherical
+    k-means into `nlist` lists; a query is compared exactly against the
+    vectors of its `nprobe` closest lists only. Vectors are stored grouped by
+    list, so each probed list is one contiguous slice (cheap when mmap'd).
+    """
+
+    kind = "ivf"
+
+    def __init__(self, centroids, vectors, ids, offsets, nprobe=8):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.nprobe = nprobe
+        self.meta = {}
+
+    @classmethod
+    def build(cls, embeddings, nlist=None, nprobe=8, iterations=10, train_size=None, seed=0):
+        vectors = _as_unit_matrix(embeddings)
+        n = vectors.shape[0]
+        nlist = max(1, min(n, nlist or int(4 * math.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        train_size = min(n, train_size or nlist * 64)
+        train = vectors[rng.choice(n, size=train_size, replace=False)]
+        centroids = train[rng.choice(train_size, size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = cls._assign(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            if empty.any():  # re-seed empty lists from random training vectors
+                sums[empty] = train[rng.choice(train_size, size=int(empty.sum()))]
+            centroids = _as_unit_matrix(sums)
+
+        assign = cls._assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls(centroids, vectors[order], order.astype(np.int64), offsets,
+                   nprobe=min(nprobe, nlist))
+
+    @staticmethod
+    def _assign(vectors, centroids, block_size=8192):
+        out = np.empty(vectors.shape[0], np.int64)
+        for start in range(0, vectors.shape[0], block_size):
+            block = np.asarray(vectors[start:start + block_size])
+            out[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def search(self, queries, k=1, threshold=None, nprobe=None):
+        """Same contract as ExactIndex.search(); `nprobe` overrides the default."""
+        queries = _as_unit_matrix(queries)
+        q = queries.shape[0]
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        out_scores = np.full((q, k), -np.inf, np.float32)
+        out_ids = np.full((q, k), -1, np.int64)
+        for row in range(q):
+            ranges = [(self.offsets[l], self.offsets[l + 1]) for l in probes[row]]
+            ranges = [(a, b) for a, b in ranges if b > a]
+            if not ranges:
+                continue
+            cand = np.concatenate([np.asarray(self.vectors[a:b]) for a, b in ranges])
+            cand_ids = np.concatenate([np.asarray(self.ids[a:b]) for a, b in ranges])
+            sims = cand @ queries[row]
+            top = min(k, sims.shape[0])
+            part = np.argpartition(-sims, top - 1)[:top]
+            out_scores[row, :top] = sims[part]
+            out_ids[row, :top] = cand_ids[part]
+        return _finalize(out_scores, out_ids, k, threshold)
+
+    def save(self, path):
+        np.save(os.path.join(path, "centroids.npy"), self.centroids)
+        np.save(os.path.join(path, "vectors.npy"), np.asarray(self.vectors))
+        np.save(os.path.join(path, "ids.npy"), np.asarray(self.ids))
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        return {"nprobe": self.nprobe, "nlist": int(self.centroids.shape[0])}
+
+    @classmethod
+    def load(cls, path, meta, mmap_mode):
+        return cls(
+            np.load(os.path.join(path, "centroids.npy")),
+            np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "ids.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "offsets.npy")),
+            nprobe=meta.get("nprobe", 8),
+        )
+
+
+INDEX_TYPES = {cls.kind: cls for cls in (ExactIndex, IVFIndex)}
+
+
+def build_index(embeddings, kind="auto", **options):
+    """
+    Build a reference index over embeddings. kind="auto" picks exact search for
+    up to EXACT_MAX_SIZE vectors and IVF above that.
+    """
+    if kind == "auto":
+        kind = "exact" if len(embeddings) <= EXACT_MAX_SIZE else "ivf"
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index kind: {kind}")
+    return INDEX_TYPES[kind].build(embeddings, **options)
+
+
+def save_index(index, path, **meta):
+    """Write an index to directory `path`; extra `meta` (e.g. model_name) is stored alongside."""
+    os.makedirs(path, exist_ok=True)
+    info = {"kind": index.kind, "count": len(index), **index.save(path), **meta}
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def load_index(path, mmap=True):
+    """Load an index saved by save_index(); vector arrays are memory-mapped by default."""
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    index = INDEX_TYPES[meta["kind"]].load(path, meta, "r" if mmap else None)
+    index.meta = meta
+    return index
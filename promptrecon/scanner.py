@@ -0,0 +1,340 @@
+# file: promptrecon/scanner.py
+
+"""
+Scanner：给长驻服务 / 第三方集成用的扫描对象。
+
+规则、ignore 匹配器、结果缓存都只在构造时准备一次，之后每次调用只剩正则匹配：
+
+    from promptrecon import Scanner
+    scanner = Scanner(root="repo")
+    findings = scanner.scan_path("repo")            # 目录 / 文件
+    findings = scanner.scan_bytes(body, "upload.py")
+    findings = await scanner.scan_many_async(paths)
+
+- 线程安全：规则只读；缓存和进程池的创建由锁保护
+- 缓存：路径按 (mtime_ns, size) 失效，字节内容按 blake2b 摘要，LRU 上限 cache_size
+- scan_many()：文件数 >= PARALLEL_MIN_FILES 时用常驻进程池（re 匹配不释放 GIL，线程没有加速），
+  只把缓存未命中的文件发给子进程；结果顺序与输入一致
+- archives=True 时归档（.zip/.whl/.jar/.tar.gz/.gz …）逐成员扫描，见 archive.py；
+  成员的匹配分发到同一个进程池，findings 的 file 为 归档路径!成员路径
+"""
+
+import asyncio
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .archive import DEFAULT_MAX_DEPTH, archive_kind, iter_archive_members
+from .core import (build_findings, display_path_for, is_content_scannable, is_file_scannable,
+                   load_ignore_patterns, load_rules_from_dir, scan_content, scan_python_strings)
+
+PARALLEL_MIN_FILES = 64
+DEFAULT_CACHE_SIZE = 8192
+
+
+class IgnoreMatcher:
+    """
+    should_ignore() 的预编译版本：所有 pattern 合成一个正则，每个路径只匹配两次
+    （完整路径 + basename），语义与 should_ignore 相同。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        translated = []
+        for pattern in self.patterns:
+            variants = {pattern}
+            if pattern.endswith('/'):
+                variants.add(pattern.rstrip('/'))
+            translated.extend(fnmatch.translate(os.path.normcase(p)) for p in variants)
+        self._regex = re.compile('|'.join(translated)) if translated else None
+
+    def __call__(self, path):
+        if self._regex is None:
+            return False
+        path_str = os.path.normcase(str(path))
+        return bool(self._regex.match(path_str)
+                    or self._regex.match(os.path.basename(path_str)))
+
+    def ignores_dir(self, path):
+        # 'venv/*' 这类规则要带上结尾的 / 才能匹配到目录本身
+        return self(path) or self(os.path.join(path, ''))
+
+
+class _LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _match(content, rules, strings_only, is_py):
+    if strings_only and is_py:
+        return scan_python_strings(content, rules)
+    return scan_content(content, rules)
+
+
+def _read_scannable(path):
+    """读取文件内容；不可扫描（过大 / 二进制 / 不可读）返回 None。"""
+    if not is_file_scannable(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+    except OSError:
+        return None
+
+
+# --- 进程池 worker：规则在 initializer 里传一次，之后每个任务只传路径 ---
+_worker_rules = None
+_worker_strings_only = False
+
+
+def _init_worker(rules, strings_only):
+    global _worker_rules, _worker_strings_only
+    _worker_rules = rules
+    _worker_strings_only = strings_only
+
+
+def _worker_scan(path):
+    content = _read_scannable(path)
+    if content is None:
+        return []
+    return _match(content, _worker_rules, _worker_strings_only, str(path).endswith('.py'))
+
+
+def _worker_match(member, data):
+    return _match(data.decode('utf-8', errors='replace'), _worker_rules, _worker_strings_only,
+                  member.endswith('.py'))
+
+
+class Scanner:
+    """
+    rules: 已编译的规则字典；None 时加载内置规则（rules_dir 追加到其后）
+    ignore_patterns / ignorefile: ignore 规则；都不给时用 load_ignore_patterns() 的默认值
+    root: findings 中 file 字段的相对根；None 时相对于 scan_path() 的目录（或 cwd）
+    workers: scan_many() 的进程数，默认 CPU 数；1 = 始终串行
+    archives: 扫描归档内部（否则归档按二进制跳过）；archive_depth 为最大嵌套层数
+    """
+
+    def __init__(self, rules=None, rules_dir=None, ignore_patterns=None, ignorefile=None,
+                 root=None, strings_only=False, workers=None, cache_size=DEFAULT_CACHE_SIZE,
+                 archives=False, archive_depth=DEFAULT_MAX_DEPTH):
+        if rules is None:
+            from .rules.builtin import load_builtin_rules
+            rules = load_builtin_rules()
+        else:
+            rules = dict(rules)
+        if rules_dir:
+            rules.update(load_rules_from_dir(rules_dir))
+        self.rules = rules
+        if ignore_patterns is None:
+            ignore_patterns = load_ignore_patterns(ignorefile or '.promptignore')
+        self.ignore = IgnoreMatcher(ignore_patterns)
+        self.root = Path(root).resolve() if root is not None else None
+        self.strings_only = strings_only
+        self.archives = archives
+        self.archive_depth = archive_depth
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = _LRUCache(cache_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    # --- 同步接口 ---
+    def scan_bytes(self, data, path='<bytes>'):
+        """
+        扫描内存中的内容（bytes 或 str）。path 只用于 findings 的 file 字段和 .py 判定。
+        与文件扫描相同的大小 / 二进制过滤。
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not is_content_scannable(data):
+            return []
+        is_py = str(path).endswith('.py')
+        key = ('bytes', hashlib.blake2b(data, digest_size=16).digest(), is_py)
+        hits = self.cache.get(key)
+        if hits is None:
+            hits = _match(data.decode('utf-8', errors='replace'), self.rules, self.strings_only, is_py)
+            self.cache.put(key, hits)
+        return build_findings(hits, str(path), self.rules)
+
+    def scan_path(self, path):
+        """扫描单个文件，或递归扫描目录（按 ignore 规则剪枝）。"""
+        if os.path.isdir(path):
+            root = self.root or Path(path).resolve()
+            return self.scan_many(self.iter_files(path), root=root)
+        if self.ignore(path):
+            return []
+        return self.scan_many([path])
+
+    def scan_many(self, paths, root=None):
+        """
+        扫描一组文件，返回合并后的 findings（按输入顺序）。
+        缓存未命中的文件足够多时分发到进程池。
+        """
+        paths = list(paths)
+        root = root or self.root
+        entries_by_index = [None] * len(paths)  # [(成员路径 or '', hits)]
+        misses = []  # [(index, path, stat_key)]
+        for i, path in enumerate(paths):
+            if self.archives and archive_kind(path):
+                entries_by_index[i] = self._scan_archive(path)
+                continue
+            key = self._stat_key(path)
+            if key is None:
+                entries_by_index[i] = []
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                entries_by_index[i] = [('', cached)]
+            else:
+                misses.append((i, path, key))
+
+        if misses:
+            miss_paths = [path for _, path, _ in misses]
+            if self.workers > 1 and len(misses) >= PARALLEL_MIN_FILES:
+                chunksize = max(1, min(64, len(misses) // (self.workers * 8)))
+                results = self._get_pool().map(_worker_scan, miss_paths, chunksize=chunksize)
+            else:
+                results = map(self._scan_file_hits, miss_paths)
+            for (i, _, key), hits in zip(misses, results):
+                self.cache.put(key, hits)
+                entries_by_index[i] = [('', hits)]
+
+        findings = []
+        for path, entries in zip(paths, entries_by_index):
+            display = None
+            for member, hits in entries:
+                if not hits:
+                    continue
+                if display is None:
+                    display = display_path_for(path, root)
+                name = f"{display}!{member}" if member else display
+                findings.extend(build_findings(hits, name, self.rules))
+        return findings
+
+    def scan_archive(self, path):
+        """扫描单个归档内部（不受 archives 开关影响），返回 findings。"""
+        root = self.root or Path(path).resolve().parent
+        display = display_path_for(path, root)
+        findings = []
+        for member, hits in self._scan_archive(path):
+            findings.extend(build_findings(hits, f"{display}!{member}", self.rules))
+        return findings
+
+    def iter_files(self, directory):
+        """与 scan 相同的遍历：目录剪枝 + 文件过滤。"""
+        for dirpath, dirs, files in os.walk(directory, topdown=True):
+            dirs[:] = [d for d in dirs if not self.ignore.ignores_dir(os.path.join(dirpath, d))]
+            for fname in files:
+                fpath = os.path.join(dirpath, fname)
+                if not self.ignore(fpath):
+                    yield fpath
+
+    # --- 异步接口：在默认线程池里跑同步版本，不阻塞事件循环 ---
+    async def scan_bytes_async(self, data, path='<bytes>'):
+        return await asyncio.to_thread(self.scan_bytes, data, path)
+
+    async def scan_path_async(self, path):
+        return await asyncio.to_thread(self.scan_path, path)
+
+    async def scan_many_async(self, paths, root=None):
+        return await asyncio.to_thread(self.scan_many, list(paths), root)
+
+    # --- 生命周期 ---
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 内部 ---
+    def _stat_key(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return ('path', os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def _scan_file_hits(self, path):
+        content = _read_scannable(path)
+        if content is None:
+            return []
+        return _match(content, self.rules, self.strings_only, str(path).endswith('.py'))
+
+    def _scan_archive(self, path):
+        """归档 -> [(成员路径, hits)]，按归档的 (mtime, size) 缓存。"""
+        key = self._stat_key(path)
+        if key is None:
+            return []
+        key = ('archive', self.archive_depth) + key[1:]
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        members = ((member, data) for member, data
+                   in iter_archive_members(path, max_depth=self.archive_depth)
+                   if not self.ignore(member.rsplit('!', 1)[-1]))
+        entries = []
+        if self.workers > 1:
+            # 解压是顺序的（tar.gz 只能流式读），匹配并行；在途任务数有上限，内存不随归档大小增长
+            pool = self._get_pool()
+            in_flight = deque()
+            for member, data in members:
+                in_flight.append((member, pool.submit(_worker_match, member, data)))
+                if len(in_flight) >= self.workers * 4:
+                    done_member, future = in_flight.popleft()
+                    entries.append((done_member, future.result()))
+            entries.extend((member, future.result()) for member, future in in_flight)
+        else:
+            entries = [(member, _match(data.decode('utf-8', errors='replace'), self.rules,
+                                       self.strings_only, member.endswith('.py')))
+                       for member, data in members]
+        entries = [(member, hits) for member, hits in entries if hits]
+        self.cache.put(key, entries)
+        return entries
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker,
+                    initargs=(self.rules, self.strings_only))
+            return self._pool
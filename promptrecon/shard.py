@@ -0,0 +1,95 @@
+# file: promptrecon/shard.py
+
+"""
+分片扫描：scan --shard i/N 把文件列表确定性地切成 N 份，merge 把各分片的 JSONL 合并。
+
+- 分片只依赖（相对扫描根的）路径和文件大小：同一个 checkout 在任何机器上切法都一样
+- 按大小做 LPT 贪心（最大的文件先分给当前最轻的分片），路径哈希决定同样大小文件的顺序，
+  各分片耗时接近，墙钟时间随 runner 数线性下降
+- 权重 = min(size, MAX_SCAN_BYTES) + 固定开销：超过上限的文件不会被扫描，
+  小文件也有 open/stat 的成本
+"""
+
+import hashlib
+import heapq
+import json
+import os
+
+from .core import MAX_SCAN_BYTES
+
+PER_FILE_OVERHEAD = 4096
+
+
+def parse_shard(spec):
+    """'3/16' -> (3, 16)；分片号从 1 开始。格式错误抛 ValueError。"""
+    try:
+        index, count = (int(part) for part in str(spec).split('/'))
+    except ValueError:
+        raise ValueError(f"expected INDEX/COUNT, got {spec!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard index must be in 1..{count}, got {spec!r}")
+    return index, count
+
+
+def _path_key(path, base_dir):
+    rel = os.path.relpath(path, base_dir) if base_dir else path
+    rel = rel.replace(os.sep, '/')
+    return hashlib.sha1(rel.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+
+def _weight(path):
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return min(size, MAX_SCAN_BYTES) + PER_FILE_OVERHEAD
+
+
+def assign_shards(files, count, base_dir=None):
+    """返回与 files 等长的分片号列表（1..count）。"""
+    weights = [_weight(f) for f in files]
+    order = sorted(range(len(files)), key=lambda i: (-weights[i], _path_key(files[i], base_dir)))
+    # (当前负载, 分片号)：负载相同时取编号最小的分片，结果完全确定
+    loads = [(0, shard) for shard in range(1, count + 1)]
+    assigned = [0] * len(files)
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        assigned[i] = shard
+        heapq.heappush(loads, (load + weights[i], shard))
+    return assigned
+
+
+def select_shard(files, index, count, base_dir=None):
+    """files 中属于第 index 个分片（共 count 个）的文件，保持原顺序。"""
+    if count == 1:
+        return list(files)
+    files = list(files)
+    return [f for f, shard in zip(files, assign_shards(files, count, base_dir)) if shard == index]
+
+
+def _finding_key(finding):
+    return (str(finding.get('file', '')), int(finding.get('line', 0) or 0),
+            str(finding.get('rule_name', '')), str(finding.get('snippet', '')))
+
+
+def merge_jsonl(paths):
+    """
+    合并多个 scan --jsonl 输出：按 (file, line, rule_name, snippet) 去重并排序。
+    文件缺失或内容损坏时抛 OSError / ValueError（分片失败不能被悄悄吞掉）。
+    """
+    merged = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    finding = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{lineno}: {e}") from None
+                if not isinstance(finding, dict):
+                    raise ValueError(f"{path}:{lineno}: expected a JSON object, "
+                                     f"got {type(finding).__name__}")
+                merged.setdefault(_finding_key(finding), finding)
+    return [merged[key] for key in sorted(merged)]
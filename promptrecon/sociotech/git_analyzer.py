@@ -1,11 +1,41 @@
 # file: promptrecon/sociotech/git_analyzer.py
 import os
 from git import Repo
+import hashlib
+import json
 import logging
+import re
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-file blame results are cached here, keyed by (blob OID, last commit touching the path, path)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PROMPTRECON_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "promptrecon")
+)
+
+# Commit id git blame reports for lines not committed yet
+UNCOMMITTED = "0" * 40
+
+_PORCELAIN_HEADER_RE = re.compile(r"^([0-9a-f]{40}) \d+ (\d+)(?: (\d+))?$")
+
+
+def _risk_modifier(commit_time) -> float:
+    """
+    Sociotechnical Risk Heuristic Demo:
+    e.g., Commits made on weekends or very late at night get higher risk scores
+    """
+    risk_score = 0.0
+    if commit_time.weekday() >= 5: # Weekend
+        risk_score += 2.0
+    if commit_time.hour < 6 or commit_time.hour > 22: # Late night
+        risk_score += 2.5
+    return min(risk_score, 5.0)
+
 def analyze_author_risk(repo_path: str, filepath: str) -> dict:
     """
     Look up the git history of a specific file to determine who introduced a potential leak.
@@ -31,23 +61,210 @@ def analyze_author_risk(repo_path: str, filepath: str) -> dict:
         latest_commit = commits[0]
         author_email = latest_commit.author.email
         
-        # Sociotechnical Risk Heuristic Demo:
-        # e.g., Commits made on weekends or very late at night get higher risk scores
         commit_time = latest_commit.authored_datetime
-        risk_score = 0.0
-        
-        if commit_time.weekday() >= 5: # Weekend
-            risk_score += 2.0
-        
-        if commit_time.hour < 6 or commit_time.hour > 22: # Late night
-            risk_score += 2.5
-            
         return {
             "author": author_email,
             "commit_hash": latest_commit.hexsha,
             "time": str(commit_time),
-            "sociotech_risk_modifier": min(risk_score, 5.0)
+            "sociotech_risk_modifier": _risk_modifier(commit_time)
         }
     except Exception as e:
         logger.error(f"Failed to analyze git history for {filepath}: {e}")
         return {"author": "Error", "sociotech_risk": 0.0}
+
+
+def parse_blame_porcelain(output: str) -> dict:
+    """
+    Parse `git blame --porcelain` output into
+    {"commits": {sha: {"author", "email", "time", "tz"}}, "lines": [sha per final line]}.
+    """
+    commits = {}
+    lines = []
+    current = None
+    for line in output.splitlines():
+        if line.startswith("\t"):
+            continue  # the blamed line's content
+        m = _PORCELAIN_HEADER_RE.match(line)
+        if m:
+            current = commits.setdefault(m.group(1), {"sha": m.group(1)})
+            final_line = int(m.group(2))
+            if len(lines) < final_line:
+                lines.extend([None] * (final_line - len(lines)))
+            lines[final_line - 1] = m.group(1)
+            continue
+        if current is None:
+            continue
+        key, _, value = line.partition(" ")
+        if key == "author":
+            current["author"] = value
+        elif key == "author-mail":
+            current["email"] = value.strip("<>")
+        elif key == "author-time":
+            current["time"] = int(value)
+        elif key == "author-tz":
+            current["tz"] = value
+    for commit in commits.values():
+        commit.pop("sha", None)
+    return {"commits": commits, "lines": lines}
+
+
+def _commit_datetime(commit) -> datetime:
+    """Author time in the author's own timezone, like GitPython's authored_datetime."""
+    tz = commit.get("tz", "+0000")
+    sign = -1 if tz.startswith("-") else 1
+    offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+    return datetime.fromtimestamp(commit.get("time", 0), timezone(offset))
+
+
+class BlameCache:
+    """
+    On-disk per-file blame results keyed by (blob OID, HEAD's last commit
+    touching the path, path); None path disables it. The commit makes an
+    amend or rebase that keeps the content miss, instead of returning
+    commits that are no longer in the history.
+    """
+
+    def __init__(self, cache_dir):
+        self.root = os.path.join(cache_dir, "blame") if cache_dir else None
+
+    def _path(self, blob_oid, last_commit, rel_path):
+        key = f"{blob_oid}\x00{last_commit}\x00{rel_path}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.json")
+
+    def get(self, blob_oid, last_commit, rel_path):
+        if not self.root:
+            return None
+        try:
+            with open(self._path(blob_oid, last_commit, rel_path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, blob_oid, last_commit, rel_path, blame):
+        if not self.root:
+            return
+        path = self._path(blob_oid, last_commit, rel_path)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(blame, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write blame cache {path}: {e}")
+
+
+def _blob_oids(repo_root, rel_paths) -> dict:
+    """Working-tree blob OIDs for many files with a single `git hash-object`."""
+    if not rel_paths:
+        return {}
+    result = subprocess.run(
+        ["git", "hash-object", "--stdin-paths"],
+        input="\n".join(rel_paths) + "\n", capture_output=True, text=True, cwd=repo_root,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "git hash-object failed")
+    return dict(zip(rel_paths, result.stdout.split()))
+
+
+def _last_commit(repo_root, rel_path) -> str:
+    """OID of the last commit on HEAD that touched `rel_path` ("" if none or on error)."""
+    result = subprocess.run(
+        ["git", "log", "-1", "--format=%H", "HEAD", "--", rel_path],
+        capture_output=True, text=True, cwd=repo_root,
+    )
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def _blame_file(repo_root, rel_path):
+    result = subprocess.run(
+        ["git", "blame", "--porcelain", "--", rel_path],
+        capture_output=True, text=True, encoding="utf-8", errors="replace", cwd=repo_root,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "git blame failed")
+    return parse_blame_porcelain(result.stdout)
+
+
+def attribute_findings(repo_path: str, findings: list, base_dir: str = None,
+                       cache_dir=DEFAULT_CACHE_DIR, workers: int = 8) -> list:
+    """
+    Batch version of analyze_author_risk() that attributes each finding to
+    the commit and author of its exact line.
+
+    Findings are dicts with "file" (relative to `base_dir`, default the repo
+    root, or absolute) and "line". Files are grouped so each is blamed once
+    with `git blame --porcelain` (up to `workers` blames run concurrently),
+    and whole-file results are cached by (blob OID, last commit touching
+    the path, path), so unchanged files are never blamed again across runs
+    while rewritten history is. Returns one dict per finding, in order.
+    """
+    unknown = {"author": "Unknown", "sociotech_risk": 0.0}
+    try:
+        repo_root = Repo(repo_path, search_parent_directories=True).working_dir
+    except Exception as e:
+        logger.warning(f"Not a valid git repository: {e}")
+        return [dict(unknown) for _ in findings]
+
+    base_dir = base_dir or repo_root
+    by_file = defaultdict(list)  # rel_path -> finding indices
+    for i, finding in enumerate(findings):
+        full = os.path.join(base_dir, finding.get("file", ""))
+        rel_path = os.path.relpath(os.path.realpath(full), os.path.realpath(repo_root))
+        if os.path.isfile(full) and not rel_path.startswith(".."):
+            by_file[rel_path.replace(os.sep, "/")].append(i)
+
+    cache = BlameCache(cache_dir)
+    try:
+        oids = _blob_oids(repo_root, list(by_file))
+    except Exception as e:
+        logger.error(f"Failed to hash files for blame: {e}")
+        oids = {}
+
+    def blame(rel_path):
+        oid = oids.get(rel_path)
+        last_commit = _last_commit(repo_root, rel_path) if oid else ""
+        cached = cache.get(oid, last_commit, rel_path) if last_commit else None
+        if cached is not None:
+            return rel_path, cached
+        try:
+            result = _blame_file(repo_root, rel_path)
+        except Exception as e:
+            logger.error(f"Failed to blame {rel_path}: {e}")
+            return rel_path, None
+        # Uncommitted lines get attributed once they are committed; don't pin them
+        if last_commit and UNCOMMITTED not in result["commits"]:
+            cache.set(oid, last_commit, rel_path, result)
+        return rel_path, result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        blames = dict(pool.map(blame, list(by_file)))
+
+    results = [dict(unknown) for _ in findings]
+    for rel_path, indices in by_file.items():
+        file_blame = blames.get(rel_path)
+        if not file_blame:
+            continue
+        for i in indices:
+            line = int(findings[i].get("line") or 0)
+            if not 0 < line <= len(file_blame["lines"]):
+                continue
+            sha = file_blame["lines"][line - 1]
+            commit = file_blame["commits"].get(sha)
+            if commit is None:
+                continue
+            if sha == UNCOMMITTED:
+                results[i] = {"author": "Not Committed Yet", "commit_hash": sha, "line": line,
+                              "sociotech_risk_modifier": 0.0}
+                continue
+            commit_time = _commit_datetime(commit)
+            results[i] = {
+                "author": commit.get("email", "Unknown"),
+                "author_name": commit.get("author", ""),
+                "commit_hash": sha,
+                "time": str(commit_time),
+                "line": line,
+                "sociotech_risk_modifier": _risk_modifier(commit_time),
+            }
+    return results
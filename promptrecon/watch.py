@@ -0,0 +1,258 @@
+# file: promptrecon/watch.py
+
+"""
+promptrecon watch：首次全量扫描，之后只重扫新建 / 修改的文件，输出 findings 增量。
+
+- Linux 用 inotify（ctypes 直接调 libc，零依赖）；不可用时（非 Linux、
+  watch 数超过 fs.inotify.max_user_watches 等）退回按 mtime/size 轮询
+- 事件先去抖：debounce 秒内没有新事件才扫描，编辑器一次保存触发的多个事件只扫一次
+- 规则只编译一次，每个文件的 findings 常驻内存；增量按 baseline 指纹
+  （rule, path, snippet，与行号无关）比较，上方插行不会产生噪声
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from collections import Counter
+
+from .baseline import finding_fingerprint
+from .core import scan_file, should_ignore
+
+# inotify 常量（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+               | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _dir_ignored(path, ignore_patterns):
+    # 'venv/*' 这类规则要带上结尾的 / 才能匹配到目录本身
+    return (should_ignore(path, ignore_patterns)
+            or should_ignore(os.path.join(path, ''), ignore_patterns))
+
+
+def iter_watch_files(directory, ignore_patterns):
+    """与 scan 相同的遍历 + 忽略规则。"""
+    for root, dirs, files in os.walk(directory, topdown=True):
+        dirs[:] = [d for d in dirs if not _dir_ignored(os.path.join(root, d), ignore_patterns)]
+        for fname in files:
+            fpath = os.path.join(root, fname)
+            if not should_ignore(fpath, ignore_patterns):
+                yield fpath
+
+
+class InotifyWatcher:
+    """递归 inotify。poll() 返回变化的路径集合；队列溢出时返回 None（需要全量重扫）。"""
+
+    def __init__(self, directory, ignore_patterns):
+        self.ignore_patterns = ignore_patterns
+        path = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(path, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}  # wd -> 目录路径
+        try:
+            self._add_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_dir(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # 目录已被删除 / 无权限：跳过
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = path
+
+    def _add_tree(self, directory):
+        """给目录及其子目录加 watch，返回其中已有的文件（新建目录时要补扫）。"""
+        found = []
+        for root, dirs, files in os.walk(directory, topdown=True):
+            dirs[:] = [d for d in dirs if not _dir_ignored(os.path.join(root, d), self.ignore_patterns)]
+            self._add_dir(root)
+            found.extend(os.path.join(root, f) for f in files)
+        return found
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                parent = self._dirs.get(wd)
+                if parent is None or mask & IN_DELETE_SELF:
+                    continue
+                path = os.path.join(parent, os.fsdecode(name.rstrip(b'\0')))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _dir_ignored(path, self.ignore_patterns):
+                        changed.update(self._add_tree(path))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        changed.add(path)  # 目录下的所有结果一起作废
+                    continue
+                changed.add(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """轮询兜底：每 interval 秒对比一次 (mtime_ns, size) 快照。"""
+
+    def __init__(self, directory, ignore_patterns, interval=1.0):
+        self.directory = directory
+        self.ignore_patterns = ignore_patterns
+        self.interval = interval
+        self._snapshot = self._take()
+
+    def _take(self):
+        snapshot = {}
+        for fpath in iter_watch_files(self.directory, self.ignore_patterns):
+            try:
+                st = os.stat(fpath)
+            except OSError:
+                continue
+            snapshot[fpath] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        old, self._snapshot = self._snapshot, self._take()
+        return {p for p in old.keys() | self._snapshot.keys() if old.get(p) != self._snapshot.get(p)}
+
+    def close(self):
+        pass
+
+
+def create_watcher(directory, ignore_patterns, poll=False, interval=1.0):
+    """优先 inotify，失败或 poll=True 时用轮询。"""
+    if not poll:
+        try:
+            return InotifyWatcher(directory, ignore_patterns)
+        except (OSError, AttributeError):
+            pass  # 非 Linux（libc 没有 inotify_*）或 watch 数超限
+    return PollingWatcher(directory, ignore_patterns, interval)
+
+
+class WatchSession:
+    """
+    常驻内存的扫描状态：path -> findings。rescan() 返回 (新增, 已消失) 两个 findings 列表。
+    """
+
+    def __init__(self, directory, rules, ignore_patterns, strings_only=False):
+        self.directory = directory
+        self.rules = rules
+        self.ignore_patterns = ignore_patterns
+        self.strings_only = strings_only
+        self.results = {}
+
+    def initial_scan(self):
+        return self.rescan(iter_watch_files(self.directory, self.ignore_patterns))
+
+    def rescan(self, paths):
+        added, resolved = [], []
+        for path in paths:
+            if os.path.isdir(path):
+                continue  # 目录的创建事件已展开成其中的文件
+            old = self.results.pop(path, [])
+            if os.path.isfile(path) and not should_ignore(path, self.ignore_patterns):
+                new = scan_file(path, self.rules, display_root=self.directory,
+                                strings_only=self.strings_only)
+            else:
+                new = []
+                # 被删除的目录：其下所有文件的结果一起移除
+                prefix = os.path.join(path, '')
+                for gone in [p for p in self.results if p.startswith(prefix)]:
+                    resolved.extend(self.results.pop(gone))
+            if new:
+                self.results[path] = new
+            a, r = diff_findings(old, new)
+            added.extend(a)
+            resolved.extend(r)
+        return added, resolved
+
+
+def diff_findings(old, new):
+    """按指纹多重集比较：同一 snippet 出现两次也能正确计数。"""
+    old_counts = Counter(finding_fingerprint(f) for f in old)
+    new_counts = Counter(finding_fingerprint(f) for f in new)
+    added, resolved = [], []
+    remaining = new_counts - old_counts
+    for f in new:
+        fp = finding_fingerprint(f)
+        if remaining[fp] > 0:
+            remaining[fp] -= 1
+            added.append(f)
+    remaining = old_counts - new_counts
+    for f in old:
+        fp = finding_fingerprint(f)
+        if remaining[fp] > 0:
+            remaining[fp] -= 1
+            resolved.append(f)
+    return added, resolved
+
+
+def run_watch(directory, rules, ignore_patterns, on_change, poll=False, interval=1.0,
+              debounce=0.3, strings_only=False, should_stop=lambda: False):
+    """
+    初始扫描后进入监听循环，每批变化扫描完调用 on_change(added, resolved, session)。
+    返回所用 watcher 的类型名（便于提示用户当前是 inotify 还是轮询）。
+    """
+    session = WatchSession(directory, rules, ignore_patterns, strings_only)
+    watcher = create_watcher(directory, ignore_patterns, poll=poll, interval=interval)
+    try:
+        added, resolved = session.initial_scan()
+        on_change(added, resolved, session)
+        pending = set()
+        last_event = 0.0
+        while not should_stop():
+            changed = watcher.poll(debounce if pending else 1.0)
+            if changed is None:  # inotify 队列溢出：全量重扫
+                changed = set(iter_watch_files(directory, ignore_patterns)) | set(session.results)
+            if changed:
+                pending |= changed
+                last_event = time.monotonic()
+                continue
+            if pending and time.monotonic() - last_event >= debounce:
+                batch, pending = sorted(pending), set()
+                added, resolved = session.rescan(batch)
+                if added or resolved:
+                    on_change(added, resolved, session)
+    finally:
+        watcher.close()
+    return type(watcher).__name__
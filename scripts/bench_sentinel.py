@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# file: scripts/bench_sentinel.py
+
+"""
+Sentinel 压测脚本：本地 stub LLM + run_sentinel 代理 + 并发压测。
+运行方式: python3 scripts/bench_sentinel.py --concurrency 64 --requests 2000
+
+流程：
+  1. 启动 stub 上游（JSON / SSE 响应，可配置延迟与 token 速率）
+  2. 通过 run_sentinel() 启动代理（可配置 workers），上游指向 stub
+  3. 先直连 stub 压一轮作为基线，再经代理压一轮
+  4. 输出代理额外引入的 p50/p95/p99 延迟、requests/s、代理进程 RSS
+
+不需要任何真实 LLM provider；依赖 fastapi/uvicorn/httpx（sentinel 本身的依赖）。
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import pathlib
+import socket
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+
+# ---- stub 上游 ----
+def _make_stub_app(latency_ms, tokens, token_rate):
+    """最小 ASGI 应用：stream=true 时返回 SSE，否则延迟后返回 JSON。"""
+
+    async def app(scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        try:
+            stream = bool(json.loads(body or b'{}').get('stream'))
+        except ValueError:
+            stream = False
+
+        await asyncio.sleep(latency_ms / 1000.0)
+        if not stream:
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok " * tokens}}],
+            }).encode()
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'application/json')]})
+            await send({'type': 'http.response.body', 'body': payload})
+            return
+
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream')]})
+        interval = 1.0 / token_rate if token_rate > 0 else 0.0
+        for i in range(tokens):
+            chunk = json.dumps({"choices": [{"index": 0, "delta": {"content": f"t{i} "}}]})
+            await send({'type': 'http.response.body',
+                        'body': f"data: {chunk}\n\n".encode(), 'more_body': True})
+            if interval:
+                await asyncio.sleep(interval)
+        await send({'type': 'http.response.body', 'body': b"data: [DONE]\n\n"})
+
+    return app
+
+
+def _run_stub(port, latency_ms, tokens, token_rate):
+    import uvicorn
+    uvicorn.run(_make_stub_app(latency_ms, tokens, token_rate),
+                host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+
+
+def _run_proxy(port, upstream_port, workers):
+    from promptrecon.dynamic.sentinel_proxy import run_sentinel
+    run_sentinel(port, workers=workers, log_level="warning",
+                 base_url=f"http://127.0.0.1:{upstream_port}")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+def _rss_bytes(pid):
+    """进程及其子进程（uvicorn workers）的 RSS 之和，读 /proc，仅 Linux。"""
+    total = 0
+    pending = [pid]
+    while pending:
+        p = pending.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pending.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+# ---- 压测 ----
+def _payload(messages, stream):
+    msgs = [{"role": "system", "content": "You are a helpful assistant for ACME support."}]
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        msgs.append({"role": role, "content": f"message {i}: how do I reset my router?"})
+    return {"model": "stub", "messages": msgs, "stream": stream}
+
+
+async def _drive(base_url, total, concurrency, payload):
+    """并发发送 total 个请求，返回 (总延迟列表, 首字节延迟列表, 耗时, 失败数)。"""
+    import httpx
+
+    latencies, ttfbs = [], []
+    failures = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal failures
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                first = None
+                try:
+                    async with client.stream("POST", "/v1/chat/completions", json=payload) as r:
+                        async for _ in r.aiter_raw():
+                            if first is None:
+                                first = time.perf_counter()
+                        if r.status_code != 200:
+                            failures += 1
+                            continue
+                except Exception:
+                    failures += 1
+                    continue
+                end = time.perf_counter()
+                latencies.append(end - start)
+                ttfbs.append((first or end) - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, ttfbs, elapsed, failures
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summarize(latencies, ttfbs, elapsed, failures):
+    latencies, ttfbs = sorted(latencies), sorted(ttfbs)
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        **{f"p{p}": _percentile(latencies, p) for p in (50, 95, 99)},
+        **{f"ttfb_p{p}": _percentile(ttfbs, p) for p in (50, 95, 99)},
+    }
+
+
+def _print_report(direct, proxied, rss, args):
+    ms = lambda v: f"{v * 1000:9.2f} ms"
+    print(f"\nSentinel benchmark: {args.requests} requests, concurrency {args.concurrency}, "
+          f"workers {args.workers}, stream={args.stream}")
+    print(f"{'':18}{'direct':>12}{'proxied':>12}{'added':>12}")
+    for key in ("p50", "p95", "p99", "ttfb_p50", "ttfb_p95", "ttfb_p99"):
+        print(f"{key:18}{ms(direct[key])}{ms(proxied[key])}{ms(proxied[key] - direct[key])}")
+    print(f"{'requests/s':18}{direct['rps']:12.1f}{proxied['rps']:12.1f}")
+    print(f"{'failed':18}{direct['failed']:12d}{proxied['failed']:12d}")
+    print(f"{'proxy RSS':18}{'':12}{rss / 1024 / 1024:9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the sentinel proxy against a local stub LLM.")
+    parser.add_argument('--requests', type=int, default=1000, help="Requests per run")
+    parser.add_argument('--concurrency', type=int, default=32, help="Concurrent client connections")
+    parser.add_argument('--workers', type=int, default=1, help="Sentinel worker processes")
+    parser.add_argument('--stream', action='store_true', help="Request SSE streaming responses")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Stub latency before first byte")
+    parser.add_argument('--tokens', type=int, default=20, help="Tokens per stub response")
+    parser.add_argument('--token-rate', type=float, default=200.0, help="Stub SSE tokens per second (0 = no delay)")
+    parser.add_argument('--messages', type=int, default=4, help="Conversation messages per request")
+    parser.add_argument('--json', dest='json_out', help="Also write results as JSON to this file")
+    args = parser.parse_args()
+
+    stub_port, proxy_port = _free_port(), _free_port()
+    stub = multiprocessing.Process(
+        target=_run_stub, args=(stub_port, args.latency_ms, args.tokens, args.token_rate), daemon=True)
+    # 代理不能是 daemon：workers > 1 时 uvicorn 需要再派生子进程
+    proxy = multiprocessing.Process(
+        target=_run_proxy, args=(proxy_port, stub_port, args.workers))
+    stub.start()
+    proxy.start()
+    try:
+        _wait_for_port(stub_port)
+        _wait_for_port(proxy_port)
+        payload = _payload(args.messages, args.stream)
+
+        # 预热：建立连接池、加载规则
+        asyncio.run(_drive(f"http://127.0.0.1:{proxy_port}", args.concurrency, args.concurrency, payload))
+
+        direct = _summarize(*asyncio.run(
+            _drive(f"http://127.0.0.1:{stub_port}", args.requests, args.concurrency, payload)))
+        proxied = _summarize(*asyncio.run(
+            _drive(f"http://127.0.0.1:{proxy_port}", args.requests, args.concurrency, payload)))
+        rss = _rss_bytes(proxy.pid)
+    finally:
+        for p in (proxy, stub):
+            p.terminate()
+            p.join(timeout=5)
+
+    _print_report(direct, proxied, rss, args)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "direct": direct, "proxied": proxied,
+                       "proxy_rss_bytes": rss}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
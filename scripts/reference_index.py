@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# file: scripts/reference_index.py
+
+"""
+VectorAnomalyDetector 参考索引工具。
+
+离线构建（每行一条已知泄漏 / 越狱 prompt）:
+    python3 scripts/reference_index.py build known_prompts.txt ref_index/
+    # 之后: VectorAnomalyDetector(reference_index="ref_index/")
+
+离线环境（无需下载模型，运行时也要用同一个 backend）:
+    python3 scripts/reference_index.py build known_prompts.txt ref_index/ --backend hashing
+
+召回率 / 延迟基准（合成聚类数据，不需要模型）:
+    python3 scripts/reference_index.py bench --size 50000 --queries 500
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from promptrecon.ml.reference_index import build_index, save_index, ExactIndex, IVFIndex
+
+
+def cmd_build(args):
+    from promptrecon.ml.embedding_backends import get_backend
+
+    with open(args.prompts, 'r', encoding='utf-8') as f:
+        prompts = [line.strip() for line in f if line.strip()]
+    if not prompts:
+        print("Error: no prompts found", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.backend == "sentence-transformers":
+            backend = get_backend(args.backend, model_name=args.model)
+        else:
+            backend = get_backend(args.backend)
+    except Exception as e:
+        print(f"Error: embedding backend could not be loaded: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    embeddings = backend.encode(prompts)
+    encoded = time.perf_counter()
+    index = build_index(embeddings, kind=args.kind)
+    save_index(index, args.output, model_name=backend.name)
+    print(f"[+] Encoded {len(prompts)} prompt(s) in {encoded - started:.1f}s, "
+          f"built {index.kind} index in {time.perf_counter() - encoded:.1f}s -> {args.output}")
+
+
+def _synthetic(size, queries, dim, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    base = centers[rng.integers(0, clusters, size)] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+    # 查询 = 参考集中随机样本 + 扰动，模拟"改写过的已知 prompt"
+    picks = rng.integers(0, size, queries)
+    query = base[picks] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    return base, query
+
+
+def _timed_search(index, queries, k, **kwargs):
+    started = time.perf_counter()
+    _, ids = index.search(queries, k=k, **kwargs)
+    return ids, (time.perf_counter() - started) / len(queries) * 1000.0
+
+
+def _recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def cmd_bench(args):
+    base, queries = _synthetic(args.size, args.queries, args.dim, args.clusters, args.seed)
+
+    started = time.perf_counter()
+    exact = ExactIndex.build(base)
+    print(f"Reference set: {args.size} x {args.dim}, {args.queries} queries, k={args.k}")
+    truth, exact_ms = _timed_search(exact, queries, args.k)
+    print(f"{'exact':16} build {time.perf_counter() - started:7.2f}s  "
+          f"{exact_ms:8.3f} ms/query  recall@{args.k} 1.000")
+
+    started = time.perf_counter()
+    ivf = IVFIndex.build(base, nlist=args.nlist)
+    build_s = time.perf_counter() - started
+    for nprobe in args.nprobe:
+        found, ms = _timed_search(ivf, queries, args.k, nprobe=nprobe)
+        print(f"{'ivf nprobe=' + str(nprobe):16} build {build_s:7.2f}s  "
+              f"{ms:8.3f} ms/query  recall@{args.k} {_recall(truth, found):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or benchmark reference indexes for the vector detector.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Embed a prompt list and write an index directory")
+    build.add_argument("prompts", help="Text file, one known prompt per line")
+    build.add_argument("output", help="Index directory to write")
+    build.add_argument("--model", default="BAAI/bge-small-zh-v1.5", help="Embedding model name")
+    build.add_argument("--kind", default="auto", choices=["auto", "exact", "ivf"])
+    build.add_argument("--backend", default="sentence-transformers",
+                       choices=["sentence-transformers", "hashing"],
+                       help="Embedding backend; the detector must use the same one at runtime")
+
+    bench = subparsers.add_parser("bench", help="Recall/latency of IVF vs exact search on synthetic data")
+    bench.add_argument("--size", type=int, default=50000)
+    bench.add_argument("--queries", type=int, default=500)
+    bench.add_argument("--dim", type=int, default=512)
+    bench.add_argument("--clusters", type=int, default=200)
+    bench.add_argument("--k", type=int, default=5)
+    bench.add_argument("--nlist", type=int, default=None)
+    bench.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    bench.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        cmd_build(args)
+    else:
+        cmd_bench(args)
+
+
+if __name__ == '__main__':
+    main()
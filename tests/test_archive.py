@@ -0,0 +1,93 @@
+"""
+归档内扫描测试
+
+1. zip / tar.gz / 单文件 .gz 成员被扫描，嵌套归档按 archive_depth 递归，路径为 归档!成员
+2. 成员同样走二进制过滤；损坏的归档只跳过；不开 archives 时归档按二进制跳过
+3. 损坏 / 截断的 .gz 不中断扫描；zip 中单个成员损坏时其余成员照常扫描
+"""
+
+import gzip
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon import Scanner
+
+KEY = b'k = "sk-abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJ"\n'
+
+
+class TestArchiveScan(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_archive_')
+        self.addCleanup(shutil.rmtree, self.root)
+
+        inner = io.BytesIO()
+        with zipfile.ZipFile(inner, 'w') as zf:
+            zf.writestr('conf/app.properties', KEY)
+            zf.writestr('blob.bin', b'\x00' + KEY)
+        with zipfile.ZipFile(self._path('app.whl'), 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('pkg/mod.py', KEY)
+            zf.writestr('lib/inner.jar', inner.getvalue())
+        with tarfile.open(self._path('release.tar.gz'), 'w:gz') as tf:
+            info = tarfile.TarInfo('src/settings.txt')
+            info.size = len(KEY)
+            tf.addfile(info, io.BytesIO(KEY))
+        with gzip.open(self._path('app.log.gz'), 'wb') as f:
+            f.write(b'boot\n' * 3 + KEY)
+        with open(self._path('broken.zip'), 'wb') as f:
+            f.write(b'PK\x03\x04 truncated')
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _scan(self, **options):
+        with Scanner(root=self.root, ignore_patterns=[], **options) as scanner:
+            return sorted((f['file'], f['line']) for f in scanner.scan_path(self.root))
+
+    def test_members_and_nesting(self):
+        self.assertEqual(self._scan(archives=True, workers=1), [
+            ('app.log.gz!app.log', 4),
+            ('app.whl!lib/inner.jar!conf/app.properties', 1),
+            ('app.whl!pkg/mod.py', 1),
+            ('release.tar.gz!src/settings.txt', 1),
+        ])
+        shallow = self._scan(archives=True, workers=1, archive_depth=1)
+        self.assertNotIn(('app.whl!lib/inner.jar!conf/app.properties', 1), shallow)
+        self.assertEqual(len(shallow), 3)
+
+    def test_parallel_matches_serial_and_opt_in(self):
+        self.assertEqual(self._scan(archives=True, workers=2), self._scan(archives=True, workers=1))
+        self.assertEqual(self._scan(), [])
+
+    def test_corrupt_members_are_skipped(self):
+        compressed = gzip.compress(KEY * 50)
+        with open(self._path('ci.log.gz'), 'wb') as f:
+            f.write(compressed[:20] + b'\xff' * 10 + compressed[30:])
+        with open(self._path('truncated.log.gz'), 'wb') as f:
+            f.write(compressed[:len(compressed) // 2])
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('bad.txt', KEY * 50)
+            zf.writestr('good.txt', KEY)
+        data = bytearray(buf.getvalue())
+        pos = data.find(b'bad.txt') + len('bad.txt') + 10  # 破坏 bad.txt 的压缩数据
+        data[pos:pos + 8] = b'\x00' * 8
+        with open(self._path('mixed.zip'), 'wb') as f:
+            f.write(data)
+
+        found = self._scan(archives=True, workers=1)
+        self.assertIn(('mixed.zip!good.txt', 1), found)
+        self.assertFalse([f for f, _ in found if f.startswith(('ci.log.gz', 'truncated', 'mixed.zip!bad'))])
+
+
+if __name__ == '__main__':
+    unittest.main()
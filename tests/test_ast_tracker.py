@@ -0,0 +1,81 @@
+"""
+CPG 单次遍历摘要测试
+
+1. FileSummaryVisitor 在一次遍历里收集 prompt 变量赋值（常量、f-string 模板）和 LLM 调用点，
+   结果与旧的逐变量 trace_variable_in_file + trace_api_calls_in_file 一致
+2. build_project_cpg 的进程池路径与串行路径结果完全相同；无法解析的文件被跳过
+"""
+
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.cpg.ast_tracker import (PARALLEL_MIN_FILES, PROMPT_VARIABLE_NAMES, FileSummaryVisitor,
+                                         build_project_cpg, summarize_file, trace_api_calls_in_file,
+                                         trace_variable_in_file)
+
+FIXTURE = '''import openai
+from langchain.chat_models import ChatOpenAI
+
+prompt = "Summarize the ticket."
+system_prompt = "You are the billing bot."
+other = "not a prompt variable"
+system_prompt = f"You serve {customer.name} on {plan!r} tier."
+instruction = compute()  # 非常量不记录
+
+
+def ask(q):
+    client = openai.OpenAI()
+    llm = ChatOpenAI(model="gpt-4o")
+    print(q)
+    return client.chat.completions.create(messages=[{"role": "system", "content": system_prompt}])
+'''
+
+
+class TestAstTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_cpg_')
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_file_summary_visitor(self):
+        visitor = FileSummaryVisitor()
+        visitor.visit(ast.parse(FIXTURE))
+        self.assertEqual(dict(visitor.assignments), {
+            "prompt": ["Summarize the ticket."],
+            "system_prompt": ["You are the billing bot.", "You serve {customer.name} on {plan} tier."],
+        })
+        self.assertEqual(visitor.prompts, ["You are the billing bot.", "You serve {customer.name} on {plan} tier.",
+                                           "Summarize the ticket."])
+        self.assertEqual(visitor.calls, [
+            {"type": "api_call", "name": "ChatOpenAI", "line": 13},
+            {"type": "api_call", "name": "client.chat.completions.create", "line": 15},
+        ])
+
+        path = os.path.join(self.root, 'app.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(FIXTURE)
+        legacy = [src for name in PROMPT_VARIABLE_NAMES for src in trace_variable_in_file(path, name)]
+        self.assertEqual(summarize_file(path), (legacy, trace_api_calls_in_file(path)))
+
+    def test_parallel_matches_serial(self):
+        for i in range(PARALLEL_MIN_FILES + 6):
+            with open(os.path.join(self.root, f'mod{i}.py'), 'w', encoding='utf-8') as f:
+                f.write(FIXTURE if i % 3 == 0 else (f'prompt = "p{i}"\n' if i % 3 == 1 else 'x = 1\n'))
+        with open(os.path.join(self.root, 'broken.py'), 'w', encoding='utf-8') as f:
+            f.write('prompt = (\n')
+
+        serial = build_project_cpg(self.root, workers=1)
+        self.assertEqual(build_project_cpg(self.root, workers=2), serial)
+        self.assertEqual(len(serial), sum(1 for i in range(PARALLEL_MIN_FILES + 6) if i % 3 != 2))
+        self.assertNotIn(os.path.join(self.root, 'broken.py'), serial)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Baseline 指纹测试
+
+1. 指纹与行号无关、对空白/路径分隔符稳定
+2. scan --write-baseline 后再 --baseline 扫描，只报告新增 finding
+3. 已知 secret 在同一文件里多复制一份时，超出 baseline 次数的那份照常报告；兼容旧版只有指纹列表的 baseline
+"""
+
+import unittest
+import tempfile
+import subprocess
+import os
+import sys
+import shutil
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.baseline import finding_fingerprint, filter_new_findings, load_baseline
+
+
+class TestBaseline(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='pr_baseline_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _scan(self, *extra):
+        return subprocess.run(
+            [sys.executable, '-m', 'promptrecon', 'scan', '-d', self.temp_dir, *extra],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+
+    def test_fingerprint_is_stable(self):
+        a = {'rule_name': 'generic_secret', 'file': 'src\\a.py',
+             'snippet': 'token =  "abcdefghij"', 'line': 3}
+        b = {'rule_name': 'generic_secret', 'file': './src/a.py',
+             'snippet': 'token = "abcdefghij"', 'line': 40}
+        self.assertEqual(finding_fingerprint(a), finding_fingerprint(b))
+
+        c = dict(b, rule_name='openai_api_key')
+        self.assertNotEqual(finding_fingerprint(b), finding_fingerprint(c))
+        self.assertEqual(filter_new_findings([a, c], {finding_fingerprint(b)}), [c])
+
+    def test_write_then_filter(self):
+        with open(os.path.join(self.temp_dir, 'old.py'), 'w') as f:
+            f.write('api_key = "sk-legacy-accepted-value"\n')
+        baseline_path = os.path.join(self.temp_dir, 'baseline.json')
+
+        result = self._scan('--write-baseline', baseline_path)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertTrue(os.path.exists(baseline_path))
+
+        # 已知 finding 上移一行，仍应被屏蔽
+        with open(os.path.join(self.temp_dir, 'old.py'), 'w') as f:
+            f.write('import os\napi_key = "sk-legacy-accepted-value"\n')
+        result = self._scan('--baseline', baseline_path)
+        self.assertIn('No secrets found', result.stdout)
+
+        with open(os.path.join(self.temp_dir, 'new.py'), 'w') as f:
+            f.write('password = "brand-new-secret"\n')
+        jsonl_path = os.path.join(self.temp_dir, 'out.jsonl')
+        result = self._scan('--baseline', baseline_path, '--jsonl', jsonl_path)
+        combined = result.stdout + result.stderr
+        self.assertIn('new.py', combined)
+        self.assertNotIn('old.py', combined)
+        with open(jsonl_path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_duplicate_copy_is_reported(self):
+        secret = 'api_key = "sk-legacy-accepted-value"\n'
+        with open(os.path.join(self.temp_dir, 'old.py'), 'w') as f:
+            f.write(secret)
+        baseline_path = os.path.join(self.temp_dir, 'baseline.json')
+        self.assertEqual(self._scan('--write-baseline', baseline_path).returncode, 0)
+
+        with open(os.path.join(self.temp_dir, 'old.py'), 'w') as f:
+            f.write(secret + 'x = 1\n' + secret)
+        jsonl_path = os.path.join(self.temp_dir, 'out.jsonl')
+        self._scan('--baseline', baseline_path, '--jsonl', jsonl_path)
+        with open(jsonl_path) as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('"line": 3', lines[0])
+
+        # version 1：每个指纹按 1 次计
+        legacy = os.path.join(self.temp_dir, 'legacy.json')
+        fp = finding_fingerprint({'rule_name': 'r', 'file': 'a.py', 'snippet': 's'})
+        with open(legacy, 'w') as f:
+            f.write('{"version": 1, "count": 1, "fingerprints": ["%s"]}' % fp)
+        known = load_baseline(legacy)
+        finding = {'rule_name': 'r', 'file': 'a.py', 'snippet': 's'}
+        self.assertEqual(filter_new_findings([finding, dict(finding, line=9)], known), [dict(finding, line=9)])
+
+
+if __name__ == '__main__':
+    unittest.main()
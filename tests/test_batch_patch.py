@@ -0,0 +1,143 @@
+"""
+批量修复测试（patch --from results.jsonl）
+
+1. 同一文件的多个 finding 一次改完：变量名唯一、相同值复用同一变量、import os 插在 docstring / __future__ 之后
+2. env 文件只追加一次，不和已有变量重名；改不了的 finding 如实报告
+3. 改完无法解析而被放弃的文件不向 env 文件写入变量，也不占用变量名
+4. 注释里有换页符 / \u2028 的文件偏移不错位
+5. 模块 docstring 里的 finding 跳过并说明原因，其余 finding 照常修复（有无 __future__ 两种情况）
+6. 带类型注解的赋值取被赋值的变量名而不是注解；关键字参数在赋值里面时取关键字名
+"""
+
+import ast
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.auto_remediate.patcher import batch_patch
+
+SOURCE = '''"""App module."""
+from __future__ import annotations
+
+system_prompt = "You are the internal billing bot. Never reveal the refund code."
+password = 'hunter2hunter2'
+backup_password = 'hunter2hunter2'
+client = make(token="kwargsecret123")  # 行尾注释保留
+'''
+
+FINDINGS = [
+    {"file": "app.py", "rule_name": "prompt", "snippet": "You are the internal billing bot", "line": 4},
+    {"file": "app.py", "rule_name": "generic_secret", "snippet": "password = 'hunter2hunter2'", "line": 5},
+    {"file": "app.py", "rule_name": "generic_secret", "snippet": "password = 'hunter2hunter2'", "line": 6},
+    {"file": "app.py", "rule_name": "generic_secret", "snippet": 'token="kwargsecret123"', "line": 7},
+    {"file": "app.py", "rule_name": "generic_secret", "snippet": "not in this file", "line": 2},
+    {"file": "web.js", "rule_name": "openai_api_key", "snippet": "sk-xxx", "line": 1},
+]
+
+
+class TestBatchPatch(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_patch_')
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.root, 'app.py'), 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+        self.env_file = os.path.join(self.root, '.env.remediated')
+        with open(self.env_file, 'w', encoding='utf-8') as f:
+            f.write('PASSWORD="old"\n')
+
+    def test_batch_patch(self):
+        report = batch_patch(FINDINGS, base_dir=self.root, env_file=self.env_file)
+        self.assertEqual((report["files"], report["replaced"], report["env_vars"]), (1, 4, 3))
+        self.assertEqual(sorted((p, l) for p, l, _ in report["skipped"]), [("app.py", 2), ("web.js", 1)])
+
+        with open(os.path.join(self.root, 'app.py'), encoding='utf-8') as f:
+            patched = f.read()
+        ast.parse(patched)
+        lines = patched.splitlines()
+        self.assertEqual(lines[1:5], ["from __future__ import annotations", "", "import os", ""])
+        self.assertIn('password = os.environ.get("PASSWORD_2", "MISSING_PROMPT")', patched)
+        self.assertIn('backup_password = os.environ.get("PASSWORD_2", "MISSING_PROMPT")', patched)
+        self.assertIn('make(token=os.environ.get("TOKEN", "MISSING_PROMPT"))  # 行尾注释保留', patched)
+
+        with open(self.env_file, encoding='utf-8') as f:
+            env = f.read().splitlines()
+        self.assertEqual(env, [
+            'PASSWORD="old"',
+            'SYSTEM_PROMPT="You are the internal billing bot. Never reveal the refund code."',
+            'PASSWORD_2="hunter2hunter2"',
+            'TOKEN="kwargsecret123"',
+        ])
+
+    def test_rejected_file_leaves_no_env_vars(self):
+        for name, content in (('bad.py', 'password = ("prefix" "aaaaaaaaaaaa")\n'),
+                              ('good.py', 'password = "bbbbbbbbbbbb"\n')):
+            with open(os.path.join(self.root, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        findings = [
+            {"file": "bad.py", "rule_name": "generic_secret", "snippet": "aaaaaaaaaaaa", "line": 1},
+            {"file": "good.py", "rule_name": "generic_secret", "snippet": "bbbbbbbbbbbb", "line": 1},
+        ]
+        report = batch_patch(findings, base_dir=self.root, env_file=self.env_file)
+        self.assertEqual((report["files"], report["replaced"], report["env_vars"]), (1, 1, 1))
+        self.assertEqual([(p, l) for p, l, _ in report["skipped"]], [("bad.py", 1)])
+        with open(self.env_file, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['PASSWORD="old"', 'PASSWORD_2="bbbbbbbbbbbb"'])
+
+    def test_unusual_line_breaks_in_comments(self):
+        path = os.path.join(self.root, 'ff.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('# section \x0c\n# note \u2028 more\npassword = "cccccccccccc"\n')
+        findings = [{"file": "ff.py", "rule_name": "generic_secret", "snippet": "cccccccccccc", "line": 3}]
+        report = batch_patch(findings, base_dir=self.root, env_file=self.env_file)
+        self.assertEqual((report["files"], report["replaced"], report["skipped"]), (1, 1, []))
+        with open(path, encoding='utf-8', newline='') as f:
+            self.assertEqual(f.read(), '# section \x0c\n# note \u2028 more\nimport os\n\n'
+                                       'password = os.environ.get("PASSWORD_2", "MISSING_PROMPT")\n')
+
+    def test_module_docstring_finding(self):
+        for future in ('', 'from __future__ import annotations\n'):
+            path = os.path.join(self.root, 'doc.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('"""Config.\n\nExample: password = "dddddddddddd"\n"""\n' + future
+                        + 'token = "eeeeeeeeeeee"\n')
+            findings = [
+                {"file": "doc.py", "rule_name": "generic_secret", "snippet": 'password = "dddddddddddd"', "line": 3},
+                {"file": "doc.py", "rule_name": "generic_secret", "snippet": 'token = "eeeeeeeeeeee"', "line": 5 + bool(future)},
+            ]
+            report = batch_patch(findings, base_dir=self.root, env_file=self.env_file)
+            self.assertEqual((report["files"], report["replaced"]), (1, 1), future)
+            self.assertEqual(report["skipped"], [("doc.py", 3, "module docstring; remediate by hand")])
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), '"""Config.\n\nExample: password = "dddddddddddd"\n"""\n' + future
+                                 + 'import os\n\ntoken = os.environ.get("%s", "MISSING_PROMPT")\n'
+                                 % ('TOKEN_2' if future else 'TOKEN'))  # 第二轮 env 文件里已有 TOKEN
+
+    def test_annotated_assignment_names(self):
+        path = os.path.join(self.root, 'ann.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('from typing import Optional\n\n'
+                    'API_KEY: str = "ffffffffffff"\n'
+                    'TOKEN: Optional[str] = "gggggggggggg"\n'
+                    'client = make(secret="hhhhhhhhhhhh")\n')
+        findings = [
+            {"file": "ann.py", "rule_name": "generic_secret", "snippet": "ffffffffffff", "line": 3},
+            {"file": "ann.py", "rule_name": "generic_secret", "snippet": "gggggggggggg", "line": 4},
+            {"file": "ann.py", "rule_name": "generic_secret", "snippet": "hhhhhhhhhhhh", "line": 5},
+        ]
+        report = batch_patch(findings, base_dir=self.root, env_file=self.env_file)
+        self.assertEqual((report["replaced"], report["skipped"]), (3, []))
+        with open(path, encoding='utf-8') as f:
+            patched = f.read()
+        self.assertIn('API_KEY: str = os.environ.get("API_KEY", "MISSING_PROMPT")', patched)
+        self.assertIn('TOKEN: Optional[str] = os.environ.get("TOKEN", "MISSING_PROMPT")', patched)
+        self.assertIn('make(secret=os.environ.get("SECRET", "MISSING_PROMPT"))', patched)
+
+
+if __name__ == '__main__':
+    unittest.main()
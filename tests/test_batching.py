@@ -0,0 +1,72 @@
+"""
+Sentinel 检测器微批处理测试（纯标准库）
+
+1. 待处理条数达到 max_batch_size 立即合批，不等计时器
+2. 不足一批时由计时器触发，并发调用方合成一次 score_fn 调用
+3. score_fn 抛错 / 返回条数不对 / executor 已关闭时，所有调用方都收到异常而不是一直挂起
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.dynamic.batching import MicroBatcher
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+        self.calls = []
+
+    def _score(self, texts):
+        self.calls.append(list(texts))
+        return [float(len(t)) for t in texts]
+
+    def test_size_triggered_flush(self):
+        # 计时器 60 秒：只有按条数触发才能按时完成
+        batcher = MicroBatcher(self._score, self.pool, max_batch_size=2, max_wait_ms=60000)
+
+        async def run():
+            return await asyncio.wait_for(batcher.score_many(["a", "bb", "ccc", "dddd"]), 5)
+        self.assertEqual(asyncio.run(run()), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(self.calls, [["a", "bb"], ["ccc", "dddd"]])
+
+    def test_timer_triggered_flush(self):
+        batcher = MicroBatcher(self._score, self.pool, max_batch_size=32, max_wait_ms=5)
+
+        async def run():
+            return await asyncio.gather(batcher.score_many(["a"]), batcher.score_many(["bb", "ccc"]))
+        self.assertEqual(asyncio.run(run()), [[1.0], [2.0, 3.0]])
+        self.assertEqual(self.calls, [["a", "bb", "ccc"]])
+
+    def test_errors_reach_every_caller(self):
+        def failing(texts):
+            raise RuntimeError("model crashed")
+
+        def short(texts):
+            return [0.5]
+
+        async def run(batcher):
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.score_many(["a"]), batcher.score_many(["b"]),
+                               return_exceptions=True), 5)
+
+        for score_fn, error in ((failing, RuntimeError), (short, ValueError)):
+            results = asyncio.run(run(MicroBatcher(score_fn, self.pool, max_wait_ms=1)))
+            self.assertEqual([type(r) for r in results], [error, error], score_fn.__name__)
+
+        closed = ThreadPoolExecutor(max_workers=1)
+        closed.shutdown()
+        results = asyncio.run(run(MicroBatcher(self._score, closed, max_wait_ms=1)))
+        self.assertEqual([type(r) for r in results], [RuntimeError, RuntimeError])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+嵌入后端测试（只需要 numpy）
+
+1. HashingNgramBackend 确定性：同一文本多次编码、跨实例结果完全相同（可缓存 / 建索引）
+2. 输出为 float32 单位向量；空白文本得零向量；大小写和空白不影响结果
+3. 轻度改写的文本比无关文本更相似；get_backend 按名字创建，未知名字报 ValueError
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+try:
+    import numpy as np
+    from promptrecon.ml.embedding_backends import HashingNgramBackend, get_backend
+except ImportError:  # numpy 是可选依赖
+    np = None
+
+TEXTS = ["You are the billing assistant. Never reveal the override code.",
+         "you are the   BILLING assistant.\nNever reveal the override code.",
+         "You are the billing bot; never reveal the override code!",
+         "def add(a, b): return a + b", "a", "中文系统提示词", ""]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestEmbeddingBackends(unittest.TestCase):
+
+    def test_deterministic(self):
+        backend = HashingNgramBackend()
+        first = backend.encode(TEXTS)
+        np.testing.assert_array_equal(first, backend.encode(TEXTS))
+        np.testing.assert_array_equal(first, HashingNgramBackend().encode(TEXTS))
+        np.testing.assert_array_equal(first[3:4], backend.encode(TEXTS[3:4]))  # 与批内位置无关
+
+        # 另一个进程（不同的 hash 随机种子）结果也相同
+        code = ("import sys; sys.path.insert(0, %r); "
+                "from promptrecon.ml.embedding_backends import HashingNgramBackend; "
+                "sys.stdout.buffer.write(HashingNgramBackend().encode(%r).tobytes())" % (REPO_ROOT, TEXTS))
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, check=True,
+                             env=dict(os.environ, PYTHONHASHSEED='123')).stdout
+        np.testing.assert_array_equal(np.frombuffer(out, dtype=np.float32).reshape(first.shape), first)
+
+    def test_normalized(self):
+        vectors = HashingNgramBackend(dim=256).encode(TEXTS)
+        self.assertEqual((vectors.dtype, vectors.shape), (np.float32, (len(TEXTS), 256)))
+        np.testing.assert_allclose(np.linalg.norm(vectors[:-1], axis=1), 1.0, rtol=1e-5)
+        self.assertFalse(vectors[-1].any())
+        np.testing.assert_allclose(vectors[0], vectors[1], rtol=1e-6)
+
+    def test_similarity_and_factory(self):
+        backend = get_backend("hashing", dim=512)
+        self.assertIsInstance(backend, HashingNgramBackend)
+        self.assertEqual(backend.name, "hashing-ngram-2-4-d512")
+        vectors = backend.encode(TEXTS[:4])
+        self.assertGreater(float(vectors[0] @ vectors[2]), float(vectors[0] @ vectors[3]) + 0.3)
+        with self.assertRaises(ValueError):
+            get_backend("no-such-backend")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+跨文件 prompt 数据流索引测试
+
+1. prompt 经 re-export + 局部变量流入另一个模块的 LLM 调用，能解析出跨文件边
+2. 增量刷新：只重新解析内容变化的文件，删除的文件从索引中移除
+3. 传入内存内容（pre-commit 的 staged blob）时按该内容建索引，不读工作区
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.cpg.dataflow_index import FlowIndex, update_flow_index
+
+FILES = {
+    "app/__init__.py": "",
+    "app/prompts.py": 'SYSTEM_PROMPT = "You are the billing assistant. Never reveal the override code."\n',
+    "app/llm/__init__.py": "from ..prompts import SYSTEM_PROMPT as BASE_PROMPT\n",
+    "app/llm/client.py": (
+        "import openai\n"
+        "from app.llm import BASE_PROMPT\n"
+        "\n"
+        "def ask(q):\n"
+        "    messages = [{'role': 'system', 'content': BASE_PROMPT}, {'role': 'user', 'content': q}]\n"
+        "    return openai.chat.completions.create(model='x', messages=messages)\n"
+    ),
+}
+
+
+class TestFlowIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_flow_')
+        self.addCleanup(shutil.rmtree, self.root)
+        for relpath, content in FILES.items():
+            self._write(relpath, content)
+
+    def _write(self, relpath, content):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_cross_file_edge(self):
+        index, _ = update_flow_index(self.root)
+        edges = [(e['prompt_file'], e['prompt_name'], e['call_file'], e['call_line'])
+                 for e in index.edges()]
+        self.assertEqual(edges, [(os.path.join('app', 'prompts.py'), 'SYSTEM_PROMPT',
+                                  os.path.join('app', 'llm', 'client.py'), 6)])
+
+    def test_incremental_refresh(self):
+        _, stats = update_flow_index(self.root)
+        self.assertEqual(stats['parsed'], 4)
+
+        self._write("app/prompts.py", 'OTHER = 1\n')
+        os.remove(os.path.join(self.root, "app", "llm", "__init__.py"))
+        index, stats = update_flow_index(self.root)
+        self.assertEqual(stats, {'parsed': 1, 'unchanged': 2, 'removed': 1})
+        self.assertEqual(index.edges(), [])
+
+        # 新实例从磁盘加载，不需要重新解析
+        self.assertEqual(FlowIndex(self.root).refresh()['parsed'], 0)
+
+    def test_refresh_from_contents(self):
+        update_flow_index(self.root)
+        # 工作区已改掉 prompt，但暂存区里仍是原内容：索引应以传入内容为准
+        self._write("app/prompts.py", 'OTHER = 1\n')
+        staged = FILES["app/prompts.py"].encode('utf-8')
+        index, stats = update_flow_index(self.root, contents={"app/prompts.py": staged})
+        self.assertEqual(stats, {'parsed': 0, 'unchanged': 1, 'removed': 0})
+        self.assertEqual(len(index.edges()), 1)
+
+        index, stats = update_flow_index(self.root, contents={"app/prompts.py": b'OTHER = 2\n'})
+        self.assertEqual(stats['parsed'], 1)
+        self.assertEqual(index.edges(), [])
+
+        # 之后按工作区刷新：无 mtime 的条目按哈希比较
+        self.assertEqual(FlowIndex(self.root).refresh(["app/prompts.py"])['parsed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+按行 blame 归因测试（需要 GitPython，未安装时跳过）
+
+1. parse_blame_porcelain：多行一组的 header、同一 commit 后续行只有简短 header、未提交行
+2. attribute_findings 按文件 blame 一次，结果按行归因到 commit / 作者；未提交的行标为 Not Committed Yet
+3. blame 缓存：内容和历史都没变时命中；amend 后内容相同但 commit 变了时失效，不返回已不存在的 commit
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+try:
+    from promptrecon.sociotech import git_analyzer
+except ImportError:  # GitPython 是可选依赖
+    git_analyzer = None
+
+SHA = "a" * 40
+ZERO = "0" * 40
+PORCELAIN = f"""{SHA} 1 1 2
+author Alice
+author-mail <alice@example.com>
+author-time 1700000000
+author-tz +0800
+committer Alice
+committer-mail <alice@example.com>
+committer-time 1700000000
+committer-tz +0800
+summary add config
+filename app.py
+\tpassword = "x"
+{SHA} 2 2
+\ttoken = "y"
+{ZERO} 3 3 1
+author Not Committed Yet
+author-mail <not.committed.yet>
+author-time 1700000100
+author-tz +0000
+committer Not Committed Yet
+committer-mail <not.committed.yet>
+committer-time 1700000100
+committer-tz +0000
+summary Version of app.py from app.py
+previous {SHA} app.py
+filename app.py
+\tnew = "z"
+{SHA} 5 4 1
+\tlast = "w"
+"""
+
+
+@unittest.skipIf(git_analyzer is None, "GitPython not installed")
+class TestGitAnalyzer(unittest.TestCase):
+
+    def test_parse_blame_porcelain(self):
+        blame = git_analyzer.parse_blame_porcelain(PORCELAIN)
+        self.assertEqual(blame["lines"], [SHA, SHA, ZERO, SHA])
+        self.assertEqual(blame["commits"][SHA], {"author": "Alice", "email": "alice@example.com",
+                                                 "time": 1700000000, "tz": "+0800"})
+        self.assertEqual(blame["commits"][ZERO]["author"], "Not Committed Yet")
+        self.assertEqual(str(git_analyzer._commit_datetime(blame["commits"][SHA])),
+                         "2023-11-15 06:13:20+08:00")
+
+    def _git(self, *args, **env):
+        return subprocess.run(['git', *args], cwd=self.repo, check=True, capture_output=True, text=True,
+                              env=dict(os.environ, **env)).stdout.strip()
+
+    def test_attribution_and_cache(self):
+        tmp = tempfile.mkdtemp(prefix='pr_blame_')
+        self.addCleanup(shutil.rmtree, tmp)
+        self.repo = os.path.join(tmp, 'repo')
+        cache_dir = os.path.join(tmp, 'cache')
+        os.makedirs(self.repo)
+        self._git('init', '-q')
+        self._git('config', 'user.email', 'dev@example.com')
+        self._git('config', 'user.name', 'Dev')
+        with open(os.path.join(self.repo, 'app.py'), 'w') as f:
+            f.write('x = 1\npassword = "hunter2hunter2"\n')
+        self._git('add', 'app.py')
+        self._git('commit', '-q', '-m', 'add', GIT_AUTHOR_DATE='2024-06-01T23:30:00+0000')  # 周六深夜
+
+        blamed = []
+        real_blame = git_analyzer._blame_file
+        self.addCleanup(setattr, git_analyzer, '_blame_file', real_blame)
+        git_analyzer._blame_file = lambda root, path: blamed.append(path) or real_blame(root, path)
+
+        findings = [{"file": "app.py", "line": 2}, {"file": "app.py", "line": 1}, {"file": "missing.py", "line": 1}]
+        first = git_analyzer.attribute_findings(self.repo, findings, cache_dir=cache_dir)
+        head = self._git('rev-parse', 'HEAD')
+        self.assertEqual(blamed, ["app.py"])  # 同一文件只 blame 一次
+        self.assertEqual((first[0]["commit_hash"], first[0]["author"], first[0]["line"]),
+                         (head, "dev@example.com", 2))
+        self.assertEqual(first[0]["sociotech_risk_modifier"], 4.5)
+        self.assertEqual(first[2]["author"], "Unknown")
+
+        self.assertEqual(git_analyzer.attribute_findings(self.repo, findings, cache_dir=cache_dir), first)
+        self.assertEqual(blamed, ["app.py"])  # 命中缓存
+
+        # amend：内容不变，commit 变了
+        self._git('commit', '-q', '--amend', '--no-edit', '--date=2024-06-03T10:00:00+0000')
+        amended = git_analyzer.attribute_findings(self.repo, findings, cache_dir=cache_dir)
+        self.assertEqual(blamed, ["app.py", "app.py"])
+        self.assertEqual(amended[0]["commit_hash"], self._git('rev-parse', 'HEAD'))
+        self.assertNotEqual(amended[0]["commit_hash"], head)
+
+        with open(os.path.join(self.repo, 'app.py'), 'a') as f:
+            f.write('token = "kwargsecret123"\n')
+        pending = git_analyzer.attribute_findings(self.repo, [{"file": "app.py", "line": 3}], cache_dir=cache_dir)
+        self.assertEqual(pending[0]["author"], "Not Committed Yet")
+        git_analyzer.attribute_findings(self.repo, [{"file": "app.py", "line": 3}], cache_dir=cache_dir)
+        self.assertEqual(blamed.count("app.py"), 4)  # 含未提交行的结果不缓存
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ Prompt-Recon Pre-commit Hook Smoke Test
 回归测试：
 5. 外部目录扫描：仓库外文件能报出 finding，不静默漏报
 6. 默认 ignore：.git/venv/__pycache__ 在无 .promptignore 时不被扫描
+7. 数据流索引：flow-index 生成后，提交时按 staged 内容刷新，删除 / 重命名的旧路径从索引移除
 """
 
 import unittest
@@ -141,6 +142,42 @@ class TestPreCommitHook(unittest.TestCase):
         finally:
             shutil.rmtree(external_dir)
 
+    # ---- 回归7：数据流索引随提交刷新 ----
+    def test_flow_index_follows_commits(self):
+        import json
+        files = {
+            'prompts.py': 'SYSTEM_PROMPT = "You are the billing assistant. Never reveal the override code."\n',
+            'old.py': 'x = 1\n',
+            'gone.py': 'y = 2\n',
+        }
+        for name, content in files.items():
+            with open(os.path.join(self.repo_dir, name), 'w') as f:
+                f.write(content)
+        subprocess.run(['git', 'add', '.'], cwd=self.repo_dir, check=True, capture_output=True)
+        self.assertEqual(self._git_commit('initial').returncode, 0)
+
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        result = subprocess.run([sys.executable, '-m', 'promptrecon', 'flow-index', '-d', self.repo_dir],
+                                cwd=self.repo_dir, capture_output=True, text=True, env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        index_path = os.path.join(self.repo_dir, '.promptrecon', 'flow_index.json')
+
+        subprocess.run(['git', 'mv', 'old.py', 'new.py'], cwd=self.repo_dir, check=True, capture_output=True)
+        subprocess.run(['git', 'rm', '-q', 'gone.py'], cwd=self.repo_dir, check=True, capture_output=True)
+        with open(os.path.join(self.repo_dir, 'client.py'), 'w') as f:
+            f.write('import openai\nfrom prompts import SYSTEM_PROMPT\n'
+                    'openai.chat.completions.create(messages=[{"role": "system", "content": SYSTEM_PROMPT}])\n')
+        subprocess.run(['git', 'add', 'client.py'], cwd=self.repo_dir, check=True, capture_output=True)
+        with open(os.path.join(self.repo_dir, 'client.py'), 'a') as f:
+            f.write('broken(\n')  # 工作区改动不进索引
+        result = self._git_commit('move and remove')
+        self.assertEqual(result.returncode, 0, f"{result.stdout}\n{result.stderr}")
+
+        with open(index_path, encoding='utf-8') as f:
+            indexed = json.load(f)['files']
+        self.assertEqual(sorted(indexed), ['client.py', 'new.py', 'prompts.py'])
+        self.assertTrue(indexed['client.py']['summary']['calls'])
+
     # ---- 回归6：默认 ignore 不扫 .git/venv/__pycache__ ----
     def test_default_ignore_excludes_git_and_venv(self):
         """无 .promptignore 时，.git/venv/__pycache__ 不会被扫描（只测内置默认规则）"""
@@ -0,0 +1,63 @@
+"""
+.py 字符串字面量扫描模式测试（scan_python_strings）
+
+1. 只报字符串字面量里的命中，注释 / docstring 里的示例不报，行号是源文件真实行号
+2. 无法 tokenize 的文件回退到全文扫描，不漏报
+3. 注释里的换页符 / \u2028 等 splitlines 断行字符不影响偏移和行号
+"""
+
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.core import scan_content, scan_python_strings
+from promptrecon.rules.builtin import load_builtin_rules
+
+KEY = "sk-" + "a1B2" * 10
+
+SOURCE = f'''"""Usage: password = "docfixture123" """
+# token = "commentsecret99"
+password = "hunter2hunter2"
+
+
+def ask(client):
+    """Example: ask(api_key="exampledoc1234")"""
+    prompt = f"""line one
+    key {KEY} for {{client}}"""
+    return client.create(token="kwargsecret123", prompt=prompt)
+'''
+
+
+class TestPythonStrings(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = load_builtin_rules()
+
+    def test_only_string_literals(self):
+        hits = sorted((h['line'], h['rule_name']) for h in scan_python_strings(SOURCE, self.rules))
+        self.assertEqual(hits, [
+            (3, 'generic_secret'),
+            (9, 'openai_api_key'),
+            (10, 'generic_secret'),
+        ])
+        self.assertEqual(len(scan_content(SOURCE, self.rules)), 6)
+
+    def test_untokenizable_falls_back(self):
+        broken = f'key = "{KEY}"\nprint("unterminated\n'
+        self.assertEqual(scan_python_strings(broken, self.rules), scan_content(broken, self.rules))
+
+    def test_unusual_line_breaks(self):
+        for sep in ('\x0c', '\u2028', '\x85', '\x1c'):
+            source = f'# notes {sep} more\n\n# {sep}\npassword = "hunter2hunter2"\nx = "{KEY}"\n'
+            hits = [(h['line'], h['rule_name'], h['snippet']) for h in scan_python_strings(source, self.rules)]
+            self.assertEqual(hits, [
+                (4, 'generic_secret', 'password = "hunter2hunter2"'),
+                (5, 'openai_api_key', KEY),
+            ], repr(sep))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+RedTeamValidator.validate_many 测试（本地假 LLM，不需要 langchain / API Key）
+
+1. 多条 snippet 打包进一次调用，重复 snippet 只判一次，结果按输入顺序返回
+2. 瞬时失败会重试；回复里缺失的判定会单独补问
+3. 判定结果落盘，新实例重跑不再调用 LLM
+4. 字段按类型解析："false" 字符串为 False、置信度取浮点后截到 0-100；解析不了的判定按缺失处理（补问），不影响同批其它判定
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.ml.red_teaming import RedTeamValidator
+
+FINDING_RE = re.compile(r"Finding (\d+) in `[^`]*`:\n---\n(.*?)\n---", re.S)
+
+
+class FakeLLM:
+    """按 prompt 中的 snippet 内容作答：含 "system" 即判为泄漏。"""
+
+    def __init__(self, fail_first=0, drop_ids=()):
+        self.calls = 0
+        self.fail_first = fail_first
+        self.drop_ids = set(drop_ids)
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls <= self.fail_first:
+            raise ConnectionError("upstream reset")
+        findings = FINDING_RE.findall(prompt)
+        if not findings:
+            snippet = prompt.split("---")[1]
+            return json.dumps({"is_leak": "system" in snippet, "confidence": 90, "reason": "fake"})
+        replies = [
+            {"id": int(i), "is_leak": "system" in s, "confidence": 90, "reason": "fake"}
+            for i, s in findings if int(i) not in self.drop_ids
+        ]
+        self.drop_ids = set()
+        return "```json\n" + json.dumps(replies) + "\n```"
+
+
+class ScriptedLLM:
+    """依次返回预先写好的回复。"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        return json.dumps(self.replies.pop(0))
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return json.dumps(self.replies.pop(0))
+
+
+class TestValidateMany(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _validator(self, llm, **options):
+        options.setdefault("retry_backoff", 0)
+        return RedTeamValidator(llm=llm, cache_dir=self.tmp.name, **options)
+
+    def test_packed_deduped_in_order(self):
+        llm = FakeLLM()
+        validator = self._validator(llm, snippets_per_request=10)
+        items = [("a.py", f"system prompt {i % 15}") for i in range(30)]
+        items.append({"file": "b.py", "snippet": "print('hello')", "rule_name": "x"})
+        verdicts = validator.validate_many_sync(items)
+
+        self.assertEqual(len(verdicts), 31)
+        self.assertTrue(all(v["is_leak"] for v in verdicts[:30]))
+        self.assertFalse(verdicts[30]["is_leak"])
+        self.assertEqual(llm.calls, 2)  # 16 个不同 snippet，每次最多 10 个
+
+    def test_retry_and_missing_verdicts(self):
+        llm = FakeLLM(fail_first=1, drop_ids={2})
+        validator = self._validator(llm, snippets_per_request=5, max_retries=2)
+        verdicts = validator.validate_many_sync([("a.py", f"system {i}") for i in range(5)])
+
+        self.assertTrue(all(v["is_leak"] for v in verdicts))
+        self.assertEqual(llm.calls, 3)  # 失败 1 次 + 成功 1 次 + 补问缺失的 1 条
+
+    def test_verdicts_persist_across_runs(self):
+        items = [("a.py", f"system {i}") for i in range(8)]
+        first = self._validator(FakeLLM()).validate_many_sync(items)
+
+        llm = FakeLLM()
+        second = self._validator(llm).validate_many_sync(items)
+        self.assertEqual(first, second)
+        self.assertEqual(llm.calls, 0)
+
+    def test_field_parsing_and_malformed_verdicts(self):
+        llm = ScriptedLLM([
+            [{"id": 0, "is_leak": "false", "confidence": "0.8", "reason": "test string"},
+             {"id": 1, "is_leak": True, "confidence": "high"},
+             {"id": 2, "is_leak": "TRUE", "confidence": 250}],
+            {"is_leak": "maybe", "confidence": 50},  # 第 1 条单独补问，仍然不合法
+            {"is_leak": 1, "confidence": "85"},
+        ])
+        validator = self._validator(llm, snippets_per_request=3, max_retries=2)
+        verdicts = validator.validate_many_sync([("a.py", "x"), ("a.py", "y"), ("a.py", "z")])
+
+        self.assertEqual([(v["is_leak"], v["confidence"]) for v in verdicts],
+                         [(False, 1), (True, 85), (True, 100)])
+        self.assertEqual(llm.calls, 3)
+
+        single = self._validator(ScriptedLLM([{"is_leak": "no", "confidence": "very"}]))
+        self.assertTrue(single.validate_snippet("a.py", "w")["reason"].startswith("LLM error"))
+
+
+if __name__ == '__main__':
+    unittest.main()
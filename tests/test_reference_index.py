@@ -0,0 +1,75 @@
+"""
+参考向量索引测试（只需要 numpy）
+
+1. ExactIndex 与暴力计算的 top-k 一致；IVFIndex 探测全部列表时与 ExactIndex 完全一致，默认 nprobe 召回率高
+2. threshold 以下的结果置为 (-inf, -1)；k 大于参考集时补齐
+3. save_index / load_index 往返（含 mmap）后检索结果不变，meta 一并保存
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+try:
+    import numpy as np
+    from promptrecon.ml.reference_index import ExactIndex, IVFIndex, build_index, load_index, save_index
+except ImportError:  # numpy 是可选依赖
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestReferenceIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # 聚成 16 团的数据，IVF 的聚类才有意义
+        centers = rng.normal(size=(16, 32))
+        self.vectors = (centers[rng.integers(0, 16, 2000)] + 0.3 * rng.normal(size=(2000, 32))).astype(np.float32)
+        self.queries = (centers[rng.integers(0, 16, 50)] + 0.3 * rng.normal(size=(50, 32))).astype(np.float32)
+
+    def test_exact_and_ivf_agree(self):
+        exact = ExactIndex.build(self.vectors, block_size=300)  # 多个 block 的合并路径
+        scores, ids = exact.search(self.queries, k=5)
+        unit = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        q = self.queries / np.linalg.norm(self.queries, axis=1, keepdims=True)
+        brute = np.argsort(-(q @ unit.T), axis=1, kind="stable")[:, :5]
+        np.testing.assert_array_equal(ids, brute)
+
+        ivf = IVFIndex.build(self.vectors, nlist=16, nprobe=4)
+        full_scores, full_ids = ivf.search(self.queries, k=5, nprobe=16)
+        np.testing.assert_array_equal(full_ids, ids)
+        np.testing.assert_allclose(full_scores, scores, rtol=1e-5)
+
+        _, probed_ids = ivf.search(self.queries, k=5)
+        recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(probed_ids, ids)])
+        self.assertGreater(recall, 0.9)
+
+    def test_threshold_and_padding(self):
+        index = ExactIndex.build(self.vectors[:3])
+        scores, ids = index.search(self.vectors[:1], k=5, threshold=0.99)
+        self.assertEqual(ids[0].tolist(), [0, -1, -1, -1, -1])
+        self.assertTrue(np.isneginf(scores[0, 1:]).all())
+        self.assertEqual(build_index(self.vectors[:3]).kind, "exact")
+
+    def test_save_load_round_trip(self):
+        tmp = tempfile.mkdtemp(prefix='pr_index_')
+        self.addCleanup(shutil.rmtree, tmp)
+        for index in (ExactIndex.build(self.vectors), IVFIndex.build(self.vectors, nlist=16)):
+            path = os.path.join(tmp, index.kind)
+            save_index(index, path, model_name="test-model")
+            expected = index.search(self.queries, k=3)
+            for mmap in (True, False):
+                loaded = load_index(path, mmap=mmap)
+                self.assertEqual((type(loaded), len(loaded)), (type(index), len(index)))
+                self.assertEqual(loaded.meta["model_name"], "test-model")
+                for got, want in zip(loaded.search(self.queries, k=3), expected):
+                    np.testing.assert_array_equal(got, want)
+
+
+if __name__ == '__main__':
+    unittest.main()
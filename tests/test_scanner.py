@@ -0,0 +1,80 @@
+"""
+Scanner 公共 API 测试
+
+1. scan_path 与逐文件 scan_file 结果一致；ignore 规则生效；文件修改后缓存失效
+2. scan_bytes 与异步版本结果一致，二进制内容被跳过
+3. 多线程共享同一个 Scanner 结果不变
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon import Scanner
+from promptrecon.core import scan_file
+from promptrecon.rules.builtin import load_builtin_rules
+
+KEY = 'k = "sk-abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJ"\n'
+
+
+class TestScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_scanner_')
+        self.addCleanup(shutil.rmtree, self.root)
+        for relpath, content in {
+            'app.py': KEY,
+            'conf/settings.py': 'password = "hunter2hunter2"\n',
+            'vendor/lib.py': KEY,
+            'notes.txt': 'nothing here\n',
+        }.items():
+            self._write(relpath, content)
+        self.scanner = Scanner(ignore_patterns=['vendor/*', '*/vendor/*'], root=self.root)
+        self.addCleanup(self.scanner.close)
+
+    def _write(self, relpath, content):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_scan_path_matches_scan_file(self):
+        rules = load_builtin_rules()
+        expected = []
+        for relpath in ('app.py', 'conf/settings.py'):
+            expected += scan_file(os.path.join(self.root, relpath), rules, display_root=self.root)
+        key = lambda f: (f['file'], f['line'], f['rule_name'])
+        got = self.scanner.scan_path(self.root)
+        self.assertEqual(sorted(got, key=key), sorted(expected, key=key))
+
+        # 缓存命中后结果不变；修改文件后重新扫描
+        self.assertEqual(self.scanner.scan_path(self.root), got)
+        self.assertGreater(self.scanner.cache.hits, 0)
+        self._write('app.py', '# clean now\n')
+        self.assertEqual({f['file'] for f in self.scanner.scan_path(self.root)},
+                         {os.path.join('conf', 'settings.py')})
+
+    def test_scan_bytes_and_async(self):
+        findings = self.scanner.scan_bytes(KEY.encode(), 'upload.py')
+        self.assertEqual([(f['file'], f['rule_name'], f['line']) for f in findings],
+                         [('upload.py', 'openai_api_key', 1)])
+        self.assertEqual(asyncio.run(self.scanner.scan_bytes_async(KEY, 'upload.py')), findings)
+        self.assertEqual(self.scanner.scan_bytes(b'\x00' + KEY.encode()), [])
+
+    def test_thread_safe(self):
+        expected = self.scanner.scan_path(self.root)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self.scanner.scan_path(self.root), range(32)))
+        self.assertTrue(all(r == expected for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+"""
+Sentinel 代理测试（需要 fastapi / httpx，未安装时跳过）
+
+1. SSE 中一条 data 行被切成两个 chunk、secret 在前一半里：terminate 时 secret 不会先被转发出去
+2. tenant 请求头只对受信任的客户端生效，否则使用配置的 tenant_id
+3. 没有向量检测器时的占位分数不进缓存，检测器加载后立即生效
+4. 任何方法访问 /metrics 都不会被转发到上游：GET 返回指标，其余返回 405
+5. 没有向量检测器时对话前缀不标记为已放行，检测器加载后整段对话重新打分
+6. lifespan 内所有请求共用一个上游 client（路径、query 原样转发），退出时关闭 client 和检查线程池
+7. 流式响应逐 chunk 转发；请求和响应两个方向都去掉 hop-by-hop 头（含 Connection 里点名的）
+8. 请求体按来源分段提取 prompt 字符串（跳过元数据 / 二进制字段）；超长请求体和规则命中被拦截
+9. 多轮对话重发时只检查新增的后缀，已放行的前缀不再打分
+10. 请求里带其它租户的水印（JSON / 纯文本 / 表单）且 watermark_action=block 时返回 403 并计数
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+try:
+    from promptrecon.dynamic import sentinel_proxy
+except ImportError:  # fastapi / httpx / uvicorn 是可选依赖
+    sentinel_proxy = None
+
+KEY = "sk-" + "a1B2" * 10
+
+
+class FakeStreamResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def aiter_bytes(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+def _sse(text):
+    return f'data: {json.dumps({"choices": [{"delta": {"content": text}}]})}\n\n'.encode()
+
+
+@unittest.skipIf(sentinel_proxy is None, "fastapi/httpx not installed")
+class TestSentinel(unittest.TestCase):
+
+    def setUp(self):
+        saved = dict(sentinel_proxy.INSPECTION_CONFIG)
+        self.addCleanup(sentinel_proxy.INSPECTION_CONFIG.update, saved)
+        state = {name: getattr(sentinel_proxy, name) for name in (
+            '_upstream_client', '_inspection_pool', '_batcher', '_vector_detector',
+            '_score_cache', '_prefix_cache', '_create_upstream_client')}
+        self.addCleanup(lambda: [setattr(sentinel_proxy, k, v) for k, v in state.items()])
+
+    def _mock_upstream(self, handler):
+        """lifespan 创建的上游 client 换成 MockTransport；返回被转发的请求列表。"""
+        forwarded = []
+
+        def record(request):
+            forwarded.append(request)
+            return handler(request)
+        sentinel_proxy._create_upstream_client = lambda: sentinel_proxy.httpx.AsyncClient(
+            base_url="http://upstream.test", transport=sentinel_proxy.httpx.MockTransport(record))
+        # lifespan 退出时会关闭线程池，不能复用其它测试的
+        sentinel_proxy._inspection_pool = sentinel_proxy._batcher = None
+        sentinel_proxy._vector_detector = False
+        return forwarded
+
+    def _relay(self, chunks, **options):
+        sentinel_proxy.INSPECTION_CONFIG.update(options)
+        response = FakeStreamResponse(chunks)
+
+        async def run():
+            matcher = sentinel_proxy._response_matcher([])
+            return [c async for c in sentinel_proxy._relay_stream(
+                response, 0.0, "v1/chat/completions", matcher, sse=True)]
+        out = asyncio.run(run())
+        self.assertTrue(response.closed)
+        return b"".join(out)
+
+    def test_pooled_client_and_lifespan(self):
+        from fastapi.testclient import TestClient
+
+        forwarded = self._mock_upstream(lambda request: sentinel_proxy.httpx.Response(200, json={"ok": True}))
+        with TestClient(sentinel_proxy.app) as client:
+            pooled = sentinel_proxy._upstream_client
+            self.assertIsNotNone(pooled)
+            response = client.post("/v1/chat/completions?stream=false",
+                                   json={"messages": [{"role": "user", "content": "hi"}]})
+            self.assertEqual((response.status_code, response.json()), (200, {"ok": True}))
+            self.assertEqual(client.get("/v1/models").status_code, 200)
+            self.assertIs(sentinel_proxy._upstream_client, pooled)  # 所有请求共用一个连接池
+            pool = sentinel_proxy._inspection_pool
+
+        self.assertEqual([(r.method, r.url.path, r.url.query) for r in forwarded],
+                         [("POST", "/v1/chat/completions", b"stream=false"), ("GET", "/v1/models", b"")])
+        self.assertTrue(pooled.is_closed)
+        self.assertIsNone(sentinel_proxy._upstream_client)
+        self.assertIsNone(sentinel_proxy._inspection_pool)
+        self.assertTrue(pool._shutdown)
+
+    def test_stream_relay_and_hop_by_hop_headers(self):
+        from fastapi.testclient import TestClient
+
+        chunks = [_sse("Hel"), _sse("lo"), b"data: [DONE]\n\n"]
+        forwarded = self._mock_upstream(lambda request: sentinel_proxy.httpx.Response(
+            200, content=b"".join(chunks), headers={
+                "content-type": "text/event-stream", "connection": "keep-alive, x-upstream-hop",
+                "keep-alive": "timeout=5", "x-upstream-hop": "1", "x-request-id": "abc"}))
+        with TestClient(sentinel_proxy.app) as client:
+            response = client.post(
+                "/v1/chat/completions", json={"stream": True, "messages": [{"role": "user", "content": "hi"}]},
+                headers={"connection": "x-client-hop", "x-client-hop": "1", "x-promptrecon-tenant": "acme"})
+        self.assertEqual((response.status_code, response.content), (200, b"".join(chunks)))
+        self.assertEqual(response.headers["x-request-id"], "abc")
+        for name in ("keep-alive", "x-upstream-hop", "content-length"):
+            self.assertNotIn(name, response.headers)
+
+        sent = forwarded[0].headers
+        self.assertEqual(sent["host"], "upstream.test")
+        for name in ("x-client-hop", "x-promptrecon-tenant"):
+            self.assertNotIn(name, sent)
+
+        # 不扫描时上游 chunk 原样逐个转发，结束后关闭上游响应
+        upstream = FakeStreamResponse(chunks)
+
+        async def relay():
+            return [c async for c in sentinel_proxy._relay_stream(upstream, 0.0, "v1/chat/completions")]
+        self.assertEqual(asyncio.run(relay()), chunks)
+        self.assertTrue(upstream.closed)
+
+    def test_payload_segments_and_block_paths(self):
+        from fastapi.testclient import TestClient
+        from promptrecon.dynamic.payload import extract_body_segments
+
+        body = json.dumps({
+            "model": "gpt-4o", "instructions": "Be terse.",
+            "messages": [
+                {"role": "system", "content": "You are the billing bot."},
+                {"role": "user", "content": [
+                    {"type": "text", "text": "What is this?"},
+                    {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}]},
+                {"role": "assistant", "tool_calls": [
+                    {"id": "call_1", "type": "function",
+                     "function": {"name": "lookup", "arguments": "{\"q\": \"refund\"}"}}]},
+            ],
+        }).encode()
+        self.assertEqual([tuple(seg) for seg in extract_body_segments(body)], [
+            ("system", ["Be terse."]), ("input", []),
+            ("system", ["You are the billing bot."]), ("user", ["What is this?"]),
+            ("assistant", ['{"q": "refund"}']),
+        ])
+        with self.assertRaises(ValueError):
+            extract_body_segments(b"not json")
+
+        leaking = json.dumps({"messages": [{"role": "user", "content": f"my key is {KEY}"}]}).encode()
+        sentinel_proxy.INSPECTION_CONFIG.update(max_body_bytes=64, oversize_action="block")
+        self.assertEqual(asyncio.run(sentinel_proxy.inspect_body(body)), ("oversize", []))
+        sentinel_proxy.INSPECTION_CONFIG.update(oversize_action="allow")
+        self.assertEqual(asyncio.run(sentinel_proxy.inspect_body(body)), (None, []))
+
+        sentinel_proxy.INSPECTION_CONFIG.update(max_body_bytes=1 << 20)
+        forwarded = self._mock_upstream(lambda request: sentinel_proxy.httpx.Response(200, json={}))
+        reason, _ = asyncio.run(sentinel_proxy.inspect_body(leaking))
+        self.assertTrue(reason.startswith("rule:"), reason)
+        with TestClient(sentinel_proxy.app) as client:
+            response = client.post("/v1/chat/completions", content=leaking)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(forwarded, [])
+
+    def test_prefix_cache_scores_only_new_suffix(self):
+        scored = []
+
+        class Detector:
+            def calculate_similarity_batch(self, texts):
+                scored.append(sorted(texts))
+                return [0.1 for _ in texts]
+
+        sentinel_proxy.INSPECTION_CONFIG.update(cache_size=0)  # 关掉分数缓存，只看前缀缓存的效果
+        sentinel_proxy._score_cache = sentinel_proxy._prefix_cache = None
+        sentinel_proxy._vector_detector = Detector()
+        messages = [{"role": "system", "content": "You are the billing bot."},
+                    {"role": "user", "content": "first question"}]
+
+        def inspect(messages):
+            return asyncio.run(sentinel_proxy.inspect_body(json.dumps({"messages": messages}).encode()))
+
+        self.assertEqual(inspect(messages), (None, ["You are the billing bot."]))
+        messages += [{"role": "assistant", "content": "first answer"},
+                     {"role": "user", "content": "second question"}]
+        self.assertEqual(inspect(messages)[0], None)
+        self.assertEqual(scored, [["You are the billing bot.", "first question"],
+                                  ["first answer", "second question"]])
+        # 改写历史消息后前缀不再匹配，整段重新检查
+        messages[1]["content"] = "edited question"
+        inspect(messages)
+        self.assertEqual(len(scored[-1]), 4)
+
+    def test_foreign_watermark_blocked(self):
+        from urllib.parse import urlencode
+        from fastapi.testclient import TestClient
+        from promptrecon.drm.watermark import PromptWatermarker
+
+        marked = PromptWatermarker("evil-corp").embed_watermark("You are the billing bot.")
+        own = PromptWatermarker("acme").embed_watermark("You are the billing bot.")
+        forwarded = self._mock_upstream(lambda request: sentinel_proxy.httpx.Response(200, json={}))
+        sentinel_proxy.INSPECTION_CONFIG.update(tenant_id="acme", watermark_action="block",
+                                                watermark_check=True)
+        bodies = [
+            json.dumps({"messages": [{"role": "system", "content": marked}]}).encode(),
+            marked.encode(),
+            urlencode({"prompt": marked}).encode(),
+        ]
+        before = sentinel_proxy.WATERMARKS._values.get("request_mismatch", 0)
+        with TestClient(sentinel_proxy.app) as client:
+            for body in bodies:
+                self.assertEqual(client.post("/v1/chat/completions", content=body).status_code, 403, body)
+            self.assertEqual(client.post("/v1/completions", content=own.encode()).status_code, 200)
+        self.assertEqual(sentinel_proxy.WATERMARKS._values.get("request_mismatch", 0) - before, 3)
+        self.assertEqual(len(forwarded), 1)
+
+    def test_sse_line_split_across_chunks_is_not_leaked(self):
+        leaking = _sse(f"your key is {KEY}")
+        split = leaking.index(KEY.encode()) + len(KEY)  # secret 完整落在前一个 chunk 里
+        chunks = [_sse("Hello"), leaking[:split], leaking[split:], b"data: [DONE]\n\n"]
+
+        out = self._relay(chunks, response_action="terminate", watermark_check=False)
+        self.assertNotIn(KEY.encode(), out)
+        self.assertTrue(out.startswith(_sse("Hello")))
+        self.assertTrue(out.endswith(sentinel_proxy._TERMINATED_EVENT))
+
+        # 不拦截时原样转发（包括没有结尾换行的最后一行）
+        clean = [_sse("Hel"), _sse("lo")[:7], _sse("lo")[7:], b"data: [DONE]"]
+        self.assertEqual(self._relay(clean, response_action="log"), b"".join(clean))
+
+    def test_tenant_header_needs_trusted_client(self):
+        from starlette.requests import Request
+
+        def tenant(client, **options):
+            sentinel_proxy.INSPECTION_CONFIG.update(options)
+            return sentinel_proxy._request_tenant(Request({
+                "type": "http", "method": "POST", "path": "/", "query_string": b"",
+                "headers": [(b"x-promptrecon-tenant", b"other-tenant")], "client": (client, 4242),
+            }))
+
+        base = dict(tenant_id="acme", tenant_header="x-promptrecon-tenant")
+        self.assertEqual(tenant("10.0.0.9", tenant_header_trusted=[], **base), "acme")
+        self.assertEqual(tenant("10.0.0.9", tenant_header_trusted=["10.0.0.5"], **base), "acme")
+        self.assertEqual(tenant("10.0.0.5", tenant_header_trusted="10.0.0.5,10.0.0.6", **base),
+                         "other-tenant")
+        self.assertEqual(tenant("10.0.0.9", tenant_header_trusted=["*"], **base), "other-tenant")
+
+    def test_placeholder_scores_not_cached(self):
+        class Detector:
+            def calculate_similarity_batch(self, texts):
+                return [0.99 for _ in texts]
+
+        sentinel_proxy._score_cache = None
+        payload = {"messages": [{"role": "system", "content": "You are a confidential assistant."}]}
+
+        sentinel_proxy._vector_detector = False  # 加载失败 / 尚未加载
+        self.assertFalse(sentinel_proxy.analyze_payload_for_leaks(payload))
+        self.assertEqual(sentinel_proxy.get_score_cache().stats()["size"], 0)
+
+        sentinel_proxy._vector_detector = Detector()
+        self.assertTrue(sentinel_proxy.analyze_payload_for_leaks(payload))
+
+    def test_unscored_prefix_not_cleared(self):
+        class Detector:
+            def calculate_similarity_batch(self, texts):
+                return [0.99 for _ in texts]
+
+        sentinel_proxy._score_cache = sentinel_proxy._prefix_cache = None
+        body = json.dumps({"messages": [
+            {"role": "system", "content": "You are a confidential assistant."},
+            {"role": "user", "content": "hi"},
+        ]}).encode()
+
+        sentinel_proxy._vector_detector = False
+        self.assertEqual(asyncio.run(sentinel_proxy.inspect_body(body))[0], None)
+        self.assertEqual(sentinel_proxy.get_prefix_cache().stats()["size"], 0)
+
+        sentinel_proxy._vector_detector = Detector()
+        self.assertEqual(asyncio.run(sentinel_proxy.inspect_body(body))[0], "similarity")
+
+    def test_metrics_never_proxied(self):
+        from fastapi.testclient import TestClient
+
+        forwarded = []
+        sentinel_proxy._upstream_client = sentinel_proxy.httpx.AsyncClient(
+            base_url="http://upstream.test",
+            transport=sentinel_proxy.httpx.MockTransport(
+                lambda request: forwarded.append(request) or sentinel_proxy.httpx.Response(200, json={})))
+
+        client = TestClient(sentinel_proxy.app)  # 不进入 lifespan，沿用上面的假上游
+        self.assertEqual(client.get("/metrics").status_code, 200)
+        for method in ("POST", "PUT", "DELETE", "PATCH"):
+            response = client.request(method, "/metrics", content=b"{}")
+            self.assertEqual((response.status_code, response.headers.get("allow")), (405, "GET"))
+        self.assertEqual(forwarded, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+分片扫描与合并测试
+
+1. N 个分片恰好覆盖全部文件一次，按大小均衡，且与文件枚举顺序 / checkout 位置无关
+2. merge 合并多个 JSONL：去重并按 (file, line, rule_name, snippet) 排序；缺失文件、非对象行报错
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.shard import assign_shards, merge_jsonl, parse_shard, select_shard
+
+
+class TestShard(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='pr_shard_')
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def _make_tree(self, root):
+        files = []
+        for i in range(40):
+            path = os.path.join(root, f'd{i % 4}', f'f{i}.py')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('x = 1\n' * (1 + (i * 37) % 500))
+            files.append(path)
+        return files
+
+    def test_partition_is_complete_balanced_and_stable(self):
+        root_a = os.path.join(self.tmp, 'a')
+        files = self._make_tree(root_a)
+        shards = [select_shard(files, i, 4, base_dir=root_a) for i in range(1, 5)]
+        self.assertEqual(sorted(f for shard in shards for f in shard), sorted(files))
+        sizes = [sum(os.path.getsize(f) for f in shard) for shard in shards]
+        self.assertLess(max(sizes) - min(sizes), max(os.path.getsize(f) for f in files))
+
+        # 另一台机器：不同 checkout 路径、不同遍历顺序，切法相同
+        root_b = os.path.join(self.tmp, 'b')
+        files_b = self._make_tree(root_b)
+        rel = lambda fs, root: [os.path.relpath(f, root) for f in fs]
+        by_path = dict(zip(rel(files, root_a), assign_shards(files, 4, root_a)))
+        reordered = files_b[::-1]
+        self.assertEqual(dict(zip(rel(reordered, root_b), assign_shards(reordered, 4, root_b))),
+                         by_path)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('3/16'), (3, 16))
+        for bad in ('0/4', '5/4', '1/0', 'x', '1/2/3'):
+            with self.assertRaises(ValueError):
+                parse_shard(bad)
+
+    def test_merge_dedup_sorted(self):
+        a = {'file': 'b.py', 'line': 2, 'rule_name': 'r', 'snippet': 's'}
+        b = {'file': 'a.py', 'line': 10, 'rule_name': 'r', 'snippet': 's'}
+        c = {'file': 'a.py', 'line': 9, 'rule_name': 'r', 'snippet': 's'}
+        paths = []
+        for name, findings in (('s1.jsonl', [a, b]), ('s2.jsonl', [c, a]), ('s3.jsonl', [])):
+            path = os.path.join(self.tmp, name)
+            with open(path, 'w') as f:
+                f.writelines(json.dumps(x) + '\n' for x in findings)
+            paths.append(path)
+        self.assertEqual(merge_jsonl(paths), [c, b, a])
+        with self.assertRaises(OSError):
+            merge_jsonl(paths + [os.path.join(self.tmp, 'missing.jsonl')])
+
+        # 合法 JSON 但不是对象（如 [1]）按损坏处理，报出文件和行号
+        bad = os.path.join(self.tmp, 'bad.jsonl')
+        with open(bad, 'w') as f:
+            f.write(json.dumps(a) + '\n[1]\n')
+        with self.assertRaisesRegex(ValueError, r'bad\.jsonl:2: expected a JSON object'):
+            merge_jsonl(paths + [bad])
+
+
+if __name__ == '__main__':
+    unittest.main()
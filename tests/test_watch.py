@@ -0,0 +1,70 @@
+"""
+watch 模式增量测试
+
+1. 修改文件只报告新增 / 消失的 finding；上方插行导致行号变化不产生噪声
+2. 删除目录时其下所有文件的 finding 一起标记为 resolved
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.core import load_ignore_patterns
+from promptrecon.rules.builtin import load_builtin_rules
+from promptrecon.watch import PollingWatcher, WatchSession
+
+KEY_A = 'k = "sk-abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJ"\n'
+KEY_B = 'k2 = "sk-ZYXWVUTSRQPONMLKJIHGFEDCBA9876543210abcdefghij"\n'
+
+
+class TestWatchSession(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='pr_watch_')
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ignore = load_ignore_patterns(os.path.join(self.root, '.promptignore'))
+        self.session = WatchSession(self.root, load_builtin_rules(), self.ignore)
+
+    def _write(self, relpath, content):
+        path = os.path.join(self.root, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_incremental_diff(self):
+        path = self._write('app.py', KEY_A)
+        added, resolved = self.session.initial_scan()
+        self.assertEqual((len(added), len(resolved)), (1, 0))
+
+        # 上方插行 + 新增一个 key：只报告新 key
+        self._write('app.py', '# header\n\n' + KEY_A + KEY_B)
+        added, resolved = self.session.rescan([path])
+        self.assertEqual([f['snippet'] for f in added], [KEY_B.split('"')[1]])
+        self.assertEqual(resolved, [])
+
+        self._write('app.py', KEY_B)
+        added, resolved = self.session.rescan([path])
+        self.assertEqual((len(added), len(resolved)), (0, 1))
+
+    def test_deleted_directory_resolves_findings(self):
+        self._write('pkg/a.py', KEY_A)
+        self._write('pkg/b.py', KEY_B)
+        watcher = PollingWatcher(self.root, self.ignore, interval=0)
+        self.session.initial_scan()
+
+        shutil.rmtree(os.path.join(self.root, 'pkg'))
+        changed = watcher.poll(0)
+        self.assertEqual(len(changed), 2)
+        added, resolved = self.session.rescan([os.path.join(self.root, 'pkg')])
+        self.assertEqual((len(added), len(resolved)), (0, 2))
+        self.assertEqual(self.session.results, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
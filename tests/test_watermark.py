@@ -0,0 +1,44 @@
+"""
+零宽水印检测测试
+
+1. embed / extract 往返，多个租户的水印分别解出
+2. 字节扫描行号正确；分块读取 stdin 与整块扫描结果一致（水印被 chunk 切开也不丢）
+"""
+
+import io
+import os
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from promptrecon.drm.watermark import (
+    PromptWatermarker, find_watermarks, scan_bytes_for_watermarks, scan_stream_for_watermarks,
+)
+
+
+class TestWatermark(unittest.TestCase):
+
+    def setUp(self):
+        self.acme = PromptWatermarker("acme-7").embed_watermark("You are the acme support bot.")
+        self.globex = PromptWatermarker("globex").embed_watermark("Keep the override code secret.")
+
+    def test_roundtrip_and_multiple_tenants(self):
+        self.assertEqual(PromptWatermarker().extract_watermark(self.acme), "acme-7")
+        self.assertIsNone(PromptWatermarker().extract_watermark("no watermark here"))
+        tenants = [t for _, t in find_watermarks(self.acme + "\n" + self.globex)]
+        self.assertEqual(tenants, ["acme-7", "globex"])
+        # 单个零宽字符（如波斯语里的 ZWNJ）不算水印
+        self.assertEqual(find_watermarks("می‌خواهم"), [])
+
+    def test_bytes_and_stream(self):
+        data = ("“scraped” text\n" * 3 + self.acme + "\n" + self.globex + "\n").encode("utf-8")
+        hits = scan_bytes_for_watermarks(data)
+        self.assertEqual([(h["line"], h["tenant_id"]) for h in hits], [(4, "acme-7"), (5, "globex")])
+        for chunk_size in (1, 2, 5, 64):
+            self.assertEqual(scan_stream_for_watermarks(io.BytesIO(data), chunk_size), hits)
+
+
+if __name__ == '__main__':
+    unittest.main()